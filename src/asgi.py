@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Entrada ASGI
+Conexões atendidas no event loop; a aplicação Flask roda em pools de threads por grupo de rotas
+
+Uso (a partir de src/):
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:app
+
+Rotas de longa espera em rede (análise, busca profunda) usam um pool grande e
+separado: uma análise aguardando APIs externas não ocupa as threads que atendem
+as demais rotas, e clientes lentos ou conexões keep-alive ficam no event loop.
+"""
+
+import os
+import sys
+import asyncio
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+from wsgi import app as flask_app
+from services.persistence_queue import persistence_queue
+from services.pdf_render_service import pdf_render_service
+
+logger = logging.getLogger(__name__)
+
+# Corpo da requisição acima deste tamanho vai para disco
+MAX_MEMORY_BODY = 1024 * 1024
+
+class _FileWrapper:
+    """wsgi.file_wrapper com blocos maiores (menos trocas entre thread e event loop)"""
+
+    def __init__(self, file, buffer_size: int = 8192):
+        self.file = file
+        self.buffer_size = max(buffer_size, 256 * 1024)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> bytes:
+        data = self.file.read(self.buffer_size)
+        if data:
+            return data
+        raise StopIteration
+
+    def close(self) -> None:
+        if hasattr(self.file, 'close'):
+            self.file.close()
+
+class ExecutorPools:
+    """Pools de threads por grupo de rotas, criados no processo que atende (após o fork)"""
+
+    def __init__(self):
+        """Lê grupos de rotas e tamanhos dos pools"""
+        self.groups: Dict[str, Tuple[List[str], int]] = {
+            'io': (
+                self._paths('ASGI_IO_PATHS', '/api/analyze,/api/deep_search'),
+                int(os.getenv('ASGI_IO_WORKERS', 256))
+            ),
+            'pdf': (
+                self._paths('ASGI_PDF_PATHS', '/api/generate_pdf,/api/pdf_preview'),
+                int(os.getenv('ASGI_PDF_WORKERS', os.cpu_count() or 2))
+            ),
+            'default': ([], int(os.getenv('ASGI_WSGI_WORKERS', 32)))
+        }
+        self._executors: Dict[str, ThreadPoolExecutor] = {}
+
+    @staticmethod
+    def _paths(variable: str, default: str) -> List[str]:
+        return [path.strip() for path in os.getenv(variable, default).split(',') if path.strip()]
+
+    def start(self) -> None:
+        if self._executors:
+            return
+        for name, (_, workers) in self.groups.items():
+            self._executors[name] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'asgi-{name}')
+        logger.info(
+            "Pools ASGI: " + ', '.join(f"{name}={workers}" for name, (_, workers) in self.groups.items())
+        )
+
+    def for_path(self, path: str) -> ThreadPoolExecutor:
+        """Pool responsável pela rota"""
+        self.start()
+        for name, (paths, _) in self.groups.items():
+            if path in paths:
+                return self._executors[name]
+        return self._executors['default']
+
+    def shutdown(self) -> None:
+        for executor in self._executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+        self._executors = {}
+
+class WSGIBridge:
+    """Adaptador ASGI -> WSGI com escolha de pool por rota"""
+
+    def __init__(self, wsgi_app: Callable):
+        self.wsgi_app = wsgi_app
+        self.pools = ExecutorPools()
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        else:
+            # WebSocket não é usado pela aplicação
+            await send({'type': 'websocket.close', 'code': 1000})
+
+    async def _lifespan(self, receive: Callable, send: Callable) -> None:
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self.pools.start()
+                persistence_queue.start()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                persistence_queue.shutdown()
+                pdf_render_service.shutdown()
+                self.pools.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        body = tempfile.SpooledTemporaryFile(max_size=MAX_MEMORY_BODY)
+        try:
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                body.write(message.get('body', b''))
+                if not message.get('more_body'):
+                    break
+            body.seek(0)
+
+            loop = asyncio.get_running_loop()
+            executor = self.pools.for_path(scope['path'])
+            response: Dict[str, Any] = {}
+
+            def start_response(status: str, headers: List[Tuple[str, str]], exc_info=None):
+                if exc_info and response.get('sent'):
+                    raise exc_info[1].with_traceback(exc_info[2])
+                response['status'] = int(status.split(' ', 1)[0])
+                response['headers'] = [
+                    (name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers
+                ]
+                return lambda data: response.setdefault('written', []).append(data)
+
+            environ = self._build_environ(scope, body)
+            result: Iterable[bytes] = await loop.run_in_executor(executor, self.wsgi_app, environ, start_response)
+
+            try:
+                # Respostas já materializadas (jsonify) não precisam voltar ao pool
+                if isinstance(result, (list, tuple)):
+                    chunks = iter(result)
+                    next_chunk = lambda: next(chunks, None)
+                    first = next_chunk()
+                else:
+                    chunks = iter(result)
+                    next_chunk = None
+                    first = await loop.run_in_executor(executor, next, chunks, None)
+
+                await send({
+                    'type': 'http.response.start',
+                    'status': response['status'],
+                    'headers': response['headers']
+                })
+                response['sent'] = True
+
+                for data in response.pop('written', []):
+                    await send({'type': 'http.response.body', 'body': data, 'more_body': True})
+
+                chunk = first
+                while chunk is not None:
+                    if chunk:
+                        await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                    if next_chunk:
+                        chunk = next_chunk()
+                    else:
+                        chunk = await loop.run_in_executor(executor, next, chunks, None)
+
+                await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+            finally:
+                if hasattr(result, 'close'):
+                    await loop.run_in_executor(executor, result.close)
+        finally:
+            body.close()
+
+    @staticmethod
+    def _build_environ(scope: Dict[str, Any], body) -> Dict[str, Any]:
+        """Monta o environ WSGI (PEP 3333) a partir do scope ASGI"""
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': str(server[0]),
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': str(client[0]),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+            'wsgi.file_wrapper': _FileWrapper
+        }
+
+        for raw_name, raw_value in scope.get('headers', []):
+            name = raw_name.decode('latin-1').upper().replace('-', '_')
+            value = raw_value.decode('latin-1')
+            if name == 'CONTENT_TYPE':
+                key = 'CONTENT_TYPE'
+            elif name == 'CONTENT_LENGTH':
+                key = 'CONTENT_LENGTH'
+            else:
+                key = f'HTTP_{name}'
+            if key in environ:
+                value = f"{environ[key]}{'; ' if key == 'HTTP_COOKIE' else ','}{value}"
+            environ[key] = value
+
+        return environ
+
+app = WSGIBridge(flask_app)
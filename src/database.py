@@ -6,17 +6,161 @@ Integração com Supabase PostgreSQL
 """
 
 import os
+import re
+import base64
 import logging
-from datetime import datetime
-from typing import Dict, List, Optional, Any
-from supabase import create_client, Client
+import time
+import threading
+import weakref
+from contextlib import contextmanager
+from datetime import datetime, date, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional, Any, Iterator, Sequence, Tuple, Callable
+import psycopg2
+import psycopg2.errors
+from psycopg2 import sql
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, parse_dsn
+from psycopg2.pool import ThreadedConnectionPool
+from psycopg2.extras import RealDictCursor, Json, execute_values
 import json
+from services.service_registry import service_registry
 
 logger = logging.getLogger(__name__)
 
+# Campos JSONB da tabela analyses
+JSON_FIELDS = [
+    'avatar_data', 'positioning_data', 'competition_data',
+    'marketing_data', 'metrics_data', 'funnel_data',
+    'market_intelligence', 'action_plan', 'comprehensive_analysis'
+]
+
+# Colunas graváveis da tabela analyses (nomes aceitos em INSERT/UPDATE dinâmicos)
+ANALYSIS_COLUMNS = [
+    'nicho', 'produto', 'descricao', 'preco', 'publico', 'concorrentes',
+    'dados_adicionais', 'objetivo_receita', 'orcamento_marketing', 'prazo_lancamento',
+    'status', 'created_at', 'updated_at', 'persistence_ticket'
+] + JSON_FIELDS
+
+# Tipos SQL das colunas (casts explícitos em UPDATE ... FROM (VALUES ...))
+ANALYSIS_COLUMN_TYPES = {
+    'preco': 'numeric', 'objetivo_receita': 'numeric', 'orcamento_marketing': 'numeric',
+    'created_at': 'timestamptz', 'updated_at': 'timestamptz',
+    **{field: 'jsonb' for field in JSON_FIELDS}
+}
+
+CURSOR_TIMESTAMP_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(\.\d+)?([+-]\d{2}:?\d{2}|Z)?$')
+
+FIELD_SEGMENT_PATTERN = re.compile(r'^\w+$')
+
+# Função RPC inexistente: PostgREST (PGRST202) ou PostgreSQL (42883, undefined_function)
+MISSING_FUNCTION_CODES = ('PGRST202', '42883')
+
+def parse_fields(fields: str) -> List[Tuple[str, List[str]]]:
+    """Converte 'nicho,comprehensive_analysis.avatar' em (coluna, caminho JSON)"""
+    selected = []
+    for item in fields.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        
+        column, *path = item.split('.')
+        if column != 'id' and column not in ANALYSIS_COLUMNS:
+            raise ValueError(f"Campo inválido: {column}")
+        if path and column not in JSON_FIELDS:
+            raise ValueError(f"Campo {column} não é JSON")
+        if not all(FIELD_SEGMENT_PATTERN.match(segment) for segment in path):
+            raise ValueError(f"Caminho inválido: {item}")
+        
+        selected.append((column, path))
+    
+    if not selected:
+        raise ValueError("Nenhum campo informado")
+    
+    # Caminhos sobrepostos ('a.b' e 'a.b.c', ou repetidos): o mais curto já inclui os demais
+    merged: List[Tuple[str, List[str]]] = []
+    for column, path in selected:
+        if any(other == column and path[:len(other_path)] == other_path for other, other_path in merged):
+            continue
+        merged = [
+            (other, other_path) for other, other_path in merged
+            if not (other == column and other_path[:len(path)] == path)
+        ]
+        merged.append((column, path))
+    return merged
+
+def field_alias(column: str, path: List[str]) -> str:
+    """Nome da coluna projetada para um caminho JSON"""
+    return '__'.join([column] + path)
+
+def nest_projection(row: Dict[str, Any], fields: List[Tuple[str, List[str]]]) -> Dict[str, Any]:
+    """Reconstrói a estrutura aninhada a partir das colunas projetadas"""
+    result = {'id': row.get('id')}
+    
+    # parse_fields já removeu caminhos sobrepostos: nenhum valor é aninhado dentro de outro
+    for column, path in fields:
+        alias = field_alias(column, path)
+        if not path:
+            result[column] = row.get(alias)
+            continue
+        
+        target = result.setdefault(column, {})
+        for segment in path[:-1]:
+            target = target.setdefault(segment, {})
+        target[path[-1]] = row.get(alias)
+    
+    return result
+
+def project_fields(analysis: Dict[str, Any], fields: List[Tuple[str, List[str]]]) -> Dict[str, Any]:
+    """Aplica a projeção de campos sobre uma análise completa já carregada"""
+    row = {'id': analysis.get('id')}
+    for column, path in fields:
+        value = analysis.get(column)
+        for segment in path:
+            if isinstance(value, dict):
+                value = value.get(segment)
+            elif isinstance(value, list) and segment.isdigit() and int(segment) < len(value):
+                value = value[int(segment)]
+            else:
+                value = None
+                break
+        row[field_alias(column, path)] = value
+    return nest_projection(row, fields)
+
+def escape_like(value: str) -> str:
+    """Escapa curingas de LIKE/ILIKE para busca literal"""
+    return re.sub(r'([\\%_])', r'\\\1', value)
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    """Cursor opaco de paginação a partir de (created_at, id) da última linha"""
+    payload = json.dumps([row['created_at'], row['id']]).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii')
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """Decodifica cursor de paginação (ValueError se inválido)"""
+    try:
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        row_id = int(row_id)
+    except Exception:
+        raise ValueError("Cursor de paginação inválido")
+    
+    # O timestamp vai para filtros do PostgREST: aceita apenas formato ISO 8601
+    if not isinstance(created_at, str) or not CURSOR_TIMESTAMP_PATTERN.match(created_at):
+        raise ValueError("Cursor de paginação inválido")
+    
+    return created_at, row_id
+
 class DatabaseManager:
     """Gerenciador de conexão e operações com Supabase"""
     
+    # Cache de estatísticas em memória, com validade curta
+    stats_cache_ttl = float(os.getenv('STATS_CACHE_TTL', 30))
+    _stats_cache: Optional[Tuple[float, Dict[str, Any]]] = None
+    _stats_cache_lock = threading.Lock()
+    _stats_function_available = True
+    
+    # Callbacks notificados quando uma análise é alterada ou removida (ex.: invalidação de cache)
+    _change_listeners: List[Callable[[int], None]] = []
+    
     def __init__(self):
         """Inicializa conexão com Supabase"""
         self.supabase_url = os.getenv('SUPABASE_URL')
@@ -26,6 +170,9 @@ class DatabaseManager:
         if not self.supabase_url or not self.supabase_key:
             raise ValueError("Credenciais do Supabase não configuradas")
         
+        # SDK do Supabase (httpx, gotrue, realtime...) carregado só com este backend
+        from supabase import create_client, Client
+        
         # Cliente principal (anon key)
         self.client: Client = create_client(self.supabase_url, self.supabase_key)
         
@@ -45,34 +192,46 @@ class DatabaseManager:
             logger.error(f"Erro ao testar conexão: {str(e)}")
             return False
     
+    def _build_insert_data(self, analysis_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Prepara dados de uma nova análise para inserção"""
+        insert_data = {
+            'nicho': analysis_data.get('segmento', ''),
+            'produto': analysis_data.get('produto', ''),
+            'descricao': analysis_data.get('descricao', ''),
+            'preco': analysis_data.get('preco'),
+            'publico': analysis_data.get('publico', ''),
+            'concorrentes': analysis_data.get('concorrentes', ''),
+            'dados_adicionais': analysis_data.get('dados_adicionais', ''),
+            'objetivo_receita': analysis_data.get('objetivo_receita'),
+            'orcamento_marketing': analysis_data.get('orcamento_marketing'),
+            'prazo_lancamento': analysis_data.get('prazo_lancamento', ''),
+            'status': analysis_data.get('status', 'pending'),
+            'created_at': analysis_data.get('created_at') or datetime.now().isoformat(),
+            'updated_at': datetime.now().isoformat(),
+            # Chave de idempotência das gravações em segundo plano (migração 005)
+            'persistence_ticket': analysis_data.get('persistence_ticket')
+        }
+        
+        # Campos JSON seguem como objetos (JSONB nativo, sem serializar em string)
+        for field in JSON_FIELDS:
+            if analysis_data.get(field) is not None:
+                insert_data[field] = analysis_data[field]
+        
+        # Remove campos None
+        return {k: v for k, v in insert_data.items() if v is not None}
+    
     def create_analysis(self, analysis_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Cria nova análise no banco"""
         try:
             # Prepara dados para inserção
-            insert_data = {
-                'nicho': analysis_data.get('segmento', ''),
-                'produto': analysis_data.get('produto', ''),
-                'descricao': analysis_data.get('descricao', ''),
-                'preco': analysis_data.get('preco'),
-                'publico': analysis_data.get('publico', ''),
-                'concorrentes': analysis_data.get('concorrentes', ''),
-                'dados_adicionais': analysis_data.get('dados_adicionais', ''),
-                'objetivo_receita': analysis_data.get('objetivo_receita'),
-                'orcamento_marketing': analysis_data.get('orcamento_marketing'),
-                'prazo_lancamento': analysis_data.get('prazo_lancamento', ''),
-                'status': 'pending',
-                'created_at': datetime.now().isoformat(),
-                'updated_at': datetime.now().isoformat()
-            }
-            
-            # Remove campos None
-            insert_data = {k: v for k, v in insert_data.items() if v is not None}
+            insert_data = self._build_insert_data(analysis_data)
             
             # Insere no banco
             result = self.client.table('analyses').insert(insert_data).execute()
             
             if result.data:
                 logger.info(f"Análise criada com ID: {result.data[0]['id']}")
+                self.invalidate_stats_cache()
                 return result.data[0]
             else:
                 logger.error("Erro ao criar análise: resultado vazio")
@@ -88,16 +247,16 @@ class DatabaseManager:
             # Adiciona timestamp de atualização
             update_data['updated_at'] = datetime.now().isoformat()
             
-            # Converte dados JSON para string se necessário
-            for key, value in update_data.items():
-                if isinstance(value, (dict, list)):
-                    update_data[key] = json.dumps(value, ensure_ascii=False)
+            # Dicts e listas vão no corpo JSON da requisição e são gravados como JSONB nativo
             
             # Atualiza no banco
             result = self.client.table('analyses').update(update_data).eq('id', analysis_id).execute()
             
             if result.data:
                 logger.info(f"Análise {analysis_id} atualizada com sucesso")
+                self._notify_change(analysis_id)
+                if 'status' in update_data:
+                    self.invalidate_stats_cache()
                 return True
             else:
                 logger.error(f"Erro ao atualizar análise {analysis_id}")
@@ -107,29 +266,100 @@ class DatabaseManager:
             logger.error(f"Erro ao atualizar análise {analysis_id}: {str(e)}")
             return False
     
-    def get_analysis(self, analysis_id: int) -> Optional[Dict[str, Any]]:
-        """Busca análise por ID"""
+    def create_analyses_bulk(self, analyses_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Cria várias análises em um único INSERT multi-linha
+
+        Ao contrário de create_analysis, propaga exceções (quem chama decide se reenvia).
+        """
+        if not analyses_data:
+            return []
+        
+        rows = self._build_bulk_rows(analyses_data)
+        
+        if not all(row.get('persistence_ticket') for row in rows):
+            result = self.client.table('analyses').insert(rows).execute()
+            if not result.data:
+                raise RuntimeError("Inserção em lote sem retorno")
+            records = result.data
+        else:
+            # Reenvio de um lote já gravado (ex.: spool) não duplica análises
+            result = self.client.table('analyses').upsert(
+                rows, on_conflict='persistence_ticket', ignore_duplicates=True
+            ).execute()
+            by_ticket = {record['persistence_ticket']: record for record in result.data or []}
+            
+            missing = [row['persistence_ticket'] for row in rows if row['persistence_ticket'] not in by_ticket]
+            if missing:
+                existing = self.client.table('analyses').select('*').in_('persistence_ticket', missing).execute()
+                by_ticket.update({record['persistence_ticket']: record for record in existing.data or []})
+            
+            records = [by_ticket[row['persistence_ticket']] for row in rows]
+        
+        logger.info(f"{len(records)} análises criadas em lote")
+        self.invalidate_stats_cache()
+        return records
+    
+    def update_analyses_bulk(self, updates: List[Tuple[int, Dict[str, Any]]]) -> List[int]:
+        """Aplica várias atualizações e retorna os IDs alterados (propaga exceções)
+
+        A API REST não tem UPDATE multi-linha com valores distintos: uma requisição por análise.
+        """
+        updated_at = datetime.now().isoformat()
+        updated_ids = []
+        status_changed = False
+        
+        for analysis_id, update_data in updates:
+            data = dict(update_data, updated_at=updated_at)
+            result = self.client.table('analyses').update(data).eq('id', analysis_id).execute()
+            if result.data:
+                updated_ids.append(analysis_id)
+                status_changed = status_changed or 'status' in data
+        
+        for analysis_id in updated_ids:
+            self._notify_change(analysis_id)
+        if status_changed:
+            self.invalidate_stats_cache()
+        
+        logger.info(f"{len(updated_ids)} análises atualizadas em lote")
+        return updated_ids
+    
+    def _build_bulk_rows(self, analyses_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Linhas de inserção com o mesmo conjunto de colunas (exigência do INSERT multi-linha)"""
+        rows = [self._build_insert_data(analysis_data) for analysis_data in analyses_data]
+        columns = [column for column in ANALYSIS_COLUMNS if any(column in row for row in rows)]
+        return [{column: row.get(column) for column in columns} for row in rows]
+    
+    def get_analysis(
+        self,
+        analysis_id: int,
+        fields: Optional[List[Tuple[str, List[str]]]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Busca análise por ID, opcionalmente apenas os campos/caminhos JSON pedidos"""
         try:
-            result = self.client.table('analyses').select('*').eq('id', analysis_id).execute()
+            if fields:
+                # Caminhos JSON viram seleções 'alias:coluna->a->b' do PostgREST
+                columns = ['id'] + [
+                    f"{field_alias(column, path)}:{'->'.join([column] + path)}" if path else column
+                    for column, path in fields
+                ]
+                select = ', '.join(dict.fromkeys(columns))
+            else:
+                select = '*'
+            
+            result = self.client.table('analyses').select(select).eq('id', analysis_id).execute()
             
             if result.data:
                 analysis = result.data[0]
                 
-                # Converte campos JSON de volta para objetos
-                json_fields = [
-                    'avatar_data', 'positioning_data', 'competition_data',
-                    'marketing_data', 'metrics_data', 'funnel_data',
-                    'market_intelligence', 'action_plan', 'comprehensive_analysis'
-                ]
-                
-                for field in json_fields:
+                # Linhas antigas podem ter JSON gravado como string (ver migração 004)
+                for field in JSON_FIELDS:
                     if analysis.get(field) and isinstance(analysis[field], str):
                         try:
                             analysis[field] = json.loads(analysis[field])
                         except json.JSONDecodeError:
                             pass
                 
-                return analysis
+                return nest_projection(analysis, fields) if fields else analysis
             else:
                 return None
                 
@@ -137,14 +367,51 @@ class DatabaseManager:
             logger.error(f"Erro ao buscar análise {analysis_id}: {str(e)}")
             return None
     
-    def list_analyses(self, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
-        """Lista análises com paginação"""
+    def get_analysis_by_ticket(self, ticket: str) -> Optional[Dict[str, Any]]:
+        """Busca ID e status da análise gravada pela fila de persistência"""
         try:
             result = self.client.table('analyses')\
-                .select('id, nicho, produto, status, created_at, updated_at')\
-                .order('created_at', desc=True)\
-                .range(offset, offset + limit - 1)\
+                .select('id, status, created_at')\
+                .eq('persistence_ticket', ticket)\
                 .execute()
+            return result.data[0] if result.data else None
+            
+        except Exception as e:
+            logger.error(f"Erro ao buscar análise do ticket {ticket}: {str(e)}")
+            return None
+    
+    def list_analyses(
+        self,
+        limit: int = 50,
+        offset: int = 0,
+        segmento: Optional[str] = None,
+        cursor: Optional[Tuple[str, int]] = None
+    ) -> List[Dict[str, Any]]:
+        """Lista análises com filtro por nicho e paginação por cursor (created_at, id)"""
+        try:
+            query = self.client.table('analyses')\
+                .select('id, nicho, produto, status, created_at, updated_at')
+            
+            if segmento:
+                query = query.ilike('nicho', f"%{escape_like(segmento)}%")
+            
+            # postgrest 0.13 não tem or_() e gera um parâmetro order por chamada de order():
+            # filtro e ordenação compostos vão direto nos parâmetros da requisição
+            if cursor:
+                created_at, row_id = cursor
+                query.params = query.params.add(
+                    'or',
+                    f'(created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{row_id}))'
+                )
+            
+            query.params = query.params.add('order', 'created_at.desc,id.desc')
+            
+            if cursor:
+                query = query.limit(limit)
+            else:
+                query = query.range(offset, offset + limit - 1)
+            
+            result = query.execute()
             
             return result.data if result.data else []
             
@@ -159,6 +426,8 @@ class DatabaseManager:
             
             if result.data:
                 logger.info(f"Análise {analysis_id} removida com sucesso")
+                self._notify_change(analysis_id)
+                self.invalidate_stats_cache()
                 return True
             else:
                 logger.error(f"Erro ao remover análise {analysis_id}")
@@ -169,7 +438,60 @@ class DatabaseManager:
             return False
     
     def get_stats(self) -> Dict[str, Any]:
-        """Retorna estatísticas do banco"""
+        """Retorna estatísticas do banco (cache em memória com TTL curto)"""
+        with self._stats_cache_lock:
+            cached = self._stats_cache
+        
+        if cached and cached[0] > time.monotonic():
+            return dict(cached[1])
+        
+        stats = self._fetch_stats()
+        
+        if 'error' not in stats:
+            with self._stats_cache_lock:
+                DatabaseManager._stats_cache = (time.monotonic() + self.stats_cache_ttl, stats)
+        
+        return dict(stats)
+    
+    @classmethod
+    def on_analysis_changed(cls, callback: Callable[[int], None]) -> None:
+        """Registra callback chamado após update/delete de uma análise (sem exigir conexão)"""
+        cls._change_listeners.append(callback)
+    
+    def _notify_change(self, analysis_id: int) -> None:
+        """Notifica callbacks sobre alteração de uma análise"""
+        for callback in self._change_listeners:
+            try:
+                callback(analysis_id)
+            except Exception as e:
+                logger.error(f"Erro ao notificar alteração da análise {analysis_id}: {str(e)}")
+    
+    def invalidate_stats_cache(self) -> None:
+        """Descarta estatísticas em cache após escrita"""
+        with self._stats_cache_lock:
+            DatabaseManager._stats_cache = None
+    
+    def _fetch_stats(self) -> Dict[str, Any]:
+        """Busca estatísticas agregadas no servidor (função get_analysis_stats)"""
+        if self._stats_function_available:
+            try:
+                result = self.client.rpc('get_analysis_stats', {}).execute()
+                stats = dict(result.data)
+                stats['timestamp'] = datetime.now().isoformat()
+                return stats
+                
+            except Exception as e:
+                # Apenas "função inexistente" desativa o RPC; falhas transitórias tentam de novo na próxima leitura
+                if getattr(e, 'code', None) in MISSING_FUNCTION_CODES:
+                    logger.warning(f"Função get_analysis_stats indisponível, usando consultas diretas: {str(e)}")
+                    DatabaseManager._stats_function_available = False
+                else:
+                    logger.error(f"Erro ao ler estatísticas via get_analysis_stats: {str(e)}")
+        
+        return self._fetch_stats_legacy()
+    
+    def _fetch_stats_legacy(self) -> Dict[str, Any]:
+        """Estatísticas via consultas REST (bancos sem a migração 002)"""
         try:
             # Total de análises
             total_result = self.client.table('analyses').select('id', count='exact').execute()
@@ -187,7 +509,6 @@ class DatabaseManager:
                     status_counts[status] = status_counts.get(status, 0) + 1
             
             # Análises recentes (últimos 7 dias)
-            from datetime import timedelta
             week_ago = (datetime.now() - timedelta(days=7)).isoformat()
             
             recent_result = self.client.table('analyses')\
@@ -213,6 +534,479 @@ class DatabaseManager:
                 'error': str(e)
             }
 
-# Instância global do gerenciador
-db_manager = DatabaseManager()
+class PostgresDatabaseManager(DatabaseManager):
+    """Mesma interface do DatabaseManager, com conexão direta ao PostgreSQL via pool
+
+    Usa DATABASE_URL (pooler do Supabase ou PostgreSQL local com as migrações aplicadas).
+    Consultas fixas são preparadas uma vez por conexão (PREPARE/EXECUTE). Desativado por
+    padrão no pooler em modo transação (porta 6543), que troca a conexão do servidor a
+    cada transação; DATABASE_PREPARED_STATEMENTS força o comportamento.
+    """
+    
+    def __init__(self, dsn: Optional[str] = None):
+        """Inicializa pool de conexões"""
+        self.dsn = dsn or os.getenv('DATABASE_URL')
+        if not self.dsn:
+            raise ValueError("DATABASE_URL não configurada")
+        
+        self.min_connections = int(os.getenv('DATABASE_POOL_MIN', 1))
+        self.max_connections = int(os.getenv('DATABASE_POOL_MAX', 10))
+        self.use_prepared = os.getenv(
+            'DATABASE_PREPARED_STATEMENTS', 'false' if self._uses_transaction_pooler() else 'true'
+        ).lower() == 'true'
+        
+        self.pool = ThreadedConnectionPool(self.min_connections, self.max_connections, self.dsn)
+        
+        # Nomes das consultas já preparadas em cada conexão do pool (descartado junto com a conexão)
+        self._prepared: 'weakref.WeakKeyDictionary[Any, set]' = weakref.WeakKeyDictionary()
+        self._prepared_lock = threading.Lock()
+    
+    def _uses_transaction_pooler(self) -> bool:
+        """Pooler do Supabase em modo transação (porta 6543) não mantém PREPARE entre transações"""
+        try:
+            return parse_dsn(self.dsn).get('port') == '6543'
+        except psycopg2.ProgrammingError:
+            return False
+    
+    @contextmanager
+    def _cursor(self) -> Iterator[RealDictCursor]:
+        """Empresta conexão do pool e devolve ao fim da transação"""
+        conn = self.pool.getconn()
+        broken = False
+        try:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                yield cursor
+            conn.commit()
+        except Exception as e:
+            broken = bool(conn.closed) or isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError))
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            if broken:
+                with self._prepared_lock:
+                    self._prepared.pop(conn, None)
+            self.pool.putconn(conn, close=broken)
+    
+    def _execute(self, cursor: RealDictCursor, name: str, query: str, params: Sequence[Any] = ()) -> None:
+        """Executa consulta, preparando-a na conexão na primeira vez"""
+        if not self.use_prepared:
+            cursor.execute(query, params)
+            return
+        
+        conn = cursor.connection
+        # Só é seguro desfazer e repetir se a consulta abre a transação
+        first_statement = conn.info.transaction_status == TRANSACTION_STATUS_IDLE
+        
+        with self._prepared_lock:
+            prepared = self._prepared.setdefault(conn, set())
+            needs_prepare = name not in prepared
+        
+        try:
+            self._prepare_and_execute(cursor, name, query, params, needs_prepare)
+        except (psycopg2.errors.InvalidSqlStatementName, psycopg2.errors.DuplicatePreparedStatement):
+            # Sessão do servidor não corresponde ao registro local (ex.: pooler, DISCARD ALL)
+            with self._prepared_lock:
+                prepared.clear()
+            if not first_statement:
+                raise
+            
+            conn.rollback()
+            logger.warning(f"Consulta preparada '{name}' ausente na conexão; preparando novamente")
+            cursor.execute('DEALLOCATE PREPARE ALL')
+            self._prepare_and_execute(cursor, name, query, params, True)
+        
+        with self._prepared_lock:
+            prepared.add(name)
+    
+    @staticmethod
+    def _prepare_and_execute(
+        cursor: RealDictCursor,
+        name: str,
+        query: str,
+        params: Sequence[Any],
+        prepare: bool
+    ) -> None:
+        """PREPARE (quando necessário) seguido de EXECUTE com os parâmetros"""
+        if prepare:
+            # Placeholders %s viram parâmetros posicionais $1..$n
+            counter = iter(range(1, len(params) + 1))
+            statement = re.sub(r'%s', lambda _: f'${next(counter)}', query)
+            cursor.execute(f'PREPARE {name} AS {statement}')
+        
+        if params:
+            cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+        else:
+            cursor.execute(f'EXECUTE {name}')
+    
+    def _adapt(self, column: str, value: Any) -> Any:
+        """Envia campos JSON como JSONB nativo"""
+        if column in JSON_FIELDS:
+            if isinstance(value, str):
+                try:
+                    value = json.loads(value)
+                except json.JSONDecodeError:
+                    pass
+            return Json(value)
+        return value
+    
+    def _row_to_dict(self, row: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Normaliza tipos do driver para o formato retornado pelo Supabase"""
+        if row is None:
+            return None
+        
+        result = {}
+        for key, value in row.items():
+            if isinstance(value, (datetime, date)):
+                value = value.isoformat()
+            elif isinstance(value, Decimal):
+                value = float(value)
+            result[key] = value
+        return result
+    
+    def _statement_name(self, prefix: str, columns: Sequence[str]) -> str:
+        """Nome estável de consulta preparada para um conjunto de colunas"""
+        mask = sum(1 << ANALYSIS_COLUMNS.index(column) for column in columns)
+        return f'{prefix}_{mask:x}'
+    
+    def test_connection(self) -> bool:
+        """Testa conexão com o banco"""
+        try:
+            with self._cursor() as cursor:
+                cursor.execute('SELECT 1')
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao testar conexão: {str(e)}")
+            return False
+    
+    def create_analysis(self, analysis_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Cria nova análise no banco"""
+        try:
+            insert_data = self._build_insert_data(analysis_data)
+            columns = [column for column in ANALYSIS_COLUMNS if column in insert_data]
+            
+            with self._cursor() as cursor:
+                query = sql.SQL('INSERT INTO analyses ({}) VALUES ({}) RETURNING *').format(
+                    sql.SQL(', ').join(map(sql.Identifier, columns)),
+                    sql.SQL(', ').join(sql.Placeholder() * len(columns))
+                ).as_string(cursor.connection)
+                
+                self._execute(
+                    cursor,
+                    self._statement_name('arqv_insert', columns),
+                    query,
+                    [self._adapt(column, insert_data[column]) for column in columns]
+                )
+                record = self._row_to_dict(cursor.fetchone())
+            
+            logger.info(f"Análise criada com ID: {record['id']}")
+            self.invalidate_stats_cache()
+            return record
+            
+        except Exception as e:
+            logger.error(f"Erro ao criar análise: {str(e)}")
+            return None
+    
+    def update_analysis(self, analysis_id: int, update_data: Dict[str, Any]) -> bool:
+        """Atualiza análise existente"""
+        try:
+            update_data['updated_at'] = datetime.now().isoformat()
+            
+            unknown = [column for column in update_data if column not in ANALYSIS_COLUMNS]
+            if unknown:
+                raise ValueError(f"Colunas inválidas: {', '.join(unknown)}")
+            
+            columns = [column for column in ANALYSIS_COLUMNS if column in update_data]
+            
+            with self._cursor() as cursor:
+                query = sql.SQL('UPDATE analyses SET {} WHERE id = %s RETURNING id').format(
+                    sql.SQL(', ').join(
+                        sql.SQL('{} = %s').format(sql.Identifier(column)) for column in columns
+                    )
+                ).as_string(cursor.connection)
+                
+                self._execute(
+                    cursor,
+                    self._statement_name('arqv_update', columns),
+                    query,
+                    [self._adapt(column, update_data[column]) for column in columns] + [analysis_id]
+                )
+                updated = cursor.fetchone()
+            
+            if updated:
+                logger.info(f"Análise {analysis_id} atualizada com sucesso")
+                self._notify_change(analysis_id)
+                if 'status' in update_data:
+                    self.invalidate_stats_cache()
+                return True
+            else:
+                logger.error(f"Erro ao atualizar análise {analysis_id}")
+                return False
+                
+        except Exception as e:
+            logger.error(f"Erro ao atualizar análise {analysis_id}: {str(e)}")
+            return False
+    
+    def create_analyses_bulk(self, analyses_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Cria várias análises em um único INSERT multi-linha (propaga exceções)"""
+        if not analyses_data:
+            return []
+        
+        rows = self._build_bulk_rows(analyses_data)
+        columns = list(rows[0].keys())
+        idempotent = all(row.get('persistence_ticket') for row in rows)
+        
+        with self._cursor() as cursor:
+            # Reenvio de um lote já gravado (ex.: spool) não duplica análises
+            query = sql.SQL('INSERT INTO analyses ({}) VALUES %s {} RETURNING *').format(
+                sql.SQL(', ').join(map(sql.Identifier, columns)),
+                sql.SQL('ON CONFLICT (persistence_ticket) DO NOTHING' if idempotent else '')
+            ).as_string(cursor.connection)
+            
+            records = execute_values(
+                cursor,
+                query,
+                [
+                    [None if row[column] is None else self._adapt(column, row[column]) for column in columns]
+                    for row in rows
+                ],
+                page_size=len(rows),
+                fetch=True
+            )
+            
+            if idempotent:
+                by_ticket = {record['persistence_ticket']: record for record in records}
+                missing = [row['persistence_ticket'] for row in rows if row['persistence_ticket'] not in by_ticket]
+                if missing:
+                    cursor.execute('SELECT * FROM analyses WHERE persistence_ticket = ANY(%s)', [missing])
+                    by_ticket.update({record['persistence_ticket']: record for record in cursor.fetchall()})
+                records = [by_ticket[row['persistence_ticket']] for row in rows]
+        
+        logger.info(f"{len(records)} análises criadas em lote")
+        self.invalidate_stats_cache()
+        return [self._row_to_dict(record) for record in records]
+    
+    def update_analyses_bulk(self, updates: List[Tuple[int, Dict[str, Any]]]) -> List[int]:
+        """Aplica várias atualizações com um UPDATE ... FROM (VALUES ...) por conjunto de colunas"""
+        updated_at = datetime.now().isoformat()
+        
+        # Agrupa por conjunto de colunas: cada grupo vira uma única instrução
+        groups: Dict[Tuple[str, ...], List[Tuple[int, Dict[str, Any]]]] = {}
+        for analysis_id, update_data in updates:
+            data = dict(update_data, updated_at=updated_at)
+            unknown = [column for column in data if column not in ANALYSIS_COLUMNS]
+            if unknown:
+                raise ValueError(f"Colunas inválidas: {', '.join(unknown)}")
+            columns = tuple(column for column in ANALYSIS_COLUMNS if column in data)
+            groups.setdefault(columns, []).append((analysis_id, data))
+        
+        updated_ids = []
+        status_changed = False
+        
+        with self._cursor() as cursor:
+            for columns, items in groups.items():
+                query = sql.SQL('UPDATE analyses AS a SET {} FROM (VALUES %s) AS v (id, {}) WHERE a.id = v.id RETURNING a.id').format(
+                    sql.SQL(', ').join(
+                        sql.SQL('{0} = v.{0}').format(sql.Identifier(column)) for column in columns
+                    ),
+                    sql.SQL(', ').join(map(sql.Identifier, columns))
+                ).as_string(cursor.connection)
+                
+                # Literais de VALUES chegam como texto: cast para o tipo de cada coluna
+                template = '(%s::integer, {})'.format(', '.join(
+                    f"%s::{ANALYSIS_COLUMN_TYPES.get(column, 'text')}" for column in columns
+                ))
+                
+                records = execute_values(
+                    cursor,
+                    query,
+                    [
+                        [analysis_id] + [
+                            None if data[column] is None else self._adapt(column, data[column])
+                            for column in columns
+                        ]
+                        for analysis_id, data in items
+                    ],
+                    template=template,
+                    page_size=len(items),
+                    fetch=True
+                )
+                updated_ids.extend(record['id'] for record in records)
+                status_changed = status_changed or 'status' in columns
+        
+        for analysis_id in updated_ids:
+            self._notify_change(analysis_id)
+        if status_changed:
+            self.invalidate_stats_cache()
+        
+        logger.info(f"{len(updated_ids)} análises atualizadas em lote")
+        return updated_ids
+    
+    def get_analysis(
+        self,
+        analysis_id: int,
+        fields: Optional[List[Tuple[str, List[str]]]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Busca análise por ID (JSONB já decodificado pelo driver)"""
+        try:
+            with self._cursor() as cursor:
+                if not fields:
+                    self._execute(cursor, 'arqv_get_analysis', 'SELECT * FROM analyses WHERE id = %s', [analysis_id])
+                    return self._row_to_dict(cursor.fetchone())
+                
+                # Projeção: caminhos JSON extraídos no servidor com #>
+                projections = [sql.Identifier('id')] + [
+                    sql.SQL('{} #> {} AS {}').format(
+                        sql.Identifier(column), sql.Literal(path), sql.Identifier(field_alias(column, path))
+                    ) if path else sql.Identifier(column)
+                    for column, path in fields
+                ]
+                cursor.execute(
+                    sql.SQL('SELECT {} FROM analyses WHERE id = %s').format(sql.SQL(', ').join(projections)),
+                    [analysis_id]
+                )
+                row = self._row_to_dict(cursor.fetchone())
+                return nest_projection(row, fields) if row else None
+                
+        except Exception as e:
+            logger.error(f"Erro ao buscar análise {analysis_id}: {str(e)}")
+            return None
+    
+    def get_analysis_by_ticket(self, ticket: str) -> Optional[Dict[str, Any]]:
+        """Busca ID e status da análise gravada pela fila de persistência"""
+        try:
+            with self._cursor() as cursor:
+                cursor.execute(
+                    'SELECT id, status, created_at FROM analyses WHERE persistence_ticket = %s', [ticket]
+                )
+                return self._row_to_dict(cursor.fetchone())
+                
+        except Exception as e:
+            logger.error(f"Erro ao buscar análise do ticket {ticket}: {str(e)}")
+            return None
+    
+    def list_analyses(
+        self,
+        limit: int = 50,
+        offset: int = 0,
+        segmento: Optional[str] = None,
+        cursor: Optional[Tuple[str, int]] = None
+    ) -> List[Dict[str, Any]]:
+        """Lista análises com filtro por nicho e paginação por cursor (created_at, id)"""
+        try:
+            conditions = []
+            params: List[Any] = []
+            
+            # ILIKE usa o índice trigram (migração 003)
+            if segmento:
+                conditions.append('nicho ILIKE %s')
+                params.append(f"%{escape_like(segmento)}%")
+            
+            # Keyset: custo constante em qualquer página
+            if cursor:
+                conditions.append('(created_at, id) < (%s::timestamptz, %s::integer)')
+                params.extend(cursor)
+            
+            query = 'SELECT id, nicho, produto, status, created_at, updated_at FROM analyses'
+            if conditions:
+                query += ' WHERE ' + ' AND '.join(conditions)
+            query += ' ORDER BY created_at DESC, id DESC LIMIT %s'
+            params.append(limit)
+            
+            if not cursor:
+                query += ' OFFSET %s'
+                params.append(offset)
+            
+            name = 'arqv_list_analyses' + ('_segment' if segmento else '') + ('_keyset' if cursor else '')
+            
+            with self._cursor() as db_cursor:
+                self._execute(db_cursor, name, query, params)
+                return [self._row_to_dict(row) for row in db_cursor.fetchall()]
+            
+        except Exception as e:
+            logger.error(f"Erro ao listar análises: {str(e)}")
+            return []
+    
+    def delete_analysis(self, analysis_id: int) -> bool:
+        """Remove análise do banco"""
+        try:
+            with self._cursor() as cursor:
+                self._execute(cursor, 'arqv_delete_analysis', 'DELETE FROM analyses WHERE id = %s RETURNING id', [analysis_id])
+                deleted = cursor.fetchone()
+            
+            if deleted:
+                logger.info(f"Análise {analysis_id} removida com sucesso")
+                self._notify_change(analysis_id)
+                self.invalidate_stats_cache()
+                return True
+            else:
+                logger.error(f"Erro ao remover análise {analysis_id}")
+                return False
+                
+        except Exception as e:
+            logger.error(f"Erro ao remover análise {analysis_id}: {str(e)}")
+            return False
+    
+    def _fetch_stats(self) -> Dict[str, Any]:
+        """Lê contadores mantidos por trigger (função get_analysis_stats)"""
+        if self._stats_function_available:
+            try:
+                with self._cursor() as cursor:
+                    self._execute(cursor, 'arqv_stats_counters', 'SELECT get_analysis_stats() AS stats')
+                    stats = dict(cursor.fetchone()['stats'])
+                
+                stats['timestamp'] = datetime.now().isoformat()
+                return stats
+                
+            except psycopg2.errors.UndefinedFunction:
+                logger.warning("Função get_analysis_stats indisponível, usando agregação GROUP BY")
+                DatabaseManager._stats_function_available = False
+            except Exception as e:
+                logger.error(f"Erro ao ler contadores de estatísticas: {str(e)}")
+        
+        return self._fetch_stats_legacy()
+    
+    def _fetch_stats_legacy(self) -> Dict[str, Any]:
+        """Estatísticas em uma única agregação (bancos sem a migração 002)"""
+        try:
+            week_ago = datetime.now() - timedelta(days=7)
+            
+            with self._cursor() as cursor:
+                self._execute(
+                    cursor,
+                    'arqv_stats',
+                    'SELECT status, COUNT(*) AS total, COUNT(*) FILTER (WHERE created_at >= %s) AS recent '
+                    'FROM analyses GROUP BY status',
+                    [week_ago]
+                )
+                rows = cursor.fetchall()
+            
+            return {
+                'total_analyses': sum(row['total'] for row in rows),
+                'status_counts': {row['status'] or 'unknown': row['total'] for row in rows},
+                'recent_analyses': sum(row['recent'] for row in rows),
+                'timestamp': datetime.now().isoformat()
+            }
+            
+        except Exception as e:
+            logger.error(f"Erro ao obter estatísticas: {str(e)}")
+            return {
+                'total_analyses': 0,
+                'status_counts': {},
+                'recent_analyses': 0,
+                'error': str(e)
+            }
+
+def create_database_manager() -> DatabaseManager:
+    """Cria gerenciador conforme DATABASE_BACKEND (supabase ou postgres)"""
+    backend = os.getenv('DATABASE_BACKEND', 'supabase').lower()
+    
+    if backend == 'postgres':
+        logger.info("Banco de dados: conexão direta PostgreSQL (pool psycopg2)")
+        return PostgresDatabaseManager()
+    
+    return DatabaseManager()
+
+# Instância global do gerenciador (conexão criada no primeiro uso)
+db_manager = service_registry.register('database', create_database_manager, fork_safe=False)
 
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Configuração do Gunicorn
+Aplicação pré-carregada no mestre; conexões, pools e filas recriados em cada worker
+
+Uso (a partir de src/):
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+import os
+import multiprocessing
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', 5000)}"
+
+# Processos para usar todos os núcleos; threads para as chamadas de rede das análises
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+
+# Pools de processos dos serviços dividem os núcleos do host entre os workers; com mais de
+# um worker o cache de análises é compartilhado via SQLite (ANALYSIS_CACHE_PATH, padrão src/data)
+os.environ['WEB_CONCURRENCY'] = str(workers)
+
+# Carrega wsgi:app no mestre antes do fork (memória somente leitura compartilhada)
+preload_app = True
+
+# Análise completa pode levar até 30 minutos (UltraRobustAnalyzer.max_analysis_time);
+# no reload/encerramento o worker espera as análises em andamento pelo mesmo prazo
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 1900))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', timeout))
+keepalive = 5
+
+# Reciclagem de workers desativada por padrão: o reinício interromperia análises longas
+# após graceful_timeout; com GUNICORN_MAX_REQUESTS > 0 mantenha graceful_timeout >= timeout
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+def post_fork(server, worker):
+    """Inicia recursos próprios do worker
+
+    Pools de processos/threads, conexões SQLite e clientes com conexões abertas já
+    foram descartados pelos hooks os.register_at_fork de cada serviço.
+    """
+    from services.persistence_queue import persistence_queue
+    persistence_queue.start()
+    server.log.info(f"Worker {worker.pid} iniciado")
+
+def worker_exit(server, worker):
+    """Grava operações pendentes e encerra pools do worker"""
+    from services.persistence_queue import persistence_queue
+    from services.attachment_jobs import attachment_job_manager
+    from services.pdf_extraction import pdf_extraction_engine
+    from services.pdf_render_service import pdf_render_service
+
+    persistence_queue.shutdown()
+    attachment_job_manager.shutdown()
+    pdf_extraction_engine.shutdown()
+    pdf_render_service.shutdown()
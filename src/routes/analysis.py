@@ -11,24 +11,37 @@ import time
 import json
 from datetime import datetime
 from typing import Dict, List, Optional, Any
-from flask import Blueprint, request, jsonify, session
-from database import db_manager
+from flask import Blueprint, request, jsonify, session, Response
+from database import db_manager, DatabaseManager, encode_cursor, decode_cursor, parse_fields, project_fields
 from services.gemini_client import gemini_client
 from services.deep_search_service import deep_search_service
 from services.attachment_service import attachment_service
+from services.document_chunker import document_chunker
 from services.websailor_integration import websailor_agent
 from services.enhanced_analysis_engine import enhanced_analysis_engine
+from services.attachment_jobs import attachment_job_manager, PENDING_STATUSES
+from services.analysis_cache import analysis_cache
+from services.artifact_store import artifact_store
+from services.persistence_queue import persistence_queue
+from services.analysis_deadline import AnalysisDeadline, deadline_timeout
 
 logger = logging.getLogger(__name__)
 
 # Cria blueprint
 analysis_bp = Blueprint('analysis', __name__)
 
+# Alterações no banco invalidam o cache de análises
+DatabaseManager.on_analysis_changed(lambda analysis_id: analysis_cache.invalidate(analysis_id))
+
 class UltraRobustAnalyzer:
     """Analisador Ultra-Robusto com implementação completa dos documentos"""
     
     def __init__(self):
         self.max_analysis_time = 1800  # 30 minutos para análise completa
+        self.consolidation_reserve_time = 60  # Reserva para sistemas avançados e consolidação
+        self.collection_time_share = 0.6  # Fração do tempo restante para coleta de dados
+        self.min_time_per_query = 30  # Tempo mínimo para iniciar uma nova query de pesquisa
+        self.attachment_wait_time = 120  # Espera máxima por anexos ainda em processamento
         self.deep_research_enabled = True
         self.multi_ai_enabled = True
         self.visual_proofs_enabled = True
@@ -43,25 +56,28 @@ class UltraRobustAnalyzer:
         """Gera análise ultra-abrangente implementando TODOS os documentos"""
         
         start_time = time.time()
+        deadline = AnalysisDeadline(self.max_analysis_time, self.consolidation_reserve_time)
         logger.info(f"🚀 INICIANDO ANÁLISE ULTRA-ROBUSTA para {data.get('segmento')}")
         
         try:
             # FASE 1: COLETA MASSIVA DE DADOS (5-10 minutos)
             logger.info("📊 FASE 1: Coleta massiva de dados...")
-            comprehensive_data = self._collect_ultra_comprehensive_data(data, session_id)
+            comprehensive_data = self._collect_ultra_comprehensive_data(
+                data, session_id, deadline.phase(self.collection_time_share)
+            )
             
             # FASE 2: ANÁLISE COM MÚLTIPLAS IAs (10-15 minutos)
-            logger.info("🧠 FASE 2: Análise com múltiplas IAs...")
-            multi_ai_analysis = self._run_multi_ai_ultra_analysis(data, comprehensive_data)
+            logger.info(f"🧠 FASE 2: Análise com múltiplas IAs ({deadline.remaining():.0f}s restantes)...")
+            multi_ai_analysis = self._run_multi_ai_ultra_analysis(data, comprehensive_data, deadline)
             
             # FASE 3: IMPLEMENTAÇÃO DOS SISTEMAS DOS DOCUMENTOS (5-10 minutos)
             logger.info("⚡ FASE 3: Implementação dos sistemas avançados...")
-            advanced_systems = self._implement_advanced_systems(data, multi_ai_analysis, comprehensive_data)
+            advanced_systems = self._implement_advanced_systems(data, multi_ai_analysis, comprehensive_data, deadline)
             
             # FASE 4: CONSOLIDAÇÃO FINAL ULTRA-DETALHADA
             logger.info("🎯 FASE 4: Consolidação final ultra-detalhada...")
             final_analysis = self._consolidate_ultra_analysis(
-                data, comprehensive_data, multi_ai_analysis, advanced_systems
+                data, comprehensive_data, multi_ai_analysis, advanced_systems, deadline
             )
             
             end_time = time.time()
@@ -82,9 +98,14 @@ class UltraRobustAnalyzer:
                 "research_iterations": comprehensive_data.get("research_iterations", 0),
                 "total_content_analyzed": comprehensive_data.get("total_content_length", 0),
                 "unique_insights_generated": len(final_analysis.get("insights_exclusivos_ultra", [])),
-                "systems_implemented": list(advanced_systems.keys())
+                "systems_implemented": list(advanced_systems.keys()),
+                "degraded": deadline.degraded,
+                "deadline": deadline.to_metadata()
             }
             
+            if deadline.degraded:
+                logger.warning(f"⚠️ Análise degradada por prazo: {', '.join(deadline.skipped_stages)}")
+            
             logger.info(f"✅ ANÁLISE ULTRA-ROBUSTA CONCLUÍDA em {processing_time:.2f} segundos")
             logger.info(f"📈 Quality Score: {final_analysis['metadata_ultra_detalhado']['quality_score']}")
             logger.info(f"🎯 Completeness Score: {final_analysis['metadata_ultra_detalhado']['completeness_score']}")
@@ -98,7 +119,8 @@ class UltraRobustAnalyzer:
     def _collect_ultra_comprehensive_data(
         self, 
         data: Dict[str, Any], 
-        session_id: Optional[str]
+        session_id: Optional[str],
+        deadline: Optional[AnalysisDeadline] = None
     ) -> Dict[str, Any]:
         """Coleta dados ultra-abrangentes de TODAS as fontes possíveis"""
         
@@ -117,15 +139,20 @@ class UltraRobustAnalyzer:
         # 1. PROCESSAMENTO ULTRA-DETALHADO DE ANEXOS
         if session_id:
             logger.info("📎 Processando anexos com análise ultra-detalhada...")
+            
+            # Aguarda apenas os anexos desta sessão ainda em processamento
+            if not attachment_job_manager.wait_for_session(
+                session_id, deadline_timeout(deadline, self.attachment_wait_time)
+            ) and deadline:
+                deadline.skip("pending_attachments")
+            
             attachments = attachment_service.get_session_attachments(session_id)
             if attachments:
-                combined_content = ""
                 attachment_analysis = {}
                 
                 for att in attachments:
                     if att.get("extracted_content"):
                         content = att["extracted_content"]
-                        combined_content += content + "\n\n"
                         
                         # Análise específica por tipo de anexo
                         content_type = att.get("content_type", "geral")
@@ -138,13 +165,19 @@ class UltraRobustAnalyzer:
                             "analysis": self._analyze_attachment_content(content, content_type)
                         })
                 
+                # Trechos mais relevantes de cada anexo, em vez de truncar o texto concatenado
+                retrieval = document_chunker.select_relevant(
+                    attachments, document_chunker.build_query(data), budget_chars=15000
+                )
+                
                 comprehensive_data["attachments"] = {
                     "count": len(attachments),
-                    "combined_content": combined_content[:15000],  # Aumentado para 15k
+                    "combined_content": retrieval["combined_content"],
+                    "chunks": retrieval["chunks"],
                     "types_analysis": attachment_analysis,
-                    "total_length": len(combined_content)
+                    "total_length": retrieval["total_length"]
                 }
-                comprehensive_data["total_content_length"] += len(combined_content)
+                comprehensive_data["total_content_length"] += retrieval["total_length"]
                 logger.info(f"✅ {len(attachments)} anexos processados com análise detalhada")
         
         # 2. PESQUISA WEB ULTRA-PROFUNDA COM WEBSAILOR
@@ -155,6 +188,10 @@ class UltraRobustAnalyzer:
             queries = self._generate_ultra_comprehensive_queries(data)
             
             for i, query in enumerate(queries):
+                if deadline and not deadline.has_time_for(self.min_time_per_query):
+                    deadline.skip(f"web_research_queries_{i+1}_to_{len(queries)}")
+                    break
+                
                 logger.info(f"🔍 Query {i+1}/{len(queries)}: {query}")
                 
                 web_result = websailor_agent.navigate_and_research(
@@ -166,7 +203,8 @@ class UltraRobustAnalyzer:
                     },
                     max_pages=12,  # Aumentado para pesquisa mais profunda
                     depth=3,  # Profundidade máxima
-                    aggressive_mode=True  # Modo agressivo ativado
+                    aggressive_mode=True,  # Modo agressivo ativado
+                    deadline=deadline
                 )
                 
                 comprehensive_data["web_research"][f"query_{i+1}"] = web_result
@@ -177,7 +215,7 @@ class UltraRobustAnalyzer:
                 research_content = web_result.get("research_summary", {}).get("combined_content", "")
                 comprehensive_data["total_content_length"] += len(research_content)
             
-            logger.info(f"✅ Pesquisa web concluída: {len(queries)} queries, {len(comprehensive_data['sources'])} fontes")
+            logger.info(f"✅ Pesquisa web concluída: {comprehensive_data['research_iterations']} queries, {len(comprehensive_data['sources'])} fontes")
         
         # 3. DEEP SEARCH COM MÚLTIPLAS ITERAÇÕES
         if deep_search_service and data.get("query"):
@@ -187,7 +225,8 @@ class UltraRobustAnalyzer:
             main_search = deep_search_service.perform_deep_search(
                 data["query"],
                 data,
-                max_results=20  # Aumentado para mais resultados
+                max_results=20,  # Aumentado para mais resultados
+                deadline=deadline
             )
             comprehensive_data["deep_search"]["main"] = main_search
             
@@ -200,10 +239,15 @@ class UltraRobustAnalyzer:
             ]
             
             for i, comp_query in enumerate(complementary_queries):
+                if deadline and not deadline.has_time_for(self.min_time_per_query):
+                    deadline.skip("deep_search_complementary")
+                    break
+                
                 comp_search = deep_search_service.perform_deep_search(
                     comp_query,
                     data,
-                    max_results=10
+                    max_results=10,
+                    deadline=deadline
                 )
                 comprehensive_data["deep_search"][f"complementary_{i+1}"] = comp_search
                 comprehensive_data["research_iterations"] += 1
@@ -225,428 +269,51 @@ class UltraRobustAnalyzer:
     def _run_multi_ai_ultra_analysis(
         self, 
         data: Dict[str, Any], 
-        comprehensive_data: Dict[str, Any]
+        comprehensive_data: Dict[str, Any],
+        deadline: Optional[AnalysisDeadline] = None
     ) -> Dict[str, Any]:
-        """Executa análise com múltiplas IAs de forma ultra-detalhada"""
-        
-        logger.info("🧠 Executando análise com múltiplas IAs...")
-        
-        ai_analyses = {}
-        
-        # 1. ANÁLISE PRINCIPAL COM GEMINI PRO (ULTRA-DETALHADA)
-        if gemini_client:
-            try:
-                logger.info("🤖 Executando análise Gemini Pro ultra-detalhada...")
-                gemini_analysis = self._run_ultra_gemini_analysis(data, comprehensive_data)
-                ai_analyses["gemini_ultra"] = gemini_analysis
-                logger.info("✅ Análise Gemini Pro ultra-detalhada concluída")
-            except Exception as e:
-                logger.error(f"❌ Erro na análise Gemini: {str(e)}")
-        
-        # 2. ANÁLISE COMPLEMENTAR COM HUGGINGFACE
-        try:
-            from services.huggingface_client import HuggingFaceClient
-            huggingface_client = HuggingFaceClient()
-            if huggingface_client.is_available():
-                logger.info("🤖 Executando análise HuggingFace complementar...")
-                hf_analysis = self._run_huggingface_ultra_analysis(data, comprehensive_data, huggingface_client)
-                ai_analyses["huggingface_ultra"] = hf_analysis
-                logger.info("✅ Análise HuggingFace concluída")
-        except Exception as e:
-            logger.warning(f"⚠️ HuggingFace não disponível: {str(e)}")
-        
-        # 3. ANÁLISE CRUZADA E VALIDAÇÃO
-        if len(ai_analyses) > 1:
-            logger.info("🔄 Executando análise cruzada entre IAs...")
-            cross_analysis = self._perform_cross_ai_analysis(ai_analyses)
-            ai_analyses["cross_validation"] = cross_analysis
+        """Executa análise com múltiplas IAs (Gemini limitado pelo prazo restante)"""
         
-        return ai_analyses
+        return enhanced_analysis_engine._run_multi_ai_ultra_analysis(data, comprehensive_data, deadline)
     
     def _implement_advanced_systems(
         self, 
         data: Dict[str, Any], 
         ai_analyses: Dict[str, Any], 
-        comprehensive_data: Dict[str, Any]
-    ) -> Dict[str, Any]:
-        """Implementa todos os sistemas avançados dos documentos"""
-        
-        logger.info("⚡ Implementando sistemas avançados...")
-        
-        advanced_systems = {}
-        
-        # 1. SISTEMA DE PROVAS VISUAIS INSTANTÂNEAS
-        logger.info("🎯 Implementando Sistema de Provas Visuais...")
-        advanced_systems["provas_visuais"] = self._implement_visual_proofs_system(
-            data, ai_analyses, comprehensive_data
-        )
-        
-        # 2. ARQUITETO DE DRIVERS MENTAIS
-        logger.info("🧠 Implementando Arquiteto de Drivers Mentais...")
-        advanced_systems["drivers_mentais"] = self._implement_mental_drivers_system(
-            data, ai_analyses, comprehensive_data
-        )
-        
-        # 3. PRÉ-PITCH INVISÍVEL
-        logger.info("🎭 Implementando Sistema de Pré-Pitch Invisível...")
-        advanced_systems["pre_pitch"] = self._implement_pre_pitch_system(
-            data, ai_analyses, comprehensive_data
-        )
-        
-        # 4. ENGENHARIA ANTI-OBJEÇÃO
-        logger.info("🛡️ Implementando Engenharia Anti-Objeção...")
-        advanced_systems["anti_objecao"] = self._implement_objection_handling_system(
-            data, ai_analyses, comprehensive_data
-        )
-        
-        # 5. SISTEMA DE ANCORAGEM PSICOLÓGICA
-        logger.info("⚓ Implementando Sistema de Ancoragem Psicológica...")
-        advanced_systems["ancoragem_psicologica"] = self._implement_psychological_anchoring(
-            data, ai_analyses, comprehensive_data
-        )
-        
-        return advanced_systems
-    
-    def _implement_visual_proofs_system(
-        self, 
-        data: Dict[str, Any], 
-        ai_analyses: Dict[str, Any], 
-        comprehensive_data: Dict[str, Any]
-    ) -> Dict[str, Any]:
-        """Implementa o Sistema Completo de Provas Visuais Instantâneas"""
-        
-        # Identifica conceitos que precisam de demonstração física
-        conceitos_abstratos = self._extract_abstract_concepts(data, ai_analyses)
-        
-        provas_visuais = {
-            "conceitos_identificados": conceitos_abstratos,
-            "provis_criadas": [],
-            "sequencia_otimizada": [],
-            "kit_implementacao": {}
-        }
-        
-        # Cria PROVIs para cada conceito
-        for i, conceito in enumerate(conceitos_abstratos, 1):
-            provi = {
-                "id": f"PROVI_{i:02d}",
-                "nome": self._generate_provi_name(conceito),
-                "conceito_alvo": conceito["conceito"],
-                "categoria": conceito["categoria"],
-                "prioridade": conceito["prioridade"],
-                "momento_ideal": conceito["momento"],
-                "objetivo_psicologico": self._define_psychological_objective(conceito),
-                "experimento": self._design_physical_experiment(conceito),
-                "analogia": self._create_perfect_analogy(conceito),
-                "roteiro_completo": self._create_complete_script(conceito),
-                "materiais": self._list_required_materials(conceito),
-                "variacoes": self._create_variations(conceito),
-                "gestao_riscos": self._create_risk_management(conceito),
-                "frases_impacto": self._generate_impact_phrases(conceito),
-                "dramatizacao": self._add_theatrical_elements(conceito)
-            }
-            provas_visuais["provis_criadas"].append(provi)
-        
-        # Cria sequência psicológica otimizada
-        provas_visuais["sequencia_otimizada"] = self._optimize_provi_sequence(
-            provas_visuais["provis_criadas"]
-        )
-        
-        # Gera kit de implementação
-        provas_visuais["kit_implementacao"] = {
-            "checklist_preparacao": self._create_preparation_checklist(provas_visuais["provis_criadas"]),
-            "timeline_execucao": self._create_execution_timeline(provas_visuais["sequencia_otimizada"]),
-            "script_transicoes": self._create_transition_scripts(provas_visuais["sequencia_otimizada"]),
-            "plano_contingencia": self._create_contingency_plan(provas_visuais["provis_criadas"])
-        }
-        
-        return provas_visuais
-    
-    def _implement_mental_drivers_system(
-        self, 
-        data: Dict[str, Any], 
-        ai_analyses: Dict[str, Any], 
-        comprehensive_data: Dict[str, Any]
-    ) -> Dict[str, Any]:
-        """Implementa o Sistema de Drivers Mentais com Ancoragem Psicológica"""
-        
-        # Analisa o avatar para identificar drivers mais eficazes
-        avatar_analysis = ai_analyses.get("gemini_ultra", {}).get("avatar_ultra_detalhado", {})
-        
-        drivers_system = {
-            "drivers_customizados": [],
-            "sequenciamento_estrategico": {},
-            "scripts_ativacao": {},
-            "loops_reforco": {}
-        }
-        
-        # Lista dos 19 drivers universais implementados
-        universal_drivers = [
-            "ferida_exposta", "trofeu_secreto", "inveja_produtiva", "relogio_psicologico",
-            "identidade_aprisionada", "custo_invisivel", "ambicao_expandida", "diagnostico_brutal",
-            "ambiente_vampiro", "mentor_salvador", "coragem_necessaria", "mecanismo_revelado",
-            "prova_matematica", "padrao_oculto", "excecao_possivel", "atalho_etico",
-            "decisao_binaria", "oportunidade_oculta", "metodo_vs_sorte"
-        ]
-        
-        # Seleciona e customiza os 7 drivers mais poderosos para este contexto
-        selected_drivers = self._select_optimal_drivers(universal_drivers, avatar_analysis, data)
-        
-        for driver_name in selected_drivers:
-            customized_driver = self._customize_mental_driver(
-                driver_name, avatar_analysis, data, comprehensive_data
-            )
-            drivers_system["drivers_customizados"].append(customized_driver)
-        
-        # Cria sequenciamento estratégico
-        drivers_system["sequenciamento_estrategico"] = self._create_strategic_sequencing(
-            drivers_system["drivers_customizados"]
-        )
-        
-        # Gera scripts de ativação
-        drivers_system["scripts_ativacao"] = self._generate_activation_scripts(
-            drivers_system["drivers_customizados"]
-        )
-        
-        # Cria loops de reforço
-        drivers_system["loops_reforco"] = self._create_reinforcement_loops(
-            drivers_system["drivers_customizados"]
-        )
-        
-        return drivers_system
-    
-    def _implement_pre_pitch_system(
-        self, 
-        data: Dict[str, Any], 
-        ai_analyses: Dict[str, Any], 
-        comprehensive_data: Dict[str, Any]
-    ) -> Dict[str, Any]:
-        """Implementa o Sistema de Pré-Pitch Invisível"""
-        
-        drivers_mentais = ai_analyses.get("gemini_ultra", {}).get("drivers_mentais_customizados", [])
-        
-        pre_pitch_system = {
-            "orquestracao_emocional": {},
-            "justificacao_logica": {},
-            "roteiro_completo": {},
-            "adaptacoes_formato": {}
-        }
-        
-        # Seleciona os 5-7 drivers mais poderosos
-        selected_drivers = self._select_pre_pitch_drivers(drivers_mentais)
-        
-        # Cria orquestração emocional (70% do tempo)
-        pre_pitch_system["orquestracao_emocional"] = {
-            "sequencia_psicologica": [
-                {"fase": "QUEBRA", "objetivo": "Destruir ilusão confortável", "tempo": "15%"},
-                {"fase": "EXPOSICAO", "objetivo": "Revelar ferida real", "tempo": "15%"},
-                {"fase": "INDIGNACAO", "objetivo": "Criar revolta produtiva", "tempo": "15%"},
-                {"fase": "VISLUMBRE", "objetivo": "Mostrar o possível", "tempo": "10%"},
-                {"fase": "TENSAO", "objetivo": "Amplificar o gap", "tempo": "10%"},
-                {"fase": "NECESSIDADE", "objetivo": "Tornar mudança inevitável", "tempo": "5%"}
-            ],
-            "drivers_por_fase": self._map_drivers_to_phases(selected_drivers),
-            "narrativas_conectoras": self._create_connecting_narratives(selected_drivers)
-        }
-        
-        # Cria justificação lógica (30% do tempo)
-        pre_pitch_system["justificacao_logica"] = {
-            "numeros_irrefutaveis": self._gather_irrefutable_numbers(comprehensive_data),
-            "calculos_roi": self._create_roi_calculations(data),
-            "demonstracoes_passo_a_passo": self._create_step_by_step_demos(data),
-            "cases_metricas": self._extract_case_studies_with_metrics(comprehensive_data),
-            "garantias_risco_zero": self._design_risk_elimination_guarantees(data)
-        }
-        
-        # Cria roteiro completo
-        pre_pitch_system["roteiro_completo"] = self._create_complete_pre_pitch_script(
-            pre_pitch_system["orquestracao_emocional"],
-            pre_pitch_system["justificacao_logica"],
-            data
-        )
-        
-        # Adaptações por formato
-        formats = ["webinario", "evento_presencial", "cpl", "lives_aquecimento"]
-        for format_type in formats:
-            pre_pitch_system["adaptacoes_formato"][format_type] = self._adapt_pre_pitch_for_format(
-                pre_pitch_system["roteiro_completo"], format_type
-            )
-        
-        return pre_pitch_system
-    
-    def _implement_objection_handling_system(
-        self, 
-        data: Dict[str, Any], 
-        ai_analyses: Dict[str, Any], 
-        comprehensive_data: Dict[str, Any]
-    ) -> Dict[str, Any]:
-        """Implementa a Engenharia Psicológica Anti-Objeção"""
-        
-        avatar_data = ai_analyses.get("gemini_ultra", {}).get("avatar_ultra_detalhado", {})
-        
-        objection_system = {
-            "objecoes_universais": {},
-            "objecoes_ocultas": {},
-            "arsenal_drives": {},
-            "sistema_implementacao": {},
-            "arsenal_emergencia": {}
-        }
-        
-        # Identifica objeções universais
-        objection_system["objecoes_universais"] = {
-            "tempo": self._analyze_time_objections(avatar_data),
-            "dinheiro": self._analyze_money_objections(avatar_data),
-            "confianca": self._analyze_trust_objections(avatar_data)
-        }
-        
-        # Identifica objeções ocultas
-        objection_system["objecoes_ocultas"] = {
-            "autossuficiencia": self._detect_self_sufficiency_objection(avatar_data),
-            "sinal_fraqueza": self._detect_weakness_signal_objection(avatar_data),
-            "medo_novo": self._detect_change_fear_objection(avatar_data),
-            "prioridades_desequilibradas": self._detect_priority_imbalance_objection(avatar_data),
-            "autoestima_destruida": self._detect_low_self_esteem_objection(avatar_data)
-        }
-        
-        # Cria arsenal de drives mentais anti-objeção
-        objection_system["arsenal_drives"] = {
-            "elevacao_prioridade": self._create_priority_elevation_drives(data),
-            "justificacao_investimento": self._create_investment_justification_drives(data),
-            "construcao_confianca": self._create_trust_building_drives(data),
-            "neutralizacao_ocultas": self._create_hidden_objection_neutralizers(data)
-        }
-        
-        # Sistema de implementação estratégica
-        objection_system["sistema_implementacao"] = {
-            "mapeamento_estagios": self._map_objections_to_launch_stages(),
-            "personalizacao_perfis": self._create_objection_personas(avatar_data),
-            "scripts_templates": self._create_objection_handling_scripts()
-        }
-        
-        # Arsenal de emergência
-        objection_system["arsenal_emergencia"] = {
-            "objecoes_ultima_hora": self._create_last_minute_objection_handlers(),
-            "kit_primeiros_socorros": self._create_objection_first_aid_kit(),
-            "diagnostico_rapido": self._create_rapid_objection_diagnosis()
-        }
-        
-        return objection_system
-    
-    def _implement_psychological_anchoring(
-        self, 
-        data: Dict[str, Any], 
-        ai_analyses: Dict[str, Any], 
-        comprehensive_data: Dict[str, Any]
+        comprehensive_data: Dict[str, Any],
+        deadline: Optional[AnalysisDeadline] = None
     ) -> Dict[str, Any]:
-        """Implementa Sistema de Ancoragem Psicológica"""
-        
-        anchoring_system = {
-            "ancoras_emocionais": [],
-            "ancoras_logicas": [],
-            "sequencia_instalacao": {},
-            "loops_reativacao": {},
-            "metricas_eficacia": {}
-        }
-        
-        # Cria âncoras emocionais baseadas nas dores e desejos
-        avatar_data = ai_analyses.get("gemini_ultra", {}).get("avatar_ultra_detalhado", {})
-        dores = avatar_data.get("dores_especificas", [])
-        desejos = avatar_data.get("desejos_profundos", [])
-        
-        for dor in dores:
-            ancora_emocional = {
-                "tipo": "dor",
-                "gatilho": dor,
-                "frase_ancoragem": self._create_pain_anchor_phrase(dor),
-                "momento_instalacao": "abertura_diagnostico",
-                "reativacao": self._create_pain_reactivation_triggers(dor)
-            }
-            anchoring_system["ancoras_emocionais"].append(ancora_emocional)
-        
-        for desejo in desejos:
-            ancora_emocional = {
-                "tipo": "desejo",
-                "gatilho": desejo,
-                "frase_ancoragem": self._create_desire_anchor_phrase(desejo),
-                "momento_instalacao": "desenvolvimento_vislumbre",
-                "reativacao": self._create_desire_reactivation_triggers(desejo)
-            }
-            anchoring_system["ancoras_emocionais"].append(ancora_emocional)
-        
-        # Cria âncoras lógicas baseadas em dados e provas
-        market_data = comprehensive_data.get("market_intelligence", {})
-        for key, value in market_data.items():
-            ancora_logica = {
-                "tipo": "prova",
-                "dados": value,
-                "frase_ancoragem": self._create_logical_anchor_phrase(key, value),
-                "momento_instalacao": "justificacao_logica",
-                "reativacao": self._create_logical_reactivation_triggers(key, value)
-            }
-            anchoring_system["ancoras_logicas"].append(ancora_logica)
+        """Implementa os sistemas avançados dos documentos (descartados quando o prazo acaba)"""
         
-        # Define sequência de instalação
-        anchoring_system["sequencia_instalacao"] = self._create_anchor_installation_sequence(
-            anchoring_system["ancoras_emocionais"],
-            anchoring_system["ancoras_logicas"]
+        return enhanced_analysis_engine._implement_document_systems(
+            data, ai_analyses, comprehensive_data, deadline
         )
-        
-        # Cria loops de reativação
-        anchoring_system["loops_reativacao"] = self._create_anchor_reactivation_loops(
-            anchoring_system["ancoras_emocionais"] + anchoring_system["ancoras_logicas"]
-        )
-        
-        return anchoring_system
     
     def _consolidate_ultra_analysis(
         self, 
         data: Dict[str, Any], 
         comprehensive_data: Dict[str, Any], 
         ai_analyses: Dict[str, Any], 
-        advanced_systems: Dict[str, Any]
+        advanced_systems: Dict[str, Any],
+        deadline: Optional[AnalysisDeadline] = None
     ) -> Dict[str, Any]:
-        """Consolida toda a análise ultra-detalhada"""
+        """Consolida toda a análise ultra-detalhada (etapas opcionais respeitam o prazo)"""
         
-        # Usa análise principal do Gemini como base
-        main_analysis = ai_analyses.get("gemini_ultra", {})
+        ultra_analysis = enhanced_analysis_engine._consolidate_ultra_analyses(
+            data, comprehensive_data, ai_analyses, advanced_systems, deadline
+        )
         
-        # Enriquece com sistemas avançados
-        ultra_analysis = {
-            # Análise base do Gemini (enriquecida)
-            **main_analysis,
-            
-            # Sistemas avançados implementados
-            "sistema_provas_visuais": advanced_systems.get("provas_visuais", {}),
-            "sistema_drivers_mentais": advanced_systems.get("drivers_mentais", {}),
-            "sistema_pre_pitch": advanced_systems.get("pre_pitch", {}),
-            "sistema_anti_objecao": advanced_systems.get("anti_objecao", {}),
-            "sistema_ancoragem": advanced_systems.get("ancoragem_psicologica", {}),
-            
-            # Inteligência de mercado ultra-detalhada
-            "inteligencia_mercado_ultra": comprehensive_data.get("market_intelligence", {}),
-            "analise_concorrencia_ultra": comprehensive_data.get("competitor_analysis", {}),
-            "analise_tendencias_ultra": comprehensive_data.get("trend_analysis", {}),
-            
-            # Insights exclusivos ultra-profundos
-            "insights_exclusivos_ultra": self._generate_ultra_exclusive_insights(
-                comprehensive_data, ai_analyses, advanced_systems
-            ),
-            
-            # Plano de implementação completo
-            "plano_implementacao_completo": self._create_complete_implementation_plan(
+        # Cronograma e monitoramento são opcionais: descartados se a reserva de consolidação acabou
+        if deadline and deadline.overrun():
+            deadline.skip("timeline_365_days")
+            deadline.skip("monitoring_system")
+        else:
+            ultra_analysis["cronograma_365_dias"] = enhanced_analysis_engine._create_ultra_detailed_timeline(
                 data, advanced_systems
-            ),
-            
-            # Métricas de sucesso avançadas
-            "metricas_sucesso_avancadas": self._create_advanced_success_metrics(
-                data, main_analysis
-            ),
-            
-            # Cronograma detalhado de 365 dias
-            "cronograma_365_dias": self._create_365_day_timeline(data, advanced_systems),
-            
-            # Sistema de monitoramento e otimização
-            "sistema_monitoramento": self._create_monitoring_system(data, main_analysis)
-        }
+            )
+            ultra_analysis["sistema_monitoramento"] = enhanced_analysis_engine._create_ultra_monitoring_system(
+                data, ultra_analysis
+            )
         
         return ultra_analysis
     
@@ -849,7 +516,7 @@ def analyze_market():
         # Salva no banco de dados
         if result and 'error' not in result:
             try:
-                analysis_record = db_manager.create_analysis({
+                analysis_payload = {
                     'segmento': data.get('segmento'),
                     'produto': data.get('produto'),
                     'preco': data.get('preco_float'),
@@ -859,8 +526,26 @@ def analyze_market():
                     'objetivo_receita': data.get('objetivo_receita_float'),
                     'orcamento_marketing': data.get('orcamento_marketing_float'),
                     'prazo_lancamento': data.get('prazo_lancamento'),
-                    'comprehensive_analysis': result
-                })
+                    'status': 'completed',
+                    # Conteúdo bruto de pesquisa vai para o armazenamento de artefatos
+                    'comprehensive_analysis': artifact_store.externalize(result) if artifact_store.enabled else result
+                }
+                
+                if persistence_queue.enabled:
+                    # Gravação em segundo plano: a resposta não espera o commit no banco
+                    ticket = persistence_queue.enqueue_create(analysis_payload)
+                    logger.info(f"💾 Análise enfileirada para gravação (ticket {ticket})")
+                    logger.info("🎉 Análise ultra-robusta concluída com sucesso!")
+                    return jsonify({
+                        **result,
+                        'persistence': {
+                            'status': 'queued',
+                            'ticket': ticket,
+                            'status_url': f'/api/analyses/ticket/{ticket}'
+                        }
+                    })
+                
+                analysis_record = db_manager.create_analysis(analysis_payload)
                 
                 if analysis_record:
                     result['database_id'] = analysis_record['id']
@@ -917,6 +602,66 @@ def upload_attachment():
             'error': f'Erro interno: {str(e)}'
         }), 500
 
+@analysis_bp.route('/upload_attachments', methods=['POST'])
+def upload_attachments():
+    """Upload de múltiplos anexos com processamento em segundo plano"""
+
+    try:
+        files = [file for file in request.files.getlist('files') if file and file.filename]
+        session_id = request.form.get('session_id', 'default_session')
+
+        if not files:
+            return jsonify({
+                'success': False,
+                'error': 'Nenhum arquivo enviado'
+            }), 400
+
+        # Enfileira cada arquivo; a extração ocorre nos workers
+        jobs = [attachment_job_manager.submit(file, session_id) for file in files]
+        logger.info(f"📎 {len(jobs)} anexos enfileirados para a sessão {session_id}")
+
+        return jsonify({
+            'success': True,
+            'session_id': session_id,
+            'jobs': jobs
+        }), 202
+
+    except Exception as e:
+        logger.error(f"❌ Erro no upload em lote: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': f'Erro interno: {str(e)}'
+        }), 500
+
+@analysis_bp.route('/attachment_jobs/<job_id>', methods=['GET'])
+def get_attachment_job(job_id):
+    """Status do processamento de um anexo"""
+
+    job = attachment_job_manager.get_job(job_id)
+    if not job:
+        return jsonify({
+            'error': 'Job não encontrado'
+        }), 404
+
+    return jsonify(job)
+
+@analysis_bp.route('/attachment_jobs', methods=['GET'])
+def list_attachment_jobs():
+    """Status do processamento dos anexos de uma sessão"""
+
+    session_id = request.args.get('session_id')
+    if not session_id:
+        return jsonify({
+            'error': 'session_id obrigatório'
+        }), 400
+
+    jobs = attachment_job_manager.get_session_jobs(session_id)
+    return jsonify({
+        'session_id': session_id,
+        'jobs': jobs,
+        'pending': sum(1 for job in jobs if job['status'] in PENDING_STATUSES)
+    })
+
 @analysis_bp.route('/deep_search', methods=['POST'])
 def perform_deep_search():
     """Executa busca profunda na internet"""
@@ -960,18 +705,29 @@ def list_analyses():
         limit = min(int(request.args.get('limit', 20)), 100)
         offset = int(request.args.get('offset', 0))
         segmento = request.args.get('segmento')
+        cursor_param = request.args.get('cursor')
         
-        analyses = db_manager.list_analyses(limit, offset)
+        # Paginação por cursor (keyset) tem precedência sobre offset
+        cursor = None
+        if cursor_param:
+            try:
+                cursor = decode_cursor(cursor_param)
+            except ValueError as e:
+                return jsonify({
+                    'error': 'Cursor inválido',
+                    'message': str(e)
+                }), 400
+            offset = 0
         
-        # Filtra por segmento se especificado
-        if segmento:
-            analyses = [a for a in analyses if segmento.lower() in a.get('nicho', '').lower()]
+        # Filtro por segmento aplicado no banco
+        analyses = db_manager.list_analyses(limit, offset, segmento=segmento, cursor=cursor)
         
         return jsonify({
             'analyses': analyses,
             'count': len(analyses),
             'limit': limit,
-            'offset': offset
+            'offset': offset,
+            'next_cursor': encode_cursor(analyses[-1]) if len(analyses) == limit else None
         })
         
     except Exception as e:
@@ -983,23 +739,138 @@ def list_analyses():
 
 @analysis_bp.route('/analyses/<int:analysis_id>', methods=['GET'])
 def get_analysis(analysis_id):
-    """Obtém análise específica"""
+    """Obtém análise específica (?fields=nicho,comprehensive_analysis.avatar_ultra_detalhado&expand=artifacts)"""
     
     try:
-        analysis = db_manager.get_analysis(analysis_id)
+        fields = None
+        fields_param = request.args.get('fields', '')
+        expand_artifacts = request.args.get('expand') == 'artifacts'
+        if fields_param:
+            try:
+                fields = parse_fields(fields_param)
+            except ValueError as e:
+                return jsonify({
+                    'error': 'Campos inválidos',
+                    'message': str(e)
+                }), 400
+            
+            # updated_at sempre projetado: base do ETag
+            if ('updated_at', []) not in fields:
+                fields.append(('updated_at', []))
+        
+        variant = fields_param + ('|artifacts' if expand_artifacts else '')
+        
+        # Análises concluídas vêm do cache (inclusive projeções)
+        entry = analysis_cache.get(analysis_id)
+        if entry:
+            analysis = entry['analysis']
+        elif request.if_none_match:
+            # Revalidação sem cache local: confere só o updated_at antes de buscar a análise completa
+            version = db_manager.get_analysis(analysis_id, fields=[('updated_at', [])])
+            if not version:
+                return jsonify({
+                    'error': 'Análise não encontrada',
+                    'message': f'Análise com ID {analysis_id} não existe'
+                }), 404
+            
+            etag = analysis_cache.build_etag(analysis_id, version.get('updated_at'), variant)
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = 'no-cache'
+                return response
+        
+        if not entry:
+            analysis = db_manager.get_analysis(analysis_id, fields=fields)
+            
+            if not analysis:
+                return jsonify({
+                    'error': 'Análise não encontrada',
+                    'message': f'Análise com ID {analysis_id} não existe'
+                }), 404
+            
+            if not fields:
+                entry = analysis_cache.put(analysis)
+        
+        etag = analysis_cache.build_etag(analysis_id, analysis.get('updated_at'), variant)
+        
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        elif expand_artifacts:
+            # Resolve referências para o conteúdo bruto armazenado
+            source = project_fields(entry['analysis'], fields) if entry and fields else analysis
+            response = jsonify(artifact_store.hydrate(source))
+        elif entry and fields:
+            response = jsonify(project_fields(entry['analysis'], fields))
+        elif entry:
+            # Corpo já serializado no cache
+            response = Response(entry['body'], mimetype='application/json')
+        else:
+            response = jsonify(analysis)
         
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+        
+    except Exception as e:
+        logger.error(f"❌ Erro ao obter análise {analysis_id}: {str(e)}")
+        return jsonify({
+            'error': 'Erro ao obter análise',
+            'message': str(e)
+        }), 500
+
+@analysis_bp.route('/analyses/ticket/<ticket>', methods=['GET'])
+def get_analysis_by_ticket(ticket):
+    """ID da análise gravada em segundo plano a partir do ticket retornado por /api/analyze"""
+    
+    try:
+        analysis = db_manager.get_analysis_by_ticket(ticket)
         if not analysis:
+            # Ainda na fila de persistência (ou ticket inexistente): o cliente tenta novamente
             return jsonify({
-                'error': 'Análise não encontrada',
-                'message': f'Análise com ID {analysis_id} não existe'
+                'ticket': ticket,
+                'status': 'pending',
+                'message': 'Análise ainda não gravada no banco'
             }), 404
         
-        return jsonify(analysis)
+        return jsonify({
+            'ticket': ticket,
+            'status': 'saved',
+            'database_id': analysis['id'],
+            'analysis_status': analysis.get('status'),
+            'created_at': analysis.get('created_at')
+        })
         
     except Exception as e:
-        logger.error(f"❌ Erro ao obter análise {analysis_id}: {str(e)}")
+        logger.error(f"❌ Erro ao consultar ticket {ticket}: {str(e)}")
         return jsonify({
-            'error': 'Erro ao obter análise',
+            'error': 'Erro ao consultar ticket',
+            'message': str(e)
+        }), 500
+
+@analysis_bp.route('/artifacts/<digest>', methods=['GET'])
+def get_artifact(digest):
+    """Obtém artefato bruto de pesquisa referenciado por uma análise"""
+    
+    try:
+        artifact = artifact_store.get(digest)
+        
+        if artifact is None:
+            return jsonify({
+                'error': 'Artefato não encontrado',
+                'message': f'Artefato {digest} não existe'
+            }), 404
+        
+        # Conteúdo endereçado por hash é imutável
+        response = jsonify(artifact)
+        response.set_etag(digest)
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+        return response
+        
+    except Exception as e:
+        logger.error(f"❌ Erro ao obter artefato {digest}: {str(e)}")
+        return jsonify({
+            'error': 'Erro ao obter artefato',
             'message': str(e)
         }), 500
 
@@ -28,9 +28,8 @@ logger = logging.getLogger(__name__)
 from routes.analysis import analysis_bp
 from routes.user import user_bp
 from routes.pdf_generator import pdf_bp
-from services.gemini_client import GeminiClient
-from services.deep_search_service import DeepSearchService
-from services.attachment_service import AttachmentService
+from services.service_registry import service_registry, ServiceUnavailableError
+from services.persistence_queue import persistence_queue
 
 def create_app():
     """Cria e configura a aplicação Flask"""
@@ -87,8 +86,14 @@ def create_app():
                     'gemini': {'available': gemini_available},
                     'deepseek': {'available': deepseek_available},
                     'supabase': {'available': supabase_available},
-                    'attachments': {'available': True}
+                    'attachments': {'available': True},
+                    'persistence': {
+                        'write_behind': persistence_queue.enabled,
+                        'pending': persistence_queue.pending()
+                    }
                 },
+                # Estado de inicialização de cada serviço (sem forçar a criação)
+                'service_health': service_registry.health(),
                 'environment': {
                     'python_version': sys.version,
                     'flask_env': os.getenv('FLASK_ENV', 'production')
@@ -101,6 +106,19 @@ def create_app():
                 'message': str(e)
             }), 500
     
+    # Serviço obrigatório sem configuração/conexão
+    @app.errorhandler(ServiceUnavailableError)
+    def handle_service_unavailable(e):
+        """Handler para serviços indisponíveis"""
+        logger.error(f"Serviço indisponível: {str(e)}")
+        
+        return jsonify({
+            'error': 'Serviço indisponível',
+            'service': e.service_name,
+            'message': e.error if app.debug else 'Serviço temporariamente indisponível',
+            'timestamp': datetime.now().isoformat()
+        }), 503
+    
     # Handler de erro global
     @app.errorhandler(Exception)
     def handle_exception(e):
@@ -139,6 +157,10 @@ def main():
         logger.info(f"Iniciando ARQV30 Enhanced v2.0")
         logger.info(f"Servidor: http://{host}:{port}")
         logger.info(f"Debug: {debug}")
+        logger.info("Servidor de desenvolvimento; em produção use: gunicorn -c gunicorn.conf.py wsgi:app")
+        
+        # Gravação em segundo plano (reprocessa o spool de execuções anteriores)
+        persistence_queue.start()
         
         # Inicia o servidor
         app.run(
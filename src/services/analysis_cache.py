@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Cache de Análises Concluídas
+LRU em memória com camada opcional compartilhada entre workers (SQLite local)
+"""
+
+import os
+import json
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional, Any
+from services.process_pools import web_workers
+from services.service_registry import service_registry
+
+logger = logging.getLogger(__name__)
+
+class AnalysisCache:
+    """Cache read-through de análises concluídas (imutáveis)"""
+
+    def __init__(self, max_entries: Optional[int] = None, shared_path: Optional[str] = None):
+        """Inicializa LRU e, se configurado, o cache compartilhado"""
+        self.max_entries = max_entries or int(os.getenv('ANALYSIS_CACHE_MAX_ENTRIES', 128))
+        self.shared_path = shared_path or os.getenv('ANALYSIS_CACHE_PATH')
+
+        # Invalidação só chega aos outros workers pelo cache compartilhado: com mais de um
+        # worker, o SQLite compartilhado fica em src/data por padrão
+        if not self.shared_path and web_workers() > 1:
+            self.shared_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'analysis_cache.db')
+
+        self.enabled = os.getenv('ANALYSIS_CACHE_ENABLED', 'true').lower() == 'true'
+
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        if self.enabled and self.shared_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.shared_path)), exist_ok=True)
+            with self._shared_connection() as conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS analysis_cache (
+                        analysis_id INTEGER PRIMARY KEY,
+                        updated_at TEXT NOT NULL,
+                        payload TEXT NOT NULL,
+                        stored_at TEXT NOT NULL
+                    )
+                """)
+
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self) -> None:
+        """Novas conexões e lock no processo filho; as entradas em memória continuam válidas"""
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _shared_connection(self) -> sqlite3.Connection:
+        """Conexão da thread atual com o cache compartilhado"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.shared_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def build_etag(analysis_id: Any, updated_at: Any, variant: str = '') -> str:
+        """ETag forte derivado do ID, do updated_at e da variante (projeção)"""
+        digest = hashlib.sha256(f"{analysis_id}|{updated_at}|{variant}".encode('utf-8')).hexdigest()
+        return f"{analysis_id}-{digest[:20]}"
+
+    @staticmethod
+    def is_cacheable(analysis: Dict[str, Any]) -> bool:
+        """Apenas análises concluídas são cacheadas"""
+        return analysis.get('status') == 'completed' and bool(analysis.get('updated_at'))
+
+    def get(self, analysis_id: int) -> Optional[Dict[str, Any]]:
+        """Busca entrada (análise, corpo serializado e ETag)"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(analysis_id)
+            if entry:
+                self._entries.move_to_end(analysis_id)
+
+        if entry:
+            # Outros workers podem ter invalidado: confere a versão compartilhada
+            if self.shared_path and self._shared_version(analysis_id) != entry['updated_at']:
+                self._drop_local(analysis_id)
+                entry = None
+            else:
+                return entry
+
+        if self.shared_path:
+            entry = self._load_shared(analysis_id)
+            if entry:
+                self._store_local(analysis_id, entry)
+        return entry
+
+    def put(self, analysis: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Armazena análise concluída e retorna a entrada criada"""
+        if not self.enabled or not self.is_cacheable(analysis):
+            return None
+
+        analysis_id = analysis['id']
+        payload = json.dumps(analysis, ensure_ascii=False, default=str)
+        entry = self._build_entry(analysis, payload)
+        self._store_local(analysis_id, entry)
+
+        if self.shared_path:
+            try:
+                conn = self._shared_connection()
+                with conn:
+                    conn.execute(
+                        'INSERT OR REPLACE INTO analysis_cache (analysis_id, updated_at, payload, stored_at) '
+                        'VALUES (?, ?, ?, ?)',
+                        (analysis_id, str(analysis['updated_at']), payload, datetime.now().isoformat())
+                    )
+            except Exception as e:
+                logger.error(f"Erro ao gravar cache compartilhado da análise {analysis_id}: {str(e)}")
+
+        return entry
+
+    def invalidate(self, analysis_id: int) -> None:
+        """Remove análise de todas as camadas"""
+        self._drop_local(analysis_id)
+
+        if self.enabled and self.shared_path:
+            try:
+                conn = self._shared_connection()
+                with conn:
+                    conn.execute('DELETE FROM analysis_cache WHERE analysis_id = ?', (analysis_id,))
+            except Exception as e:
+                logger.error(f"Erro ao invalidar cache da análise {analysis_id}: {str(e)}")
+
+    def _build_entry(self, analysis: Dict[str, Any], payload: str) -> Dict[str, Any]:
+        return {
+            'analysis': analysis,
+            'body': payload.encode('utf-8'),
+            'updated_at': str(analysis['updated_at']),
+            'etag': self.build_etag(analysis['id'], analysis['updated_at'])
+        }
+
+    def _store_local(self, analysis_id: int, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[analysis_id] = entry
+            self._entries.move_to_end(analysis_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _drop_local(self, analysis_id: int) -> None:
+        with self._lock:
+            self._entries.pop(analysis_id, None)
+
+    def _shared_version(self, analysis_id: int) -> Optional[str]:
+        try:
+            row = self._shared_connection().execute(
+                'SELECT updated_at FROM analysis_cache WHERE analysis_id = ?', (analysis_id,)
+            ).fetchone()
+            return row[0] if row else None
+        except Exception as e:
+            logger.error(f"Erro ao consultar cache compartilhado: {str(e)}")
+            return None
+
+    def _load_shared(self, analysis_id: int) -> Optional[Dict[str, Any]]:
+        try:
+            row = self._shared_connection().execute(
+                'SELECT payload FROM analysis_cache WHERE analysis_id = ?', (analysis_id,)
+            ).fetchone()
+            if not row:
+                return None
+            return self._build_entry(json.loads(row[0]), row[0])
+        except Exception as e:
+            logger.error(f"Erro ao ler cache compartilhado: {str(e)}")
+            return None
+
+# Instância global do cache
+analysis_cache = service_registry.register('analysis_cache', AnalysisCache)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Controle de Prazo da Análise
+Orçamento de tempo por análise com degradação controlada
+"""
+
+import time
+import logging
+from typing import Dict, List, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+class AnalysisDeadline:
+    """Prazo de parede (wall-clock) propagado entre as fases da análise"""
+
+    def __init__(self, budget_seconds: float, reserve_seconds: float = 0.0):
+        """Inicia o relógio da análise"""
+        self.budget_seconds = float(budget_seconds)
+        self.reserve_seconds = float(reserve_seconds)
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + self.budget_seconds
+        self.skipped_stages: List[str] = []
+
+    def elapsed(self) -> float:
+        """Tempo decorrido desde o início da análise"""
+        return time.monotonic() - self.started_at
+
+    def remaining(self) -> float:
+        """Tempo restante, descontada a reserva para consolidação final"""
+        return max(0.0, self.expires_at - time.monotonic() - self.reserve_seconds)
+
+    def expired(self) -> bool:
+        """Indica se o orçamento de tempo acabou"""
+        return self.remaining() <= 0.0
+
+    def overrun(self) -> bool:
+        """Indica se o prazo total (incluindo a reserva de consolidação) foi ultrapassado"""
+        return time.monotonic() >= self.expires_at
+
+    def has_time_for(self, seconds: float) -> bool:
+        """Indica se ainda há tempo para uma etapa com a duração estimada"""
+        return self.remaining() >= seconds
+
+    def timeout(self, default: float, minimum: float = 1.0) -> float:
+        """Timeout para chamadas externas limitado pelo tempo restante"""
+        return max(minimum, min(float(default), self.remaining()))
+
+    def phase_budget(self, share: float) -> float:
+        """Orçamento de uma fase como fração do tempo restante"""
+        return self.remaining() * max(0.0, min(share, 1.0))
+
+    def phase(self, share: float) -> "AnalysisDeadline":
+        """Cria prazo de uma fase, compartilhando o registro de etapas ignoradas"""
+        child = AnalysisDeadline(self.phase_budget(share))
+        child.skipped_stages = self.skipped_stages
+        return child
+
+    def skip(self, stage: str) -> None:
+        """Registra etapa opcional descartada por falta de tempo"""
+        if stage not in self.skipped_stages:
+            self.skipped_stages.append(stage)
+            logger.warning(f"⏱️ Etapa '{stage}' ignorada: {self.remaining():.1f}s restantes")
+
+    @property
+    def degraded(self) -> bool:
+        """Indica se alguma etapa foi descartada"""
+        return bool(self.skipped_stages)
+
+    def to_metadata(self) -> Dict[str, Any]:
+        """Resumo do prazo para os metadados da análise"""
+        return {
+            "budget_seconds": self.budget_seconds,
+            "elapsed_seconds": round(self.elapsed(), 2),
+            "degraded": self.degraded,
+            "skipped_stages": list(self.skipped_stages)
+        }
+
+def deadline_timeout(
+    deadline: Optional[AnalysisDeadline],
+    default: float
+) -> float:
+    """Timeout efetivo para uma chamada, com ou sem prazo definido"""
+    if deadline is None:
+        return default
+    return deadline.timeout(default)
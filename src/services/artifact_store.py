@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Armazenamento de Artefatos de Pesquisa
+Objetos comprimidos e endereçados por conteúdo, referenciados pelas análises
+"""
+
+import os
+import gzip
+import json
+import hashlib
+import logging
+import tempfile
+from typing import Dict, Optional, Any
+from services.service_registry import service_registry
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+REFERENCE_KEY = '$artifact'
+
+# Chaves com conteúdo bruto de pesquisa (em qualquer nível da análise)
+DEFAULT_ARTIFACT_KEYS = (
+    'web_research', 'deep_search', 'raw_response', 'raw_content',
+    'combined_content', 'full_content', 'page_contents'
+)
+
+class ArtifactStore:
+    """Armazena artefatos brutos fora da linha principal da análise"""
+
+    def __init__(self, base_path: Optional[str] = None):
+        """Inicializa configuração (diretório criado no primeiro artefato gravado)"""
+        self.enabled = os.getenv('ARTIFACT_STORE_ENABLED', 'false').lower() == 'true'
+        self.base_path = base_path or os.getenv(
+            'ARTIFACT_STORE_PATH',
+            os.path.join(os.path.dirname(__file__), '..', 'data', 'artifacts')
+        )
+        self.min_bytes = int(os.getenv('ARTIFACT_MIN_BYTES', 1024))
+        self.artifact_keys = set(
+            key.strip() for key in os.getenv('ARTIFACT_KEYS', ','.join(DEFAULT_ARTIFACT_KEYS)).split(',')
+            if key.strip()
+        )
+        self.encoding = 'zstd' if zstandard else 'gzip'
+
+    def _path(self, digest: str, encoding: str) -> str:
+        extension = 'zst' if encoding == 'zstd' else 'gz'
+        return os.path.join(self.base_path, digest[:2], f"{digest}.json.{extension}")
+
+    def _compress(self, payload: bytes) -> bytes:
+        if self.encoding == 'zstd':
+            return zstandard.ZstdCompressor(level=10).compress(payload)
+        return gzip.compress(payload, compresslevel=6)
+
+    def put(self, value: Any) -> Dict[str, Any]:
+        """Grava artefato (deduplicado pelo SHA-256) e retorna a referência"""
+        payload = json.dumps(value, ensure_ascii=False, sort_keys=True, default=str).encode('utf-8')
+        digest = hashlib.sha256(payload).hexdigest()
+        reference = {REFERENCE_KEY: digest, 'size': len(payload), 'encoding': self.encoding}
+
+        # Mesmo conteúdo já armazenado (em qualquer codificação)
+        if any(os.path.exists(self._path(digest, encoding)) for encoding in ('zstd', 'gzip')):
+            return reference
+
+        path = self._path(digest, self.encoding)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Escrita atômica: arquivo temporário no mesmo diretório + rename
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(self._compress(payload))
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        return reference
+
+    def get(self, digest: str) -> Optional[Any]:
+        """Lê artefato pelo hash"""
+        if not all(char in '0123456789abcdef' for char in digest) or len(digest) != 64:
+            return None
+
+        for encoding in ('zstd', 'gzip'):
+            path = self._path(digest, encoding)
+            if not os.path.exists(path):
+                continue
+
+            with open(path, 'rb') as file:
+                data = file.read()
+
+            if encoding == 'zstd':
+                if not zstandard:
+                    logger.error(f"Artefato {digest} em zstd, mas zstandard não está instalado")
+                    return None
+                payload = zstandard.ZstdDecompressor().decompress(data)
+            else:
+                payload = gzip.decompress(data)
+            return json.loads(payload)
+
+        return None
+
+    @staticmethod
+    def is_reference(value: Any) -> bool:
+        return isinstance(value, dict) and REFERENCE_KEY in value
+
+    def externalize(self, value: Any) -> Any:
+        """Substitui conteúdo bruto por referências (sem alterar o objeto original)"""
+        if isinstance(value, dict):
+            result = {}
+            for key, item in value.items():
+                if key in self.artifact_keys and item and not self.is_reference(item):
+                    size = len(json.dumps(item, ensure_ascii=False, default=str))
+                    if size >= self.min_bytes:
+                        try:
+                            result[key] = self.put(item)
+                            continue
+                        except Exception as e:
+                            logger.error(f"Erro ao gravar artefato '{key}': {str(e)}")
+                result[key] = self.externalize(item)
+            return result
+
+        if isinstance(value, list):
+            return [self.externalize(item) for item in value]
+
+        return value
+
+    def hydrate(self, value: Any) -> Any:
+        """Resolve referências de volta para o conteúdo original"""
+        if self.is_reference(value):
+            artifact = self.get(value[REFERENCE_KEY])
+            return value if artifact is None else artifact
+
+        if isinstance(value, dict):
+            return {key: self.hydrate(item) for key, item in value.items()}
+
+        if isinstance(value, list):
+            return [self.hydrate(item) for item in value]
+
+        return value
+
+# Instância global do armazenamento
+artifact_store = service_registry.register('artifact_store', ArtifactStore)
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Processamento de Anexos em Segundo Plano
+Fila de jobs de extração com status persistido por arquivo
+"""
+
+import os
+import time
+import uuid
+import shutil
+import socket
+import logging
+import tempfile
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Any
+from werkzeug.datastructures import FileStorage
+from services.attachment_service import attachment_service
+from services.attachment_store import attachment_store
+from services.process_pools import host_pool_size, pool_context
+from services.service_registry import service_registry
+
+logger = logging.getLogger(__name__)
+
+PENDING_STATUSES = ('queued', 'processing')
+
+def _init_worker() -> None:
+    """Inicializador dos processos do pool
+
+    O pool de jobs já ocupa os núcleos disponíveis: PDFs são extraídos no próprio
+    processo do job, sem abrir um segundo pool de processos por worker.
+    """
+    from services.pdf_extraction import pdf_extraction_engine
+    pdf_extraction_engine.max_workers = 1
+
+def _process_upload(
+    job_id: str,
+    upload_path: str,
+    filename: str,
+    content_type: Optional[str],
+    session_id: str
+) -> None:
+    """Tarefa executada nos processos do pool: extrai, classifica e persiste um anexo"""
+    try:
+        attachment_store.update_job(job_id, 'processing')
+
+        with open(upload_path, 'rb') as stream:
+            upload = FileStorage(stream=stream, filename=filename, content_type=content_type)
+            result = attachment_service.process_attachment(upload, session_id)
+
+        if result.get('success'):
+            # Conteúdo completo fica no armazenamento de anexos, não no job
+            summary = {key: value for key, value in result.items() if key != 'full_content'}
+            attachment_store.update_job(job_id, 'completed', result=summary)
+        else:
+            attachment_store.update_job(job_id, 'failed', error=result.get('error'))
+
+    except Exception as e:
+        logger.error(f"Erro no job de anexo {job_id}: {str(e)}")
+        attachment_store.update_job(job_id, 'failed', error=str(e))
+    finally:
+        if os.path.exists(upload_path):
+            os.remove(upload_path)
+
+def _pid_alive(pid: int) -> bool:
+    """Indica se o processo existe neste host"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class AttachmentJobManager:
+    """Executa a extração de anexos em um pool de processos"""
+
+    def __init__(self):
+        """Inicializa configuração (pool criado sob demanda)"""
+        self.max_workers = host_pool_size('ATTACHMENT_WORKERS')
+        self.poll_interval = float(os.getenv('ATTACHMENT_JOB_POLL_INTERVAL', 0.5))
+        # Jobs de outros hosts sem atualização há mais que isso são considerados perdidos
+        self.stale_after = float(os.getenv('ATTACHMENT_JOB_STALE_AFTER', 900))
+        self.job_retention = float(os.getenv('ATTACHMENT_JOB_RETENTION_HOURS', 24))
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._futures: Dict[str, Future] = {}
+        self._active: set = set()
+
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self) -> None:
+        """O pool pertence ao processo pai: o processo filho cria o seu"""
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._futures = {}
+        self._active = set()
+
+    @staticmethod
+    def _owner() -> str:
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Cria o pool sob demanda (após o fork dos workers do servidor)"""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=pool_context('ATTACHMENT_MP_CONTEXT'),
+                    initializer=_init_worker
+                )
+            return self._executor
+
+    def shutdown(self) -> None:
+        """Encerra o pool de processos"""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def submit(self, file: FileStorage, session_id: str) -> Dict[str, Any]:
+        """Copia o upload para um arquivo temporário e agenda o processamento"""
+        attachment_store.prune_jobs(datetime.now() - timedelta(hours=self.job_retention))
+
+        job_id = uuid.uuid4().hex
+        # Registrado antes do job existir no banco: nunca é tomado por órfão durante o envio
+        self._active.add(job_id)
+        job = attachment_store.create_job(job_id, session_id, file.filename, owner=self._owner())
+
+        # O stream da requisição é fechado ao fim da resposta e não atravessa processos
+        fd, upload_path = tempfile.mkstemp(prefix='attachment-job-')
+        try:
+            with os.fdopen(fd, 'wb') as upload:
+                file.stream.seek(0)
+                shutil.copyfileobj(file.stream, upload, 1024 * 1024)
+
+            future = self._get_executor().submit(
+                _process_upload, job_id, upload_path, file.filename, file.content_type, session_id
+            )
+        except Exception as e:
+            if os.path.exists(upload_path):
+                os.remove(upload_path)
+            attachment_store.fail_pending_job(job_id, str(e))
+            self._active.discard(job_id)
+            raise
+
+        self._futures[job_id] = future
+        future.add_done_callback(lambda done: self._on_job_done(job_id, upload_path, done))
+
+        logger.info(f"📥 Anexo {file.filename} enfileirado (job {job_id})")
+        return job
+
+    def _on_job_done(self, job_id: str, upload_path: str, future: Future) -> None:
+        """Registra falhas do próprio pool (processo encerrado, job cancelado)"""
+        self._futures.pop(job_id, None)
+        self._active.discard(job_id)
+
+        error = None if future.cancelled() else future.exception()
+        if not future.cancelled() and error is None:
+            return
+
+        if isinstance(error, BrokenProcessPool):
+            # Processo do pool encerrado abruptamente: próximo submit cria um pool novo
+            with self._executor_lock:
+                self._executor = None
+
+        message = str(error) if error else 'Job cancelado'
+        logger.error(f"Erro no job de anexo {job_id}: {message}")
+        attachment_store.fail_pending_job(job_id, message)
+        if os.path.exists(upload_path):
+            os.remove(upload_path)
+
+    def _reap_orphaned_jobs(self, jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Marca como falhos jobs pendentes cujo processo responsável não existe mais"""
+        hostname = socket.gethostname()
+        stale_before = (datetime.now() - timedelta(seconds=self.stale_after)).isoformat()
+
+        for job in jobs:
+            if job['status'] not in PENDING_STATUSES or job['job_id'] in self._active:
+                continue
+
+            host, _, pid = (job.get('owner') or '').partition(':')
+            if host == hostname and pid.isdigit():
+                orphaned = int(pid) == os.getpid() or not _pid_alive(int(pid))
+            else:
+                # Outro host (ou job sem responsável registrado): apenas pelo tempo sem atualização
+                orphaned = job['updated_at'] < stale_before
+
+            if orphaned and attachment_store.fail_pending_job(
+                job['job_id'], 'Processamento interrompido (worker encerrado)'
+            ):
+                logger.warning(f"⚠️ Job de anexo {job['job_id']} órfão marcado como falho")
+                job['status'] = 'failed'
+                job['error'] = 'Processamento interrompido (worker encerrado)'
+
+        return jobs
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Status de um job"""
+        job = attachment_store.get_job(job_id)
+        return self._reap_orphaned_jobs([job])[0] if job else None
+
+    def get_session_jobs(self, session_id: str) -> List[Dict[str, Any]]:
+        """Status de todos os jobs da sessão"""
+        return self._reap_orphaned_jobs(attachment_store.get_session_jobs(session_id))
+
+    def wait_for_session(self, session_id: str, timeout: float) -> bool:
+        """Aguarda os jobs pendentes da sessão; retorna False se o prazo acabar"""
+        expires_at = time.monotonic() + timeout
+
+        # Jobs deste processo: espera direta pelos futures
+        pending_jobs = [
+            job['job_id'] for job in self.get_session_jobs(session_id)
+            if job['status'] in PENDING_STATUSES
+        ]
+        if not pending_jobs:
+            return True
+
+        local = [self._futures[job_id] for job_id in pending_jobs if job_id in self._futures]
+        if local:
+            wait(local, timeout=timeout)
+
+        # Jobs de outros workers: acompanha pelo armazenamento compartilhado
+        while True:
+            pending = [
+                job for job in self.get_session_jobs(session_id)
+                if job['status'] in PENDING_STATUSES
+            ]
+            if not pending:
+                return True
+
+            if time.monotonic() >= expires_at:
+                logger.warning(f"⏱️ {len(pending)} anexos ainda em processamento na sessão {session_id}")
+                return False
+
+            time.sleep(min(self.poll_interval, max(0.0, expires_at - time.monotonic())))
+
+# Instância global do gerenciador
+attachment_job_manager = service_registry.register('attachment_jobs', AttachmentJobManager)
@@ -7,17 +7,23 @@ Análise inteligente de documentos e arquivos
 
 import os
 import logging
+import hashlib
 import mimetypes
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Tuple, BinaryIO, Union
 from werkzeug.datastructures import FileStorage
-import PyPDF2
-import pandas as pd
-from docx import Document
 import json
 from datetime import datetime
+from services.attachment_store import attachment_store
+from services.pdf_extraction import pdf_extraction_engine
+from services.content_classifier import ContentClassifier
+from services.service_registry import service_registry
 
 logger = logging.getLogger(__name__)
 
+# Versão dos extratores (PDF, planilhas, documentos e classificador): incrementar ao alterar
+# o resultado da extração para que o cache não devolva conteúdo gerado pela versão anterior
+EXTRACTOR_VERSION = '3'
+
 class AttachmentService:
     """Serviço para processamento inteligente de anexos"""
     
@@ -26,6 +32,9 @@ class AttachmentService:
         self.upload_folder = os.path.join(os.path.dirname(__file__), '..', 'uploads')
         os.makedirs(self.upload_folder, exist_ok=True)
         
+        # Acima deste tamanho o upload é gravado em disco antes da extração
+        self.spill_threshold = int(os.getenv('ATTACHMENT_SPILL_THRESHOLD', 4 * 1024 * 1024))
+        
         # Tipos de arquivo suportados
         self.supported_types = {
             'application/pdf': 'pdf',
@@ -57,6 +66,14 @@ class AttachmentService:
                 'amostra', 'respondente', 'análise', 'insight', 'tendência'
             ]
         }
+        
+        # Classificador em passagem única (inclui características de persona)
+        self.classifier = ContentClassifier(
+            self.content_classifiers,
+            auxiliary={
+                'caracteristicas_persona': ['idade', 'gênero', 'renda', 'comportamento', 'interesse']
+            }
+        )
     
     def process_attachment(
         self, 
@@ -83,44 +100,85 @@ class AttachmentService:
                     'error': f'Tipo de arquivo não suportado: {mime_type}'
                 }
             
-            # Salva arquivo temporariamente
-            file_path = self._save_temp_file(file, session_id)
-            if not file_path:
-                return {
-                    'success': False,
-                    'error': 'Erro ao salvar arquivo'
-                }
+            # Reaproveita extração de arquivo idêntico já processado
+            content_hash = self._compute_content_hash(file)
+            cached = attachment_store.get_cached_extraction(content_hash, mime_type, EXTRACTOR_VERSION)
             
-            # Extrai conteúdo
-            content = self._extract_content(file_path, mime_type)
-            if not content:
-                return {
-                    'success': False,
-                    'error': 'Erro ao extrair conteúdo'
-                }
+            if cached:
+                logger.info(f"Extração reaproveitada do cache: {file.filename} ({content_hash[:12]})")
+                content = cached['extracted_content']
+                classification = cached.get('classification') or self._classify_content(content)
+            else:
+                if self._stream_size(file) <= self.spill_threshold:
+                    # Extrai direto do stream do upload, sem gravar em disco
+                    content = self._extract_content(file.stream, mime_type)
+                else:
+                    # Arquivos grandes: grava em disco (PDFs usam extração paralela por caminho)
+                    file_path = self._save_temp_file(file, session_id)
+                    if not file_path:
+                        return {
+                            'success': False,
+                            'error': 'Erro ao salvar arquivo'
+                        }
+                    
+                    try:
+                        content = self._extract_content(file_path, mime_type)
+                    finally:
+                        # Remove arquivo temporário
+                        self._cleanup_temp_file(file_path)
+                
+                if not content:
+                    return {
+                        'success': False,
+                        'error': 'Erro ao extrair conteúdo'
+                    }
+                
+                # Classifica conteúdo
+                classification = self._classify_content(content)
+                
+                attachment_store.cache_extraction(
+                    content_hash, mime_type, EXTRACTOR_VERSION, content, classification['category'],
+                    classification
+                )
             
-            # Classifica conteúdo
-            content_type = self._classify_content(content)
+            content_type = classification['category']
             
             # Processa conteúdo específico
-            processed_content = self._process_specific_content(content, content_type)
+            processed_content = self._process_specific_content(content, classification)
+            
+            metadata = {
+                'file_size': len(content),
+                'mime_type': mime_type,
+                'content_hash': content_hash,
+                'cache_hit': bool(cached),
+                'category_scores': classification['scores'],
+                'secondary_categories': classification['secondary_categories'],
+                'processed_at': datetime.now().isoformat()
+            }
             
-            # Remove arquivo temporário
-            self._cleanup_temp_file(file_path)
+            # Persiste conteúdo extraído para uso nas análises da sessão
+            attachment_id = attachment_store.add_attachment(
+                session_id=session_id,
+                filename=self._build_stored_filename(file, session_id),
+                original_filename=file.filename,
+                file_size=len(content),
+                mime_type=mime_type,
+                content_type=content_type,
+                extracted_content=content,
+                metadata=metadata
+            )
             
             return {
                 'success': True,
                 'message': 'Anexo processado com sucesso',
+                'attachment_id': attachment_id,
                 'session_id': session_id,
                 'filename': file.filename,
                 'content_type': content_type,
+                'category_scores': classification['scores'],
                 'content_preview': processed_content[:500] + '...' if len(processed_content) > 500 else processed_content,
                 'full_content': processed_content,
-                'metadata': {
-                    'file_size': len(content),
-                    'mime_type': mime_type,
-                    'processed_at': datetime.now().isoformat()
-                }
+                'metadata': metadata
             }
             
         except Exception as e:
@@ -130,15 +188,49 @@ class AttachmentService:
                 'error': f'Erro interno: {str(e)}'
             }
     
+    def _compute_content_hash(self, file: FileStorage) -> str:
+        """Calcula SHA-256 do arquivo enviado sem consumir o stream"""
+        sha256 = hashlib.sha256()
+        stream = file.stream
+        stream.seek(0)
+        
+        for block in iter(lambda: stream.read(1024 * 1024), b''):
+            sha256.update(block)
+        
+        stream.seek(0)
+        return sha256.hexdigest()
+    
+    def _stream_size(self, file: FileStorage) -> int:
+        """Tamanho do upload a partir do stream"""
+        stream = file.stream
+        stream.seek(0, os.SEEK_END)
+        size = stream.tell()
+        stream.seek(0)
+        return size
+    
+    def _read_bytes(self, source: Union[str, BinaryIO]) -> bytes:
+        """Lê o conteúdo bruto de um caminho ou stream"""
+        if isinstance(source, str):
+            with open(source, 'rb') as file:
+                return file.read()
+        
+        source.seek(0)
+        return source.read()
+    
+    def _build_stored_filename(self, file: FileStorage, session_id: str) -> str:
+        """Gera nome único para o anexo da sessão"""
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        return f"{session_id}_{timestamp}_{file.filename}"
+    
     def _save_temp_file(self, file: FileStorage, session_id: str) -> Optional[str]:
         """Salva arquivo temporariamente"""
         try:
             # Gera nome único
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"{session_id}_{timestamp}_{file.filename}"
+            filename = self._build_stored_filename(file, session_id)
             file_path = os.path.join(self.upload_folder, filename)
             
             # Salva arquivo
+            file.stream.seek(0)
             file.save(file_path)
             
             return file_path
@@ -147,23 +239,23 @@ class AttachmentService:
             logger.error(f"Erro ao salvar arquivo: {str(e)}")
             return None
     
-    def _extract_content(self, file_path: str, mime_type: str) -> Optional[str]:
-        """Extrai conteúdo do arquivo baseado no tipo"""
+    def _extract_content(self, source: Union[str, BinaryIO], mime_type: str) -> Optional[str]:
+        """Extrai conteúdo do arquivo (caminho ou stream) baseado no tipo"""
         try:
             file_type = self.supported_types.get(mime_type)
             
             if file_type == 'pdf':
-                return self._extract_pdf_content(file_path)
+                return self._extract_pdf_content(source)
             elif file_type in ['docx', 'doc']:
-                return self._extract_docx_content(file_path)
+                return self._extract_docx_content(source)
             elif file_type in ['xlsx', 'xls']:
-                return self._extract_excel_content(file_path)
+                return self._extract_excel_content(source)
             elif file_type == 'csv':
-                return self._extract_csv_content(file_path)
+                return self._extract_csv_content(source)
             elif file_type == 'txt':
-                return self._extract_text_content(file_path)
+                return self._extract_text_content(source)
             elif file_type == 'json':
-                return self._extract_json_content(file_path)
+                return self._extract_json_content(source)
             else:
                 return None
                 
@@ -171,31 +263,28 @@ class AttachmentService:
             logger.error(f"Erro ao extrair conteúdo: {str(e)}")
             return None
     
-    def _extract_pdf_content(self, file_path: str) -> Optional[str]:
+    def _extract_pdf_content(self, source: Union[str, BinaryIO]) -> Optional[str]:
         """Extrai texto de arquivo PDF"""
         try:
-            content = ""
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                
-                for page_num in range(len(pdf_reader.pages)):
-                    page = pdf_reader.pages[page_num]
-                    content += page.extract_text() + "\n"
-            
-            return content.strip()
+            # Páginas unidas uma única vez (em paralelo quando há caminho em disco)
+            return pdf_extraction_engine.extract_text(source) or None
             
         except Exception as e:
             logger.error(f"Erro ao extrair PDF: {str(e)}")
             return None
     
-    def _extract_docx_content(self, file_path: str) -> Optional[str]:
+    def _extract_docx_content(self, source: Union[str, BinaryIO]) -> Optional[str]:
         """Extrai texto de arquivo DOCX"""
         try:
-            doc = Document(file_path)
-            content = ""
+            if not isinstance(source, str):
+                source.seek(0)
+            
+            # Importado sob demanda: a maioria das requisições não lê DOCX
+            from docx import Document
             
-            for paragraph in doc.paragraphs:
-                content += paragraph.text + "\n"
+            # python-docx lê o zip diretamente do stream
+            doc = Document(source)
+            content = "\n".join(paragraph.text for paragraph in doc.paragraphs)
             
             return content.strip()
             
@@ -203,113 +292,83 @@ class AttachmentService:
             logger.error(f"Erro ao extrair DOCX: {str(e)}")
             return None
     
-    def _extract_excel_content(self, file_path: str) -> Optional[str]:
+    def _extract_excel_content(self, source: Union[str, BinaryIO]) -> Optional[str]:
         """Extrai dados de arquivo Excel"""
         try:
-            # Lê todas as planilhas
-            excel_file = pd.ExcelFile(file_path)
-            content = ""
+            # pandas/openpyxl são carregados apenas quando há planilhas
+            from services.tabular_extraction import tabular_extraction_engine
             
-            for sheet_name in excel_file.sheet_names:
-                df = pd.read_excel(file_path, sheet_name=sheet_name)
-                content += f"PLANILHA: {sheet_name}\n"
-                content += df.to_string(index=False) + "\n\n"
-            
-            return content.strip()
+            # Lê todas as planilhas em blocos, abrindo o arquivo uma única vez
+            return tabular_extraction_engine.extract_excel(source)
             
         except Exception as e:
             logger.error(f"Erro ao extrair Excel: {str(e)}")
             return None
     
-    def _extract_csv_content(self, file_path: str) -> Optional[str]:
+    def _extract_csv_content(self, source: Union[str, BinaryIO]) -> Optional[str]:
         """Extrai dados de arquivo CSV"""
         try:
-            df = pd.read_csv(file_path, encoding='utf-8')
-            return df.to_string(index=False)
+            from services.tabular_extraction import tabular_extraction_engine
+            
+            # Leitura em blocos com fallback de encoding
+            return tabular_extraction_engine.extract_csv(source)
             
-        except UnicodeDecodeError:
-            # Tenta com encoding latin-1
-            try:
-                df = pd.read_csv(file_path, encoding='latin-1')
-                return df.to_string(index=False)
-            except Exception as e:
-                logger.error(f"Erro ao extrair CSV: {str(e)}")
-                return None
         except Exception as e:
             logger.error(f"Erro ao extrair CSV: {str(e)}")
             return None
     
-    def _extract_text_content(self, file_path: str) -> Optional[str]:
+    def _extract_text_content(self, source: Union[str, BinaryIO]) -> Optional[str]:
         """Extrai conteúdo de arquivo texto"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                return file.read()
-                
-        except UnicodeDecodeError:
-            # Tenta com encoding latin-1
+            raw = self._read_bytes(source)
+            
             try:
-                with open(file_path, 'r', encoding='latin-1') as file:
-                    return file.read()
-            except Exception as e:
-                logger.error(f"Erro ao extrair texto: {str(e)}")
-                return None
+                text = raw.decode('utf-8')
+            except UnicodeDecodeError:
+                # Tenta com encoding latin-1
+                text = raw.decode('latin-1')
+            
+            # Mesmas quebras de linha da leitura em modo texto (universal newlines)
+            return text.replace('\r\n', '\n').replace('\r', '\n')
+                
         except Exception as e:
             logger.error(f"Erro ao extrair texto: {str(e)}")
             return None
     
-    def _extract_json_content(self, file_path: str) -> Optional[str]:
+    def _extract_json_content(self, source: Union[str, BinaryIO]) -> Optional[str]:
         """Extrai conteúdo de arquivo JSON"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                data = json.load(file)
-                return json.dumps(data, indent=2, ensure_ascii=False)
+            data = json.loads(self._read_bytes(source))
+            return json.dumps(data, indent=2, ensure_ascii=False)
                 
         except Exception as e:
             logger.error(f"Erro ao extrair JSON: {str(e)}")
             return None
     
-    def _classify_content(self, content: str) -> str:
-        """Classifica o tipo de conteúdo baseado em palavras-chave"""
-        content_lower = content.lower()
-        scores = {}
-        
-        # Calcula score para cada categoria
-        for category, keywords in self.content_classifiers.items():
-            score = 0
-            for keyword in keywords:
-                score += content_lower.count(keyword.lower())
-            scores[category] = score
-        
-        # Retorna categoria com maior score
-        if scores:
-            best_category = max(scores, key=scores.get)
-            if scores[best_category] > 0:
-                return best_category
-        
-        return 'geral'
+    def _classify_content(self, content: str) -> Dict[str, Any]:
+        """Classifica o conteúdo pontuando todas as categorias em uma única varredura"""
+        return self.classifier.classify(content)
     
-    def _process_specific_content(self, content: str, content_type: str) -> str:
+    def _process_specific_content(self, content: str, classification: Dict[str, Any]) -> str:
         """Processa conteúdo específico baseado no tipo"""
+        content_type = classification['category']
         
         if content_type == 'drivers_mentais':
-            return self._process_mental_drivers(content)
+            return self._process_mental_drivers(content, classification)
         elif content_type == 'provas_visuais':
-            return self._process_visual_proofs(content)
+            return self._process_visual_proofs(content, classification)
         elif content_type == 'perfis_psicologicos':
-            return self._process_psychological_profiles(content)
+            return self._process_psychological_profiles(content, classification)
         elif content_type == 'dados_pesquisa':
-            return self._process_research_data(content)
+            return self._process_research_data(content, classification)
         else:
             return self._process_general_content(content)
     
-    def _process_mental_drivers(self, content: str) -> str:
+    def _process_mental_drivers(self, content: str, classification: Dict[str, Any]) -> str:
         """Processa conteúdo relacionado a gatilhos mentais"""
         processed = "DRIVERS MENTAIS IDENTIFICADOS:\n\n"
         
-        drivers_found = []
-        for driver in self.content_classifiers['drivers_mentais']:
-            if driver.lower() in content.lower():
-                drivers_found.append(driver)
+        drivers_found = classification['keywords_found'].get('drivers_mentais', [])
         
         if drivers_found:
             processed += f"Gatilhos encontrados: {', '.join(drivers_found)}\n\n"
@@ -319,13 +378,12 @@ class AttachmentService:
         
         return processed
     
-    def _process_visual_proofs(self, content: str) -> str:
+    def _process_visual_proofs(self, content: str, classification: Dict[str, Any]) -> str:
         """Processa provas visuais e depoimentos"""
         processed = "PROVAS VISUAIS E DEPOIMENTOS:\n\n"
         
-        # Identifica números e percentuais
-        import re
-        numbers = re.findall(r'\d+(?:\.\d+)?%?', content)
+        # Números e percentuais identificados na classificação
+        numbers = classification['numbers']
         if numbers:
             processed += f"Números identificados: {', '.join(numbers[:10])}\n\n"
         
@@ -334,17 +392,12 @@ class AttachmentService:
         
         return processed
     
-    def _process_psychological_profiles(self, content: str) -> str:
+    def _process_psychological_profiles(self, content: str, classification: Dict[str, Any]) -> str:
         """Processa perfis psicológicos e personas"""
         processed = "PERFIS PSICOLÓGICOS IDENTIFICADOS:\n\n"
         
-        # Busca por características de persona
-        characteristics = []
-        persona_keywords = ['idade', 'gênero', 'renda', 'comportamento', 'interesse']
-        
-        for keyword in persona_keywords:
-            if keyword in content.lower():
-                characteristics.append(keyword)
+        # Características de persona identificadas na classificação
+        characteristics = classification['keywords_found'].get('caracteristicas_persona', [])
         
         if characteristics:
             processed += f"Características encontradas: {', '.join(characteristics)}\n\n"
@@ -354,13 +407,12 @@ class AttachmentService:
         
         return processed
     
-    def _process_research_data(self, content: str) -> str:
+    def _process_research_data(self, content: str, classification: Dict[str, Any]) -> str:
         """Processa dados de pesquisa e estatísticas"""
         processed = "DADOS DE PESQUISA ANALISADOS:\n\n"
         
-        # Identifica dados estatísticos
-        import re
-        stats = re.findall(r'\d+(?:\.\d+)?%', content)
+        # Percentuais identificados na classificação
+        stats = classification['percentages']
         if stats:
             processed += f"Estatísticas encontradas: {', '.join(stats[:10])}\n\n"
         
@@ -393,9 +445,7 @@ class AttachmentService:
     
     def get_session_attachments(self, session_id: str) -> List[Dict[str, Any]]:
         """Retorna anexos de uma sessão específica"""
-        # Esta função seria implementada com um sistema de cache/banco
-        # Por enquanto retorna lista vazia
-        return []
+        return attachment_store.get_session_attachments(session_id)
     
     def process_text_file(self, file_path: str) -> Optional[str]:
         """Processa arquivo de texto simples"""
@@ -410,6 +460,10 @@ class AttachmentService:
                     file_path = os.path.join(self.upload_folder, filename)
                     os.remove(file_path)
             
+            # Remove conteúdo persistido e jobs de processamento da sessão
+            attachment_store.delete_session_attachments(session_id)
+            attachment_store.delete_session_jobs(session_id)
+            
             return True
             
         except Exception as e:
@@ -417,5 +471,5 @@ class AttachmentService:
             return False
 
 # Instância global do serviço
-attachment_service = AttachmentService()
+attachment_service = service_registry.register('attachments', AttachmentService)
 
@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Armazenamento de Anexos
+Persistência local dos anexos processados, indexada por sessão
+"""
+
+import os
+import json
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Any
+from services.service_registry import service_registry
+
+logger = logging.getLogger(__name__)
+
+class AttachmentStore:
+    """Armazenamento SQLite dos anexos extraídos e classificados"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        """Inicializa banco local de anexos"""
+        self.db_path = db_path or os.getenv(
+            'ATTACHMENT_STORE_PATH',
+            os.path.join(os.path.dirname(__file__), '..', 'data', 'attachments.db')
+        )
+
+        # Uma conexão por thread (sqlite3 não compartilha conexões entre threads);
+        # diretório e schema são criados na primeira conexão, não na importação
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+        # Limites do cache de extração (entradas menos usadas recentemente são descartadas)
+        self.extraction_cache_max_entries = int(os.getenv('EXTRACTION_CACHE_MAX_ENTRIES', 5000))
+        self.extraction_cache_max_age_days = int(os.getenv('EXTRACTION_CACHE_MAX_AGE_DAYS', 90))
+
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self) -> None:
+        """Conexões SQLite não podem atravessar o fork: o processo filho abre as suas"""
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Retorna conexão da thread atual"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+
+            if not self._schema_ready:
+                with self._schema_lock:
+                    if not self._schema_ready:
+                        self._create_schema(conn)
+                        self._schema_ready = True
+
+            self._local.conn = conn
+        return conn
+
+    def _create_schema(self, conn: sqlite3.Connection) -> None:
+        """Cria tabela e índices (espelha a tabela attachments da migração)"""
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS attachments (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    original_filename TEXT NOT NULL,
+                    file_size INTEGER,
+                    mime_type TEXT,
+                    content_type TEXT,
+                    extracted_content TEXT,
+                    metadata TEXT,
+                    created_at TEXT NOT NULL
+                )
+            """)
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_attachments_session_id ON attachments(session_id)'
+            )
+
+            # Cache de extração endereçado por conteúdo (SHA-256 do arquivo)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS extraction_cache (
+                    content_hash TEXT NOT NULL,
+                    mime_type TEXT NOT NULL,
+                    extractor_version TEXT NOT NULL DEFAULT '',
+                    extracted_content TEXT NOT NULL,
+                    content_type TEXT,
+                    classification TEXT,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    created_at TEXT NOT NULL,
+                    last_used_at TEXT NOT NULL,
+                    PRIMARY KEY (content_hash, mime_type)
+                )
+            """)
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_extraction_cache_last_used_at ON extraction_cache(last_used_at)'
+            )
+
+            # Jobs de processamento em segundo plano (visíveis a todos os workers);
+            # owner é o processo responsável ("host:pid"), usado para detectar jobs órfãos
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS attachment_jobs (
+                    job_id TEXT PRIMARY KEY,
+                    session_id TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    owner TEXT,
+                    result TEXT,
+                    error TEXT,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_attachment_jobs_session_id ON attachment_jobs(session_id)'
+            )
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_attachment_jobs_updated_at ON attachment_jobs(updated_at)'
+            )
+
+    def add_attachment(
+        self,
+        session_id: str,
+        filename: str,
+        original_filename: str,
+        file_size: int,
+        mime_type: str,
+        content_type: str,
+        extracted_content: str,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Optional[int]:
+        """Persiste anexo processado e retorna seu ID"""
+        try:
+            conn = self._connection()
+            with conn:
+                cursor = conn.execute(
+                    """
+                    INSERT INTO attachments (
+                        session_id, filename, original_filename, file_size, mime_type,
+                        content_type, extracted_content, metadata, created_at
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        session_id, filename, original_filename, file_size, mime_type,
+                        content_type, extracted_content,
+                        json.dumps(metadata or {}, ensure_ascii=False),
+                        datetime.now().isoformat()
+                    )
+                )
+            return cursor.lastrowid
+
+        except Exception as e:
+            logger.error(f"Erro ao salvar anexo no armazenamento local: {str(e)}")
+            return None
+
+    def get_session_attachments(self, session_id: str) -> List[Dict[str, Any]]:
+        """Retorna todos os anexos da sessão em uma única consulta indexada"""
+        try:
+            rows = self._connection().execute(
+                'SELECT * FROM attachments WHERE session_id = ? ORDER BY id',
+                (session_id,)
+            ).fetchall()
+            return [self._row_to_dict(row) for row in rows]
+
+        except Exception as e:
+            logger.error(f"Erro ao buscar anexos da sessão {session_id}: {str(e)}")
+            return []
+
+    def delete_session_attachments(self, session_id: str) -> int:
+        """Remove anexos da sessão e retorna quantidade removida"""
+        try:
+            conn = self._connection()
+            with conn:
+                cursor = conn.execute('DELETE FROM attachments WHERE session_id = ?', (session_id,))
+            return cursor.rowcount
+
+        except Exception as e:
+            logger.error(f"Erro ao remover anexos da sessão {session_id}: {str(e)}")
+            return 0
+
+    def get_cached_extraction(
+        self,
+        content_hash: str,
+        mime_type: str,
+        extractor_version: str
+    ) -> Optional[Dict[str, Any]]:
+        """Busca extração já realizada para o mesmo conteúdo pela mesma versão dos extratores"""
+        try:
+            conn = self._connection()
+            row = conn.execute(
+                'SELECT extracted_content, content_type, classification FROM extraction_cache '
+                'WHERE content_hash = ? AND mime_type = ? AND extractor_version = ?',
+                (content_hash, mime_type, extractor_version)
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            with conn:
+                conn.execute(
+                    'UPDATE extraction_cache SET hits = hits + 1, last_used_at = ? '
+                    'WHERE content_hash = ? AND mime_type = ?',
+                    (datetime.now().isoformat(), content_hash, mime_type)
+                )
+
+            cached = dict(row)
+            cached['classification'] = json.loads(cached['classification']) if cached['classification'] else None
+            return cached
+
+        except Exception as e:
+            logger.error(f"Erro ao consultar cache de extração: {str(e)}")
+            return None
+
+    def cache_extraction(
+        self,
+        content_hash: str,
+        mime_type: str,
+        extractor_version: str,
+        extracted_content: str,
+        content_type: str,
+        classification: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Registra extração e classificação de um conteúdo (substitui versões anteriores)"""
+        try:
+            now = datetime.now().isoformat()
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO extraction_cache (
+                        content_hash, mime_type, extractor_version, extracted_content, content_type,
+                        classification, hits, created_at, last_used_at
+                    ) VALUES (?, ?, ?, ?, ?, ?, 0, ?, ?)
+                    """,
+                    (
+                        content_hash, mime_type, extractor_version, extracted_content, content_type,
+                        json.dumps(classification, ensure_ascii=False) if classification else None,
+                        now, now
+                    )
+                )
+                self._prune_extraction_cache(conn)
+
+        except Exception as e:
+            logger.error(f"Erro ao gravar cache de extração: {str(e)}")
+
+    def _prune_extraction_cache(self, conn: sqlite3.Connection) -> int:
+        """Descarta entradas sem uso recente e mantém o cache dentro do limite de entradas"""
+        removed = 0
+
+        if self.extraction_cache_max_age_days > 0:
+            cutoff = (datetime.now() - timedelta(days=self.extraction_cache_max_age_days)).isoformat()
+            removed += conn.execute(
+                'DELETE FROM extraction_cache WHERE last_used_at < ?', (cutoff,)
+            ).rowcount
+
+        if self.extraction_cache_max_entries > 0:
+            # Acima do limite: remove as menos usadas recentemente (empate decidido por hits)
+            removed += conn.execute(
+                """
+                DELETE FROM extraction_cache WHERE rowid IN (
+                    SELECT rowid FROM extraction_cache
+                    ORDER BY last_used_at DESC, hits DESC
+                    LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.extraction_cache_max_entries,)
+            ).rowcount
+
+        if removed:
+            logger.info(f"🧹 {removed} entradas removidas do cache de extração")
+        return removed
+
+    def create_job(
+        self,
+        job_id: str,
+        session_id: str,
+        filename: str,
+        owner: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Registra job de processamento na fila"""
+        now = datetime.now().isoformat()
+        job = {
+            'job_id': job_id,
+            'session_id': session_id,
+            'filename': filename,
+            'status': 'queued',
+            'result': None,
+            'error': None,
+            'created_at': now,
+            'updated_at': now,
+            'owner': owner
+        }
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    """
+                    INSERT INTO attachment_jobs (
+                        job_id, session_id, filename, status, created_at, updated_at, owner
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (job_id, session_id, filename, job['status'], now, now, owner)
+                )
+        except Exception as e:
+            logger.error(f"Erro ao registrar job de anexo: {str(e)}")
+        return job
+
+    def update_job(
+        self,
+        job_id: str,
+        status: str,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None
+    ) -> None:
+        """Atualiza status de um job"""
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    'UPDATE attachment_jobs SET status = ?, result = ?, error = ?, updated_at = ? '
+                    'WHERE job_id = ?',
+                    (
+                        status,
+                        json.dumps(result, ensure_ascii=False) if result is not None else None,
+                        error,
+                        datetime.now().isoformat(),
+                        job_id
+                    )
+                )
+        except Exception as e:
+            logger.error(f"Erro ao atualizar job de anexo {job_id}: {str(e)}")
+
+    def fail_pending_job(self, job_id: str, error: str) -> bool:
+        """Marca como falho um job ainda pendente (não sobrescreve jobs já concluídos)"""
+        try:
+            conn = self._connection()
+            with conn:
+                cursor = conn.execute(
+                    "UPDATE attachment_jobs SET status = 'failed', error = ?, updated_at = ? "
+                    "WHERE job_id = ? AND status IN ('queued', 'processing')",
+                    (error, datetime.now().isoformat(), job_id)
+                )
+            return cursor.rowcount > 0
+
+        except Exception as e:
+            logger.error(f"Erro ao marcar job de anexo {job_id} como falho: {str(e)}")
+            return False
+
+    def delete_session_jobs(self, session_id: str) -> int:
+        """Remove jobs da sessão e retorna quantidade removida"""
+        try:
+            conn = self._connection()
+            with conn:
+                cursor = conn.execute('DELETE FROM attachment_jobs WHERE session_id = ?', (session_id,))
+            return cursor.rowcount
+
+        except Exception as e:
+            logger.error(f"Erro ao remover jobs da sessão {session_id}: {str(e)}")
+            return 0
+
+    def prune_jobs(self, finished_before: datetime) -> int:
+        """Remove jobs concluídos ou falhos cuja última atualização é anterior ao limite"""
+        try:
+            conn = self._connection()
+            with conn:
+                cursor = conn.execute(
+                    "DELETE FROM attachment_jobs WHERE status IN ('completed', 'failed') AND updated_at < ?",
+                    (finished_before.isoformat(),)
+                )
+            return cursor.rowcount
+
+        except Exception as e:
+            logger.error(f"Erro ao remover jobs antigos de anexos: {str(e)}")
+            return 0
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Busca job pelo ID"""
+        try:
+            row = self._connection().execute(
+                'SELECT * FROM attachment_jobs WHERE job_id = ?', (job_id,)
+            ).fetchone()
+            return self._job_to_dict(row) if row else None
+
+        except Exception as e:
+            logger.error(f"Erro ao buscar job de anexo {job_id}: {str(e)}")
+            return None
+
+    def get_session_jobs(self, session_id: str) -> List[Dict[str, Any]]:
+        """Lista jobs da sessão em ordem de envio"""
+        try:
+            rows = self._connection().execute(
+                'SELECT * FROM attachment_jobs WHERE session_id = ? ORDER BY created_at, job_id',
+                (session_id,)
+            ).fetchall()
+            return [self._job_to_dict(row) for row in rows]
+
+        except Exception as e:
+            logger.error(f"Erro ao listar jobs da sessão {session_id}: {str(e)}")
+            return []
+
+    def _job_to_dict(self, row: sqlite3.Row) -> Dict[str, Any]:
+        """Converte linha de job em dicionário"""
+        job = dict(row)
+        job['result'] = json.loads(job['result']) if job.get('result') else None
+        return job
+
+    def _row_to_dict(self, row: sqlite3.Row) -> Dict[str, Any]:
+        """Converte linha do banco em dicionário"""
+        attachment = dict(row)
+        try:
+            attachment['metadata'] = json.loads(attachment.get('metadata') or '{}')
+        except json.JSONDecodeError:
+            attachment['metadata'] = {}
+        return attachment
+
+# Instância global do armazenamento
+attachment_store = service_registry.register('attachment_store', AttachmentStore)
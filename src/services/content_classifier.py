@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Classificador de Conteúdo
+Classificação por palavras-chave em passagem única sobre o texto
+"""
+
+import re
+import logging
+from typing import Dict, List, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+class ContentClassifier:
+    """Pontua todas as categorias e extrai números em uma única varredura"""
+
+    def __init__(
+        self,
+        categories: Dict[str, List[str]],
+        auxiliary: Optional[Dict[str, List[str]]] = None,
+        max_numbers: int = 50,
+        secondary_ratio: float = 0.5
+    ):
+        """Compila um único padrão com todas as palavras-chave"""
+        self.categories = categories
+        self.auxiliary = auxiliary or {}
+        self.max_numbers = max_numbers
+        self.secondary_ratio = secondary_ratio
+
+        # Palavra-chave normalizada -> grupos (categorias ou auxiliares) a que pertence
+        self._keyword_groups: Dict[str, List[str]] = {}
+        for group, keywords in list(self.categories.items()) + list(self.auxiliary.items()):
+            for keyword in keywords:
+                groups = self._keyword_groups.setdefault(self._normalize(keyword), [])
+                if group not in groups:
+                    groups.append(group)
+
+        # Frases mais longas primeiro para que "prova social" vença "prova"
+        alternatives = sorted(self._keyword_groups, key=len, reverse=True)
+        keyword_pattern = '|'.join(
+            r'\s+'.join(re.escape(word) for word in keyword.split())
+            for keyword in alternatives
+        )
+        self._pattern = re.compile(
+            rf'\b({keyword_pattern})(?:s|es)?\b|(\d+(?:\.\d+)?%?)',
+            re.IGNORECASE
+        )
+
+    def classify(self, content: str) -> Dict[str, Any]:
+        """Retorna categoria principal, pontuação por categoria e números encontrados"""
+        scores = {category: 0 for category in self.categories}
+        keywords_found: Dict[str, List[str]] = {
+            group: [] for group in list(self.categories) + list(self.auxiliary)
+        }
+        numbers: List[str] = []
+        percentages: List[str] = []
+
+        for match in self._pattern.finditer(content):
+            keyword, number = match.group(1), match.group(2)
+
+            if keyword:
+                keyword = self._normalize(keyword)
+                for group in self._keyword_groups[keyword]:
+                    if group in scores:
+                        scores[group] += 1
+                    if keyword not in keywords_found[group]:
+                        keywords_found[group].append(keyword)
+
+            elif number:
+                if len(numbers) < self.max_numbers:
+                    numbers.append(number)
+                if number.endswith('%') and len(percentages) < self.max_numbers:
+                    percentages.append(number)
+
+        best_score = max(scores.values()) if scores else 0
+        category = 'geral'
+        secondary: List[str] = []
+
+        if best_score > 0:
+            category = max(scores, key=scores.get)
+            secondary = [
+                name for name, score in sorted(scores.items(), key=lambda item: item[1], reverse=True)
+                if name != category and score >= best_score * self.secondary_ratio
+            ]
+
+        return {
+            'category': category,
+            'scores': scores,
+            'secondary_categories': secondary,
+            'keywords_found': keywords_found,
+            'numbers': numbers,
+            'percentages': percentages
+        }
+
+    @staticmethod
+    def _normalize(keyword: str) -> str:
+        return ' '.join(keyword.lower().split())
@@ -8,11 +8,13 @@ Pesquisa avançada na internet com múltiplas fontes
 import os
 import logging
 import time
-import requests
 from typing import Dict, List, Optional, Any
 from urllib.parse import quote_plus
 import json
 from datetime import datetime
+from services.analysis_deadline import AnalysisDeadline, deadline_timeout
+from services.service_registry import service_registry
+from services.http_client import http_pool
 
 logger = logging.getLogger(__name__)
 
@@ -41,7 +43,8 @@ class DeepSearchService:
         self, 
         query: str, 
         context_data: Dict[str, Any],
-        max_results: int = 10
+        max_results: int = 10,
+        deadline: Optional[AnalysisDeadline] = None
     ) -> str:
         """Realiza busca profunda com múltiplas fontes"""
         
@@ -54,17 +57,20 @@ class DeepSearchService:
             
             # 1. Busca com Google Custom Search (se disponível)
             if self.google_search_key:
-                google_results = self._google_search(query, max_results // 2)
+                google_results = self._google_search(query, max_results // 2, deadline)
                 search_results.extend(google_results)
             
             # 2. Busca alternativa com DuckDuckGo
-            ddg_results = self._duckduckgo_search(query, max_results // 2)
+            ddg_results = self._duckduckgo_search(query, max_results // 2, deadline)
             search_results.extend(ddg_results)
             
             # 3. Extrai conteúdo das páginas encontradas
             content_results = []
             for result in search_results[:5]:  # Limita a 5 páginas
-                content = self._extract_page_content(result.get('url', ''))
+                if deadline and deadline.expired():
+                    deadline.skip("deep_search_page_extraction")
+                    break
+                content = self._extract_page_content(result.get('url', ''), deadline)
                 if content:
                     content_results.append({
                         'title': result.get('title', ''),
@@ -73,9 +79,9 @@ class DeepSearchService:
                     })
             
             # 4. Processa com DeepSeek (se disponível)
-            if self.deepseek_api_key and content_results:
+            if self.deepseek_api_key and content_results and not (deadline and deadline.expired()):
                 processed_content = self._process_with_deepseek(
-                    query, context_data, content_results
+                    query, context_data, content_results, deadline
                 )
             else:
                 processed_content = self._process_basic_content(content_results)
@@ -89,7 +95,12 @@ class DeepSearchService:
             logger.error(f"Erro na busca profunda: {str(e)}")
             return self._generate_fallback_search(query, context_data)
     
-    def _google_search(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+    def _google_search(
+        self, 
+        query: str, 
+        max_results: int,
+        deadline: Optional[AnalysisDeadline] = None
+    ) -> List[Dict[str, Any]]:
         """Busca usando Google Custom Search API"""
         try:
             if not self.google_search_key:
@@ -104,11 +115,11 @@ class DeepSearchService:
                 'gl': 'br'
             }
             
-            response = requests.get(
+            response = http_pool.session().get(
                 self.google_search_url, 
                 params=params, 
                 headers=self.headers,
-                timeout=10
+                timeout=deadline_timeout(deadline, 10)
             )
             
             if response.status_code == 200:
@@ -133,18 +144,23 @@ class DeepSearchService:
             logger.error(f"Erro no Google Search: {str(e)}")
             return []
     
-    def _duckduckgo_search(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+    def _duckduckgo_search(
+        self, 
+        query: str, 
+        max_results: int,
+        deadline: Optional[AnalysisDeadline] = None
+    ) -> List[Dict[str, Any]]:
         """Busca usando DuckDuckGo (método alternativo)"""
         try:
             # Simula busca DuckDuckGo via scraping básico
             search_url = f"https://html.duckduckgo.com/html/?q={quote_plus(query)}"
             
-            response = requests.get(
+            response = http_pool.session().get(
                 search_url,
                 headers={
                     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
                 },
-                timeout=10
+                timeout=deadline_timeout(deadline, 10)
             )
             
             if response.status_code == 200:
@@ -176,7 +192,11 @@ class DeepSearchService:
             logger.error(f"Erro no DuckDuckGo Search: {str(e)}")
             return []
     
-    def _extract_page_content(self, url: str) -> Optional[str]:
+    def _extract_page_content(
+        self, 
+        url: str,
+        deadline: Optional[AnalysisDeadline] = None
+    ) -> Optional[str]:
         """Extrai conteúdo de uma página web"""
         try:
             if not url or not url.startswith('http'):
@@ -184,15 +204,19 @@ class DeepSearchService:
             
             # Usa Jina Reader se disponível
             if self.jina_api_key:
-                return self._extract_with_jina(url)
+                return self._extract_with_jina(url, deadline)
             else:
-                return self._extract_basic(url)
+                return self._extract_basic(url, deadline)
                 
         except Exception as e:
             logger.error(f"Erro ao extrair conteúdo de {url}: {str(e)}")
             return None
     
-    def _extract_with_jina(self, url: str) -> Optional[str]:
+    def _extract_with_jina(
+        self, 
+        url: str,
+        deadline: Optional[AnalysisDeadline] = None
+    ) -> Optional[str]:
         """Extrai conteúdo usando Jina Reader"""
         try:
             headers = {
@@ -200,10 +224,10 @@ class DeepSearchService:
                 'Accept': 'application/json'
             }
             
-            response = requests.get(
+            response = http_pool.session().get(
                 f"{self.jina_reader_url}{url}",
                 headers=headers,
-                timeout=15
+                timeout=deadline_timeout(deadline, 15)
             )
             
             if response.status_code == 200:
@@ -215,13 +239,17 @@ class DeepSearchService:
             logger.error(f"Erro no Jina Reader: {str(e)}")
             return None
     
-    def _extract_basic(self, url: str) -> Optional[str]:
+    def _extract_basic(
+        self, 
+        url: str,
+        deadline: Optional[AnalysisDeadline] = None
+    ) -> Optional[str]:
         """Extração básica de conteúdo"""
         try:
-            response = requests.get(
+            response = http_pool.session().get(
                 url,
                 headers=self.headers,
-                timeout=10
+                timeout=deadline_timeout(deadline, 10)
             )
             
             if response.status_code == 200:
@@ -253,7 +281,8 @@ class DeepSearchService:
         self, 
         query: str, 
         context: Dict[str, Any], 
-        content_results: List[Dict[str, Any]]
+        content_results: List[Dict[str, Any]],
+        deadline: Optional[AnalysisDeadline] = None
     ) -> str:
         """Processa resultados usando DeepSeek"""
         try:
@@ -298,11 +327,11 @@ Seja conciso e focado nos dados mais relevantes.
                 'Content-Type': 'application/json'
             }
             
-            response = requests.post(
+            response = http_pool.session().post(
                 self.deepseek_url,
                 json=payload,
                 headers=headers,
-                timeout=30
+                timeout=deadline_timeout(deadline, 30)
             )
             
             if response.status_code == 200:
@@ -355,5 +384,5 @@ Nota: Esta é uma análise básica. Para resultados mais precisos, configure as
 """
 
 # Instância global do serviço
-deep_search_service = DeepSearchService()
+deep_search_service = service_registry.register('deep_search', DeepSearchService)
 
@@ -7,9 +7,10 @@ Cliente para integração com DeepSeek API para análise complementar
 
 import os
 import logging
-import requests
 import json
 from typing import Optional, Dict, Any
+from services.service_registry import service_registry
+from services.http_client import http_pool
 
 logger = logging.getLogger(__name__)
 
@@ -65,7 +66,7 @@ class DeepSeekClient:
                 "stream": False
             }
             
-            response = requests.post(
+            response = http_pool.session().post(
                 f"{self.base_url}/chat/completions",
                 headers=self.headers,
                 json=payload,
@@ -109,9 +110,5 @@ class DeepSeekClient:
         return self.generate_text(prompt, max_tokens=1500, temperature=0.8)
 
 # Instância global (opcional)
-try:
-    deepseek_client = DeepSeekClient()
-except Exception as e:
-    logger.error(f"Erro ao inicializar DeepSeek client: {str(e)}")
-    deepseek_client = None
+deepseek_client = service_registry.register('deepseek', DeepSeekClient, optional=True, fork_safe=False)
 
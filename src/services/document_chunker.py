@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Fragmentação de Documentos
+Divisão semântica dos anexos e seleção dos trechos mais relevantes por análise
+"""
+
+import re
+import math
+import logging
+from collections import Counter
+from typing import Dict, List, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+STOPWORDS = {
+    'para', 'com', 'sem', 'por', 'que', 'dos', 'das', 'nos', 'nas', 'uma', 'uns', 'umas',
+    'como', 'mais', 'menos', 'entre', 'sobre', 'pelo', 'pela', 'pelos', 'pelas', 'este',
+    'esta', 'esse', 'essa', 'isso', 'isto', 'seu', 'sua', 'seus', 'suas', 'são', 'ser',
+    'foi', 'tem', 'ter', 'não', 'sim', 'the', 'and', 'for', 'with'
+}
+
+class DocumentChunker:
+    """Fragmenta textos por títulos, parágrafos e tabelas e recupera trechos relevantes"""
+
+    def __init__(self, target_size: int = 1500, max_size: int = 3000):
+        """Define tamanhos de trecho em caracteres"""
+        self.target_size = target_size
+        self.max_size = max_size
+
+        self._block_pattern = re.compile(r'\S[\s\S]*?(?=\n[ \t]*\n|\Z)')
+        self._token_pattern = re.compile(r'\w{3,}')
+        self._sentence_pattern = re.compile(r'(?<=[.!?;])\s+')
+
+    def chunk(self, text: str) -> List[Dict[str, Any]]:
+        """Divide o texto em trechos preservando os offsets no documento original"""
+        chunks: List[Dict[str, Any]] = []
+        current: Optional[Dict[str, Any]] = None
+        heading: Optional[str] = None
+
+        for start, end, kind in self._iter_blocks(text):
+            if kind == 'heading':
+                heading = text[start:end].strip()
+
+            starts_new = (
+                current is None
+                or kind in ('heading', 'table')
+                or current['kind'] == 'table'
+                or end - current['start'] > self.target_size
+            )
+
+            if starts_new:
+                if current:
+                    chunks.append(current)
+                current = {'start': start, 'end': end, 'kind': kind, 'heading': heading}
+            else:
+                current['end'] = end
+                if current['kind'] == 'heading':
+                    current['kind'] = 'section'
+
+        if current:
+            chunks.append(current)
+
+        for index, chunk in enumerate(chunks):
+            chunk['index'] = index
+            chunk['text'] = text[chunk['start']:chunk['end']]
+
+        return chunks
+
+    def _iter_blocks(self, text: str):
+        """Gera blocos (início, fim, tipo), dividindo os que excedem o tamanho máximo"""
+        for match in self._block_pattern.finditer(text):
+            start, end = match.start(), match.end()
+            block = match.group(0)
+            kind = self._block_kind(block)
+
+            if end - start <= self.max_size:
+                yield start, end, kind
+                continue
+
+            # Blocos grandes: quebra por linha (tabelas) ou por frase (texto)
+            pattern = re.compile(r'\n') if kind == 'table' else self._sentence_pattern
+            piece_start = start
+            for separator in pattern.finditer(block):
+                split_at = start + separator.end()
+                if split_at - piece_start >= self.target_size:
+                    yield piece_start, split_at, kind
+                    piece_start = split_at
+            while end - piece_start > self.max_size:
+                yield piece_start, piece_start + self.max_size, kind
+                piece_start += self.max_size
+            if piece_start < end:
+                yield piece_start, end, kind
+
+    def _block_kind(self, block: str) -> str:
+        """Identifica se o bloco é título, tabela ou parágrafo"""
+        lines = [line for line in block.splitlines() if line.strip()]
+        first = lines[0].strip()
+
+        if first.startswith(('TABELA:', 'PLANILHA')):
+            return 'table'
+
+        if len(lines) >= 3:
+            delimited = sum(1 for line in lines if line.count('|') >= 2 or line.count('\t') >= 2 or line.count(',') >= 3)
+            if delimited >= len(lines) * 0.8:
+                return 'table'
+
+        if len(lines) == 1 and len(first) <= 100 and (
+            first.startswith('#')
+            or first.endswith(':')
+            or (first.isupper() and any(char.isalpha() for char in first))
+            or re.match(r'^\d+(\.\d+)*[.)]?\s+\w', first)
+        ):
+            return 'heading'
+
+        return 'paragraph'
+
+    def build_query(self, data: Dict[str, Any]) -> str:
+        """Monta consulta de recuperação a partir dos campos textuais da análise"""
+        return " ".join(
+            str(value) for key, value in data.items()
+            if key != 'session_id' and isinstance(value, (str, int, float)) and not isinstance(value, bool)
+        )
+
+    def select_relevant(
+        self,
+        attachments: List[Dict[str, Any]],
+        query: str,
+        budget_chars: int
+    ) -> Dict[str, Any]:
+        """Seleciona os trechos mais relevantes de cada anexo dentro do orçamento"""
+        candidates = []
+        for position, att in enumerate(attachments):
+            content = att.get("extracted_content")
+            if not content:
+                continue
+            for chunk in self.chunk(content):
+                chunk['attachment_position'] = position
+                chunk['filename'] = att.get("original_filename") or att.get("filename")
+                chunk['tokens'] = Counter(self._tokenize(chunk['text']))
+                candidates.append(chunk)
+
+        total_length = sum(len(chunk['text']) for chunk in candidates)
+        if not candidates:
+            return {"combined_content": "", "chunks": [], "total_length": 0, "selected_length": 0}
+
+        self._score(candidates, query)
+
+        selected = []
+        used = 0
+
+        # Garante o trecho mais relevante de cada anexo
+        best_by_attachment: Dict[int, Dict[str, Any]] = {}
+        for chunk in candidates:
+            best = best_by_attachment.get(chunk['attachment_position'])
+            if best is None or chunk['score'] > best['score']:
+                best_by_attachment[chunk['attachment_position']] = chunk
+
+        for chunk in sorted(best_by_attachment.values(), key=lambda c: c['score'], reverse=True):
+            if used + len(chunk['text']) <= budget_chars:
+                selected.append(chunk)
+                used += len(chunk['text'])
+
+        # Completa o orçamento pela relevância global
+        chosen = {id(chunk) for chunk in selected}
+        for chunk in sorted(candidates, key=lambda c: c['score'], reverse=True):
+            if id(chunk) in chosen:
+                continue
+            if used + len(chunk['text']) <= budget_chars:
+                selected.append(chunk)
+                used += len(chunk['text'])
+
+        # Ordem de leitura: anexo e posição no documento
+        selected.sort(key=lambda c: (c['attachment_position'], c['start']))
+
+        parts = []
+        for chunk in selected:
+            header = f"[{chunk['filename']} | trecho {chunk['index'] + 1} | caracteres {chunk['start']}-{chunk['end']}]"
+            parts.append(f"{header}\n{chunk['text']}")
+
+        logger.info(f"📑 {len(selected)}/{len(candidates)} trechos de anexos selecionados ({used}/{total_length} caracteres)")
+
+        return {
+            "combined_content": "\n\n".join(parts),
+            "chunks": [
+                {
+                    "filename": chunk['filename'],
+                    "index": chunk['index'],
+                    "start": chunk['start'],
+                    "end": chunk['end'],
+                    "kind": chunk['kind'],
+                    "heading": chunk['heading'],
+                    "score": round(chunk['score'], 4)
+                }
+                for chunk in selected
+            ],
+            "total_length": total_length,
+            "selected_length": used
+        }
+
+    def _score(self, candidates: List[Dict[str, Any]], query: str) -> None:
+        """Pontua trechos por BM25 simplificado em relação aos termos da análise"""
+        terms = set(self._tokenize(query))
+        document_count = len(candidates)
+        average_length = sum(sum(c['tokens'].values()) for c in candidates) / document_count or 1.0
+
+        document_frequency = Counter()
+        for chunk in candidates:
+            document_frequency.update(terms.intersection(chunk['tokens']))
+
+        for chunk in candidates:
+            length = sum(chunk['tokens'].values()) or 1
+            score = 0.0
+            for term in terms:
+                frequency = chunk['tokens'].get(term, 0)
+                if not frequency:
+                    continue
+                idf = math.log(1 + (document_count - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+                score += idf * frequency * 2.2 / (frequency + 1.2 * (0.25 + 0.75 * length / average_length))
+
+            # Títulos de seção que citam os termos reforçam o trecho
+            if chunk['heading'] and terms.intersection(self._tokenize(chunk['heading'])):
+                score *= 1.2
+            chunk['score'] = score
+
+    def _tokenize(self, text: str) -> List[str]:
+        return [
+            token for token in self._token_pattern.findall(text.lower())
+            if token not in STOPWORDS and not token.isdigit()
+        ]
+
+# Instância global do fragmentador
+document_chunker = DocumentChunker()
@@ -15,6 +15,10 @@ import concurrent.futures
 from services.gemini_client import gemini_client
 from services.websailor_integration import websailor_agent
 from services.attachment_service import attachment_service
+from services.document_chunker import document_chunker
+from services.attachment_jobs import attachment_job_manager
+from services.analysis_deadline import AnalysisDeadline, deadline_timeout
+from services.service_registry import service_registry
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +28,12 @@ class UltraRobustAnalysisEngine:
     def __init__(self):
         """Inicializa o motor de análise"""
         self.max_analysis_time = 600  # 10 minutos máximo
+        self.consolidation_reserve_time = 30  # Reserva para sistemas avançados e consolidação
+        self.collection_time_share = 0.6  # Fração do tempo restante para coleta de dados
+        self.min_time_per_query = 20  # Tempo mínimo para iniciar uma nova query de pesquisa
+        self.attachment_wait_time = 120  # Espera máxima por anexos ainda em processamento
+        self.gemini_timeout = 600  # Limite da chamada principal ao Gemini (reduzido pelo prazo restante)
+        self.huggingface_timeout = 60  # Limite da análise complementar
         self.deep_research_enabled = True
         self.multi_ai_enabled = True
         self.visual_proofs_enabled = True
@@ -40,20 +50,25 @@ class UltraRobustAnalysisEngine:
         """Gera análise ultra-detalhada com múltiplas fontes"""
         
         start_time = time.time()
+        deadline = AnalysisDeadline(self.max_analysis_time, self.consolidation_reserve_time)
         logger.info(f"🚀 INICIANDO ANÁLISE ULTRA-ROBUSTA para {data.get('segmento')}")
         
         try:
             # 1. Coleta de dados de múltiplas fontes
-            research_data = self._collect_comprehensive_data(data, session_id)
+            research_data = self._collect_comprehensive_data(
+                data, session_id, deadline.phase(self.collection_time_share)
+            )
             
             # 2. Análise com múltiplas IAs em paralelo
-            ai_analyses = self._run_multi_ai_ultra_analysis(data, research_data)
+            ai_analyses = self._run_multi_ai_ultra_analysis(data, research_data, deadline)
             
             # 3. Implementação dos sistemas avançados dos documentos
-            advanced_systems = self._implement_document_systems(data, ai_analyses, research_data)
+            advanced_systems = self._implement_document_systems(data, ai_analyses, research_data, deadline)
             
-            # 4. Consolidação e síntese final ultra-detalhada
-            final_analysis = self._consolidate_ultra_analyses(data, research_data, ai_analyses, advanced_systems)
+            # 4. Consolidação e síntese final ultra-detalhada (usa a reserva de tempo)
+            final_analysis = self._consolidate_ultra_analyses(
+                data, research_data, ai_analyses, advanced_systems, deadline
+            )
             
             # 5. Enriquecimento com dados específicos ultra-detalhados
             enriched_analysis = self._enrich_with_ultra_specific_data(final_analysis, data, advanced_systems)
@@ -77,6 +92,8 @@ class UltraRobustAnalysisEngine:
             enriched_analysis["metadata_ultra_detalhado"]["systems_list"] = list(advanced_systems.keys())
             enriched_analysis["metadata_ultra_detalhado"]["completeness_score"] = self._calculate_completeness_score(enriched_analysis)
             enriched_analysis["metadata_ultra_detalhado"]["depth_level"] = "ULTRA_PROFUNDO"
+            enriched_analysis["metadata_ultra_detalhado"]["degraded"] = deadline.degraded
+            enriched_analysis["metadata_ultra_detalhado"]["deadline"] = deadline.to_metadata()
             
             logger.info(f"✅ ANÁLISE ULTRA-ROBUSTA CONCLUÍDA em {processing_time:.2f} segundos")
             return enriched_analysis
@@ -88,7 +105,8 @@ class UltraRobustAnalysisEngine:
     def _collect_comprehensive_data(
         self, 
         data: Dict[str, Any], 
-        session_id: Optional[str]
+        session_id: Optional[str],
+        deadline: Optional[AnalysisDeadline] = None
     ) -> Dict[str, Any]:
         """Coleta dados ultra-abrangentes de TODAS as fontes possíveis"""
         
@@ -108,15 +126,20 @@ class UltraRobustAnalysisEngine:
         # 1. PROCESSAMENTO ULTRA-DETALHADO DE ANEXOS
         if session_id:
             logger.info("📎 Processando anexos com análise ultra-detalhada...")
+            
+            # Aguarda apenas os anexos desta sessão ainda em processamento
+            if not attachment_job_manager.wait_for_session(
+                session_id, deadline_timeout(deadline, self.attachment_wait_time)
+            ) and deadline:
+                deadline.skip("pending_attachments")
+            
             attachments = attachment_service.get_session_attachments(session_id)
             if attachments:
-                combined_content = ""
                 attachment_analysis = {}
                 
                 for att in attachments:
                     if att.get("extracted_content"):
                         content = att["extracted_content"]
-                        combined_content += content + "\n\n"
                         
                         # Análise específica por tipo de anexo
                         content_type = att.get("content_type", "geral")
@@ -131,13 +154,19 @@ class UltraRobustAnalysisEngine:
                             "detailed_analysis": detailed_analysis
                         })
                 
+                # Trechos mais relevantes de cada anexo, em vez de truncar o texto concatenado
+                retrieval = document_chunker.select_relevant(
+                    attachments, document_chunker.build_query(data), budget_chars=20000
+                )
+                
                 research_data["attachments"] = {
                     "count": len(attachments),
-                    "combined_content": combined_content[:20000],  # Aumentado para 20k
+                    "combined_content": retrieval["combined_content"],
+                    "chunks": retrieval["chunks"],
                     "types_analysis": attachment_analysis,
-                    "total_length": len(combined_content)
+                    "total_length": retrieval["total_length"]
                 }
-                research_data["total_content_length"] += len(combined_content)
+                research_data["total_content_length"] += retrieval["total_length"]
                 logger.info(f"✅ {len(attachments)} anexos processados com análise ultra-detalhada")
         
         # 2. PESQUISA WEB ULTRA-PROFUNDA
@@ -148,6 +177,10 @@ class UltraRobustAnalysisEngine:
             queries = self._generate_ultra_strategic_queries(data)
             
             for i, query in enumerate(queries):
+                if deadline and not deadline.has_time_for(self.min_time_per_query):
+                    deadline.skip(f"web_research_queries_{i+1}_to_{len(queries)}")
+                    break
+                
                 logger.info(f"🔍 Query {i+1}/{len(queries)}: {query}")
                 
                 web_result = websailor_agent.navigate_and_research(
@@ -159,7 +192,8 @@ class UltraRobustAnalysisEngine:
                     },
                     max_pages=15,  # Aumentado para pesquisa ultra-profunda
                     depth=3,  # Profundidade máxima
-                    aggressive_mode=True  # Modo agressivo sempre ativo
+                    aggressive_mode=True,  # Modo agressivo sempre ativo
+                    deadline=deadline
                 )
                 
                 research_data["web_research"][f"ultra_query_{i+1}"] = web_result
@@ -170,7 +204,7 @@ class UltraRobustAnalysisEngine:
                 research_content = web_result.get("research_summary", {}).get("combined_content", "")
                 research_data["total_content_length"] += len(research_content)
             
-            logger.info(f"✅ Pesquisa web ultra-profunda concluída: {len(queries)} queries, {len(research_data['sources'])} fontes")
+            logger.info(f"✅ Pesquisa web ultra-profunda concluída: {research_data['research_iterations']} queries, {len(research_data['sources'])} fontes")
         
         # 3. INTELIGÊNCIA DE MERCADO ULTRA-AVANÇADA
         research_data["market_intelligence"] = self._gather_ultra_market_intelligence(data)
@@ -190,7 +224,8 @@ class UltraRobustAnalysisEngine:
     def _run_multi_ai_ultra_analysis(
         self, 
         data: Dict[str, Any], 
-        research_data: Dict[str, Any]
+        research_data: Dict[str, Any],
+        deadline: Optional[AnalysisDeadline] = None
     ) -> Dict[str, Any]:
         """Executa análise com múltiplas IAs de forma ultra-detalhada"""
         
@@ -199,22 +234,30 @@ class UltraRobustAnalysisEngine:
         ai_analyses = {}
         
         # 1. ANÁLISE PRINCIPAL COM GEMINI PRO (ULTRA-DETALHADA)
-        if gemini_client:
+        if gemini_client and deadline and deadline.expired():
+            deadline.skip("gemini_ultra_analysis")
+        elif gemini_client:
             try:
                 logger.info("🤖 Executando análise Gemini Pro ultra-detalhada...")
-                gemini_analysis = self._run_ultra_gemini_analysis(data, research_data)
+                gemini_analysis = self._run_ultra_gemini_analysis(data, research_data, deadline)
                 ai_analyses["gemini_ultra"] = gemini_analysis
                 logger.info("✅ Análise Gemini Pro ultra-detalhada concluída")
             except Exception as e:
                 logger.error(f"❌ Erro na análise Gemini: {str(e)}")
         
-        # 2. ANÁLISE COMPLEMENTAR COM HUGGINGFACE
+        # 2. ANÁLISE COMPLEMENTAR COM HUGGINGFACE (opcional)
+        if deadline and not deadline.has_time_for(self.min_time_per_query):
+            deadline.skip("huggingface_ultra_analysis")
+            return ai_analyses
+        
         try:
             from services.huggingface_client import HuggingFaceClient
             huggingface_client = HuggingFaceClient()
             if huggingface_client.is_available():
                 logger.info("🤖 Executando análise HuggingFace complementar...")
-                hf_analysis = self._run_huggingface_ultra_analysis(data, research_data, huggingface_client)
+                hf_analysis = self._run_huggingface_ultra_analysis(
+                    data, research_data, huggingface_client, deadline_timeout(deadline, self.huggingface_timeout)
+                )
                 ai_analyses["huggingface_ultra"] = hf_analysis
                 logger.info("✅ Análise HuggingFace concluída")
         except Exception as e:
@@ -228,50 +271,91 @@ class UltraRobustAnalysisEngine:
         
         return ai_analyses
     
+    def _run_ultra_gemini_analysis(
+        self,
+        data: Dict[str, Any],
+        research_data: Dict[str, Any],
+        deadline: Optional[AnalysisDeadline] = None
+    ) -> Dict[str, Any]:
+        """Executa análise principal com Gemini usando o contexto coletado"""
+        
+        # Conteúdo consolidado de cada query de pesquisa web
+        search_context = "\n\n".join(
+            result.get("research_summary", {}).get("combined_content", "")
+            for result in research_data.get("web_research", {}).values()
+            if isinstance(result, dict)
+        ).strip()
+        
+        return gemini_client.generate_ultra_detailed_analysis(
+            analysis_data=data,
+            search_context=search_context[:20000] or None,
+            attachments_context=research_data.get("attachments", {}).get("combined_content"),
+            timeout=deadline_timeout(deadline, self.gemini_timeout)
+        )
+    
+    def _run_huggingface_ultra_analysis(
+        self,
+        data: Dict[str, Any],
+        research_data: Dict[str, Any],
+        huggingface_client: Any,
+        timeout: float = 60
+    ) -> Dict[str, Any]:
+        """Executa análise estratégica complementar com HuggingFace"""
+        
+        analysis = self._run_huggingface_analysis(data, research_data, huggingface_client, timeout)
+        analysis["model"] = "HuggingFace"
+        return analysis
+    
+    def _perform_cross_ai_analysis(self, ai_analyses: Dict[str, Any]) -> Dict[str, Any]:
+        """Resumo da validação cruzada entre as IAs que responderam"""
+        
+        models = [name for name, analysis in ai_analyses.items() if analysis]
+        return {
+            "models_compared": models,
+            "models_count": len(models),
+            "primary_model": "gemini_ultra" if "gemini_ultra" in models else (models[0] if models else None),
+            "complementary_insights": bool(
+                ai_analyses.get("huggingface_ultra", {}).get("strategic_insights")
+            )
+        }
+
     def _implement_document_systems(
         self, 
         data: Dict[str, Any], 
         ai_analyses: Dict[str, Any], 
-        research_data: Dict[str, Any]
+        research_data: Dict[str, Any],
+        deadline: Optional[AnalysisDeadline] = None
     ) -> Dict[str, Any]:
-        """Implementa TODOS os sistemas dos documentos anexos"""
+        """Implementa TODOS os sistemas dos documentos anexos (opcionais quando o prazo acaba)"""
         
         logger.info("⚡ Implementando sistemas avançados dos documentos...")
         
-        advanced_systems = {}
-        
-        # 1. SISTEMA DE PROVAS VISUAIS INSTANTÂNEAS
-        if self.visual_proofs_enabled:
-            logger.info("🎯 Implementando Sistema de Provas Visuais...")
-            advanced_systems["provas_visuais"] = self._implement_visual_proofs_system(
-                data, ai_analyses, research_data
-            )
-        
-        # 2. ARQUITETO DE DRIVERS MENTAIS
-        if self.mental_drivers_enabled:
-            logger.info("🧠 Implementando Arquiteto de Drivers Mentais...")
-            advanced_systems["drivers_mentais"] = self._implement_mental_drivers_system(
-                data, ai_analyses, research_data
-            )
-        
-        # 3. PRÉ-PITCH INVISÍVEL
-        logger.info("🎭 Implementando Sistema de Pré-Pitch Invisível...")
-        advanced_systems["pre_pitch"] = self._implement_pre_pitch_system(
-            data, ai_analyses, research_data
-        )
+        systems = [
+            ("provas_visuais", "🎯 Implementando Sistema de Provas Visuais...",
+             self.visual_proofs_enabled, self._implement_visual_proofs_system),
+            ("drivers_mentais", "🧠 Implementando Arquiteto de Drivers Mentais...",
+             self.mental_drivers_enabled, self._implement_mental_drivers_system),
+            ("pre_pitch", "🎭 Implementando Sistema de Pré-Pitch Invisível...",
+             True, self._implement_pre_pitch_system),
+            ("anti_objecao", "🛡️ Implementando Engenharia Anti-Objeção...",
+             self.objection_handling_enabled, self._implement_objection_handling_system),
+            ("ancoragem_psicologica", "⚓ Implementando Sistema de Ancoragem Psicológica...",
+             True, self._implement_psychological_anchoring)
+        ]
         
-        # 4. ENGENHARIA ANTI-OBJEÇÃO
-        if self.objection_handling_enabled:
-            logger.info("🛡️ Implementando Engenharia Anti-Objeção...")
-            advanced_systems["anti_objecao"] = self._implement_objection_handling_system(
-                data, ai_analyses, research_data
-            )
+        advanced_systems = {}
         
-        # 5. SISTEMA DE ANCORAGEM PSICOLÓGICA
-        logger.info("⚓ Implementando Sistema de Ancoragem Psicológica...")
-        advanced_systems["ancoragem_psicologica"] = self._implement_psychological_anchoring(
-            data, ai_analyses, research_data
-        )
+        for name, message, enabled, implement in systems:
+            if not enabled:
+                continue
+            
+            # Sem tempo restante: sistemas pendentes são descartados (consolidação usa a reserva)
+            if deadline and deadline.expired():
+                deadline.skip(f"advanced_system_{name}")
+                continue
+            
+            logger.info(message)
+            advanced_systems[name] = implement(data, ai_analyses, research_data)
         
         logger.info(f"✅ {len(advanced_systems)} sistemas avançados implementados")
         return advanced_systems
@@ -281,7 +365,8 @@ class UltraRobustAnalysisEngine:
         data: Dict[str, Any], 
         research_data: Dict[str, Any], 
         ai_analyses: Dict[str, Any],
-        advanced_systems: Dict[str, Any]
+        advanced_systems: Dict[str, Any],
+        deadline: Optional[AnalysisDeadline] = None
     ) -> Dict[str, Any]:
         """Consolida análises ultra-detalhadas de múltiplas IAs com sistemas avançados"""
         
@@ -311,18 +396,20 @@ class UltraRobustAnalysisEngine:
             # Insights exclusivos ultra-profundos
             "insights_exclusivos_ultra": self._generate_ultra_exclusive_insights(
                 research_data, ai_analyses, advanced_systems
-            ),
-            
-            # Plano de implementação completo
-            "plano_implementacao_completo": self._create_complete_implementation_plan(
+            )
+        }
+        
+        # Plano e métricas são opcionais: descartados se a reserva de consolidação também acabou
+        if deadline and deadline.overrun():
+            deadline.skip("implementation_plan")
+            deadline.skip("success_metrics")
+        else:
+            consolidated_analysis["plano_implementacao_completo"] = self._create_complete_implementation_plan(
                 data, advanced_systems
-            ),
-            
-            # Métricas de sucesso avançadas
-            "metricas_sucesso_avancadas": self._create_advanced_success_metrics(
+            )
+            consolidated_analysis["metricas_sucesso_avancadas"] = self._create_advanced_success_metrics(
                 data, main_analysis
             )
-        }
         
         # Adiciona insights do HuggingFace se disponível
         if "huggingface_ultra" in ai_analyses:
@@ -934,64 +1021,6 @@ class UltraRobustAnalysisEngine:
     
     def _identify_competitor_vulnerabilities(self, competitor, segment):
         return ["Dependência de poucos canais", "Falta de personalização", "Suporte limitado"]
-        self, 
-        data: Dict[str, Any], 
-        session_id: Optional[str]
-    ) -> Dict[str, Any]:
-        """Coleta dados abrangentes de múltiplas fontes"""
-        
-        logger.info("Coletando dados abrangentes...")
-        research_data = {
-            "attachments": {},
-            "web_research": {},
-            "market_intelligence": {},
-            "sources": []
-        }
-        
-        # Coleta dados de anexos
-        if session_id:
-            attachments = attachment_service.get_session_attachments(session_id)
-            if attachments:
-                combined_content = ""
-                for att in attachments:
-                    if att.get("extracted_content"):
-                        combined_content += att["extracted_content"] + "\n\n"
-                
-                research_data["attachments"] = {
-                    "count": len(attachments),
-                    "content": combined_content[:8000],  # Limita para não estourar tokens
-                    "types": [att.get("file_type", "unknown") for att in attachments]
-                }
-                logger.info(f"Dados de {len(attachments)} anexos coletados")
-        
-        # Pesquisa web profunda com WebSailor
-        if websailor_agent.is_available() and data.get("query"):
-            logger.info("Realizando pesquisa web profunda...")
-            
-            # Múltiplas queries para pesquisa abrangente
-            queries = self._generate_research_queries(data)
-            
-            for query in queries:
-                web_result = websailor_agent.navigate_and_research(
-                    query,
-                    context={
-                        "segmento": data["segmento"],
-                        "produto": data["produto"],
-                        "publico": data["publico"]
-                    },
-                    max_pages=7,  # Aumentado para pesquisa mais profunda
-                    depth=2  # Pesquisa em profundidade
-                )
-                
-                research_data["web_research"][query] = web_result
-                research_data["sources"].extend(web_result.get("sources", []))
-            
-            logger.info(f"Pesquisa web concluída com {len(queries)} queries")
-        
-        # Inteligência de mercado adicional
-        research_data["market_intelligence"] = self._gather_market_intelligence(data)
-        
-        return research_data
     
     def _generate_research_queries(self, data: Dict[str, Any]) -> List[str]:
         """Gera múltiplas queries para pesquisa abrangente"""
@@ -1201,7 +1230,8 @@ class UltraRobustAnalysisEngine:
         self, 
         data: Dict[str, Any], 
         research_data: Dict[str, Any],
-        huggingface_client: Any
+        huggingface_client: Any,
+        timeout: float = 60
     ) -> Dict[str, Any]:
         """Executa análise complementar com DeepSeek"""
         
@@ -1225,7 +1255,7 @@ class UltraRobustAnalysisEngine:
         Formato: Lista numerada com explicação detalhada de cada insight.
         """
         
-        response = huggingface_client.generate_text(prompt, max_tokens=1000)
+        response = huggingface_client.generate_text(prompt, max_tokens=1000, timeout=timeout)
         
         return {
             "strategic_insights": response,
@@ -1628,5 +1658,5 @@ class UltraRobustAnalysisEngine:
         }
 
 # Instância global do motor
-enhanced_analysis_engine = UltraRobustAnalysisEngine()
+enhanced_analysis_engine = service_registry.register('analysis_engine', UltraRobustAnalysisEngine)
 
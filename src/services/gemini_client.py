@@ -10,8 +10,8 @@ import logging
 import json
 import time
 from typing import Dict, List, Optional, Any
-import google.generativeai as genai
 from datetime import datetime
+from services.service_registry import service_registry
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +24,9 @@ class UltraRobustGeminiClient:
         if not self.api_key:
             raise ValueError("GEMINI_API_KEY não configurada")
         
+        # SDK importado apenas ao criar o cliente (primeiro uso)
+        import google.generativeai as genai
+        
         # Configura API
         genai.configure(api_key=self.api_key)
         
@@ -71,13 +74,27 @@ class UltraRobustGeminiClient:
             logger.error(f"Erro ao testar Gemini: {str(e)}")
             return False
     
+    def generate_content(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """Gera texto livre para um prompt (timeout em segundos, derivado do prazo da análise)"""
+        response = self.model.generate_content(
+            prompt,
+            generation_config=self.generation_config,
+            safety_settings=self.safety_settings,
+            request_options={'timeout': timeout} if timeout else None
+        )
+        
+        if not response.text:
+            raise Exception("Resposta vazia do Gemini")
+        return response.text
+    
     def generate_ultra_detailed_analysis(
         self, 
         analysis_data: Dict[str, Any],
         search_context: Optional[str] = None,
-        attachments_context: Optional[str] = None
+        attachments_context: Optional[str] = None,
+        timeout: Optional[float] = None
     ) -> Dict[str, Any]:
-        """Gera análise ultra-detalhada usando Gemini Pro"""
+        """Gera análise ultra-detalhada usando Gemini Pro (timeout em segundos, derivado do prazo da análise)"""
         
         try:
             # Constrói prompt ultra-detalhado
@@ -90,7 +107,8 @@ class UltraRobustGeminiClient:
             response = self.model.generate_content(
                 prompt,
                 generation_config=self.generation_config,
-                safety_settings=self.safety_settings
+                safety_settings=self.safety_settings,
+                request_options={'timeout': timeout} if timeout else None
             )
             
             end_time = time.time()
@@ -595,11 +613,6 @@ Gere APENAS o JSON válido e ultra-completo, sem texto adicional antes ou depois
         return fallback
 
 
-# Instância global do cliente
-try:
-    gemini_client = UltraRobustGeminiClient()
-    logger.info("Cliente Gemini inicializado com sucesso")
-except Exception as e:
-    logger.error(f"Erro ao inicializar cliente Gemini: {str(e)}")
-    gemini_client = None
+# Instância global (opcional: avaliada como False se GEMINI_API_KEY não estiver configurada)
+gemini_client = service_registry.register('gemini', UltraRobustGeminiClient, optional=True, fork_safe=False)
 
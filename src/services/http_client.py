@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Cliente HTTP Compartilhado
+Sessão requests com pool de conexões keep-alive, recriada em cada processo
+"""
+
+import os
+import logging
+import threading
+from typing import Optional
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+class HTTPSessionPool:
+    """Sessão HTTP por processo (sockets não podem ser compartilhados após o fork)"""
+
+    def __init__(self):
+        """Inicializa configuração do pool"""
+        self.pool_connections = int(os.getenv('HTTP_POOL_CONNECTIONS', 10))
+        self.pool_maxsize = int(os.getenv('HTTP_POOL_MAXSIZE', 20))
+
+        self._session: Optional[requests.Session] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def session(self) -> requests.Session:
+        """Sessão do processo atual (criada no primeiro uso após o fork)"""
+        pid = os.getpid()
+        if self._session is not None and self._pid == pid:
+            return self._session
+
+        with self._lock:
+            if self._session is None or self._pid != pid:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+
+                # A sessão herdada do processo pai é descartada sem fechar seus sockets
+                self._session = session
+                self._pid = pid
+            return self._session
+
+    def close(self) -> None:
+        """Fecha as conexões do processo atual"""
+        with self._lock:
+            if self._session is not None and self._pid == os.getpid():
+                self._session.close()
+            self._session = None
+            self._pid = None
+
+# Instância global do pool
+http_pool = HTTPSessionPool()
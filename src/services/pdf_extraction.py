@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Motor de Extração de PDF
+Extração de texto paralela por faixas de páginas com backends plugáveis
+"""
+
+import os
+import shutil
+import logging
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple, Union
+from services.process_pools import pool_context
+
+logger = logging.getLogger(__name__)
+
+# Backends: nome -> (abertura do documento, contador de páginas, extrator de faixa de páginas)
+# A abertura recebe caminho em disco ou stream binário (streams só são extraídos no processo atual);
+# as demais funções recebem o documento aberto
+Source = Union[str, BinaryIO]
+DocumentOpener = Callable[[Source], Any]
+PageCounter = Callable[[Any], int]
+RangeExtractor = Callable[[Any, int, int], List[str]]
+Backend = Tuple[DocumentOpener, PageCounter, RangeExtractor]
+
+def _open_pypdf(file_path: Source) -> Any:
+    from pypdf import PdfReader
+    return PdfReader(file_path)
+
+def _open_pdfplumber(file_path: Source) -> Any:
+    import pdfplumber
+    return pdfplumber.open(file_path)
+
+def _open_pypdf2(file_path: Source) -> Any:
+    import PyPDF2
+    return PyPDF2.PdfReader(file_path)
+
+def _count_pages(document: Any) -> int:
+    return len(document.pages)
+
+def _extract_range_reader(document: Any, start: int, end: int) -> List[str]:
+    """pypdf e PyPDF2 compartilham a mesma interface de páginas"""
+    return [(document.pages[i].extract_text() or '') for i in range(start, end)]
+
+def _extract_range_pdfplumber(document: Any, start: int, end: int) -> List[str]:
+    texts = []
+    for i in range(start, end):
+        page = document.pages[i]
+        texts.append(page.extract_text() or '')
+        page.flush_cache()
+    return texts
+
+_BACKENDS: Dict[str, Backend] = {
+    'pypdf': (_open_pypdf, _count_pages, _extract_range_reader),
+    'pdfplumber': (_open_pdfplumber, _count_pages, _extract_range_pdfplumber),
+    'pypdf2': (_open_pypdf2, _count_pages, _extract_range_reader),
+}
+
+def register_backend(
+    name: str,
+    document_opener: DocumentOpener,
+    page_counter: PageCounter,
+    range_extractor: RangeExtractor
+) -> None:
+    """Registra backend de extração (funções de módulo: são enviadas por referência ao pool)"""
+    _BACKENDS[name] = (document_opener, page_counter, range_extractor)
+
+def _close_document(document: Any) -> None:
+    close = getattr(document, 'close', None)
+    if callable(close):
+        try:
+            close()
+        except Exception:
+            pass
+
+# Documento aberto em cada processo do pool, identificado por (abertura, caminho, mtime)
+_worker_document: Dict[str, Any] = {'key': None, 'document': None}
+
+def _init_worker() -> None:
+    """Inicializador dos processos do pool (forkserver/spawn não herdam o estado do pai)"""
+    _worker_document['key'] = None
+    _worker_document['document'] = None
+
+def _extract_range(backend: Backend, file_path: str, start: int, end: int) -> List[str]:
+    """Tarefa executada nos processos do pool: reaproveita o documento já aberto pelo worker"""
+    document_opener, _, range_extractor = backend
+    key = (document_opener, file_path, os.path.getmtime(file_path))
+
+    if _worker_document['key'] != key:
+        _close_document(_worker_document['document'])
+        _worker_document['key'] = None
+        _worker_document['document'] = document_opener(file_path)
+        _worker_document['key'] = key
+
+    return range_extractor(_worker_document['document'], start, end)
+
+class PDFExtractionEngine:
+    """Extrai texto de PDFs distribuindo faixas de páginas em um pool de processos"""
+
+    def __init__(self):
+        """Inicializa motor de extração"""
+        self.backend = os.getenv('PDF_EXTRACTION_BACKEND', 'pypdf').lower()
+        self.max_pages = int(os.getenv('PDF_MAX_PAGES', 500))
+        self.max_text_bytes = int(os.getenv('PDF_MAX_TEXT_BYTES', 5 * 1024 * 1024))
+        self.max_workers = int(os.getenv('PDF_EXTRACTION_WORKERS', min(4, os.cpu_count() or 1)))
+        self.pages_per_task = int(os.getenv('PDF_PAGES_PER_TASK', 16))
+        self.parallel_min_pages = int(os.getenv('PDF_PARALLEL_MIN_PAGES', 32))
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self) -> None:
+        """O pool pertence ao processo pai; o filho cria o próprio no primeiro uso"""
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Cria o pool de processos sob demanda"""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=pool_context('PDF_EXTRACTION_MP_CONTEXT'),
+                    initializer=_init_worker
+                )
+            return self._executor
+
+    def shutdown(self) -> None:
+        """Encerra o pool de processos"""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _resolve_backend(self, file_path: Source) -> Tuple[Backend, Any, int]:
+        """Escolhe backend disponível, abre o documento e conta suas páginas"""
+        candidates = [self.backend] + [name for name in _BACKENDS if name != self.backend]
+
+        for name in candidates:
+            if name not in _BACKENDS:
+                continue
+            backend = _BACKENDS[name]
+            try:
+                if not isinstance(file_path, str):
+                    file_path.seek(0)
+                document = backend[0](file_path)
+            except ImportError:
+                logger.warning(f"Backend de PDF '{name}' não instalado")
+                continue
+            except Exception as e:
+                logger.warning(f"Backend de PDF '{name}' falhou ao abrir documento: {str(e)}")
+                continue
+
+            try:
+                return backend, document, backend[1](document)
+            except Exception as e:
+                _close_document(document)
+                logger.warning(f"Backend de PDF '{name}' falhou ao contar páginas: {str(e)}")
+
+        raise RuntimeError("Nenhum backend de PDF disponível")
+
+    def iter_pages(self, file_path: Source) -> Iterator[str]:
+        """Gera o texto das páginas em ordem, respeitando o limite de páginas"""
+        backend, document, page_count = self._resolve_backend(file_path)
+        total_pages = min(page_count, self.max_pages)
+
+        if page_count > self.max_pages:
+            logger.warning(f"PDF com {page_count} páginas limitado a {self.max_pages}")
+
+        ranges = [
+            (start, min(start + self.pages_per_task, total_pages))
+            for start in range(0, total_pages, self.pages_per_task)
+        ]
+
+        # Documentos pequenos: extração direta no documento já aberto, sem custo de IPC
+        if total_pages < self.parallel_min_pages or self.max_workers <= 1:
+            try:
+                for start, end in ranges:
+                    yield from backend[2](document, start, end)
+            finally:
+                _close_document(document)
+            return
+
+        _close_document(document)
+
+        # Streams grandes são gravados em disco para que o pool abra o documento pelo caminho
+        spill_path = None if isinstance(file_path, str) else self._spill_to_disk(file_path)
+        path = spill_path or file_path
+
+        # Cada processo do pool abre o documento uma única vez e o reaproveita entre as faixas
+        futures = []
+        try:
+            executor = self._get_executor()
+            futures = [executor.submit(_extract_range, backend, path, start, end) for start, end in ranges]
+            for future in futures:
+                yield from future.result()
+        finally:
+            # Consumidor interrompeu (limite atingido ou erro): descarta faixas pendentes
+            for future in futures:
+                future.cancel()
+            if spill_path:
+                # Faixas já iniciadas terminam antes de o arquivo temporário ser removido
+                for future in futures:
+                    if not future.cancelled():
+                        future.exception()
+                os.remove(spill_path)
+
+    @staticmethod
+    def _spill_to_disk(stream: BinaryIO) -> str:
+        """Copia o stream do upload para um arquivo temporário e retorna o caminho"""
+        stream.seek(0)
+        fd, temp_path = tempfile.mkstemp(prefix='pdf-extract-', suffix='.pdf')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                shutil.copyfileobj(stream, file, 1024 * 1024)
+        except Exception:
+            os.remove(temp_path)
+            raise
+        return temp_path
+
+    def extract_text(self, file_path: Source) -> str:
+        """Extrai texto completo do PDF respeitando o limite de bytes"""
+        parts: List[str] = []
+        total_bytes = 0
+        pages = self.iter_pages(file_path)
+
+        try:
+            for page_text in pages:
+                page_bytes = len(page_text.encode('utf-8')) + 1
+                if total_bytes + page_bytes > self.max_text_bytes:
+                    logger.warning(f"Texto do PDF truncado em {self.max_text_bytes} bytes")
+                    break
+                parts.append(page_text)
+                total_bytes += page_bytes
+        finally:
+            pages.close()
+
+        return "\n".join(parts).strip()
+
+# Instância global do motor
+pdf_extraction_engine = PDFExtractionEngine()
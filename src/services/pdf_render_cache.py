@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Cache de PDFs Renderizados
+PDFs endereçados pelo hash do conteúdo da análise, em memória e em disco
+"""
+
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from io import BytesIO
+from typing import BinaryIO, Dict, Optional, Any
+from services.service_registry import service_registry
+
+logger = logging.getLogger(__name__)
+
+# Versão do layout do relatório: incrementar ao alterar services/pdf_report.py
+TEMPLATE_VERSION = '2.0.0'
+
+class PDFRenderCache:
+    """LRU em memória sobre diretório em disco, ambos com limite de tamanho"""
+
+    def __init__(self, base_path: Optional[str] = None):
+        """Inicializa limites e diretório do cache"""
+        self.enabled = os.getenv('PDF_CACHE_ENABLED', 'true').lower() == 'true'
+        self.base_path = base_path or os.getenv(
+            'PDF_CACHE_PATH',
+            os.path.join(os.path.dirname(__file__), '..', 'data', 'pdf_cache')
+        )
+        self.max_memory_bytes = int(os.getenv('PDF_CACHE_MEMORY_BYTES', 64 * 1024 * 1024))
+        self.max_disk_bytes = int(os.getenv('PDF_CACHE_DISK_BYTES', 512 * 1024 * 1024))
+
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(self.base_path, exist_ok=True)
+
+    @staticmethod
+    def key_for(analysis_data: Dict[str, Any]) -> str:
+        """Hash canônico da análise + versão do template"""
+        payload = json.dumps(
+            analysis_data, ensure_ascii=False, sort_keys=True, separators=(',', ':'), default=str
+        )
+        return hashlib.sha256(f"{TEMPLATE_VERSION}\n{payload}".encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.base_path, f"{key}.pdf")
+
+    def open(self, key: str) -> Optional[BinaryIO]:
+        """PDF em cache como arquivo legível (memória, depois disco), sem cópias extras"""
+        with self._lock:
+            pdf_bytes = self._entries.get(key)
+            if pdf_bytes is not None:
+                self._entries.move_to_end(key)
+                # BytesIO compartilha o buffer do bytes até ser modificado
+                return BytesIO(pdf_bytes)
+
+        path = self._path(key)
+        try:
+            file = open(path, 'rb')
+        except FileNotFoundError:
+            return None
+
+        # Marca uso recente para a limpeza do disco
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+        # PDFs pequenos sobem para a memória; os grandes são enviados direto do disco
+        if os.fstat(file.fileno()).st_size <= self._memory_entry_limit():
+            with file:
+                pdf_bytes = file.read()
+            self._store_memory(key, pdf_bytes)
+            return BytesIO(pdf_bytes)
+
+        return file
+
+    def contains(self, key: str) -> bool:
+        """PDF já publicado sob a chave (memória ou disco)"""
+        with self._lock:
+            if key in self._entries:
+                return True
+        return os.path.exists(self._path(key))
+
+    def is_rendering(self, key: str) -> bool:
+        """Renderização da chave em andamento (em qualquer processo que use o diretório)"""
+        prefix = f"{key}."
+        try:
+            return any(
+                name.startswith(prefix) and name.endswith('.tmp') for name in os.listdir(self.base_path)
+            )
+        except FileNotFoundError:
+            return False
+
+    def reserve_temp_path(self, key: Optional[str] = None) -> str:
+        """Arquivo temporário no diretório do cache (rename atômico no commit)"""
+        fd, temp_path = tempfile.mkstemp(dir=self.base_path, prefix=f"{key}." if key else 'tmp', suffix='.tmp')
+        os.close(fd)
+        return temp_path
+
+    def commit(self, key: str, temp_path: str) -> None:
+        """Publica PDF renderizado em arquivo temporário sob a chave"""
+        os.replace(temp_path, self._path(key))
+        self._enforce_disk_limit()
+
+    def _memory_entry_limit(self) -> int:
+        # PDFs maiores que um quarto do limite ficam apenas em disco
+        return self.max_memory_bytes // 4
+
+    def _store_memory(self, key: str, pdf_bytes: bytes) -> None:
+        if len(pdf_bytes) > self._memory_entry_limit():
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._memory_bytes -= len(previous)
+
+            self._entries[key] = pdf_bytes
+            self._memory_bytes += len(pdf_bytes)
+
+            while self._memory_bytes > self.max_memory_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+
+    def _enforce_disk_limit(self) -> None:
+        """Remove os PDFs usados há mais tempo até respeitar o limite"""
+        try:
+            files = []
+            stale_before = time.time() - 3600
+            for entry in os.scandir(self.base_path):
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+                if entry.name.endswith('.pdf'):
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+                elif entry.name.endswith('.tmp') and stat.st_mtime < stale_before:
+                    # Renderizações interrompidas (processo encerrado no meio)
+                    os.remove(entry.path)
+
+            total = sum(size for _, size, _ in files)
+            for _, size, path in sorted(files):
+                if total <= self.max_disk_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except FileNotFoundError:
+                    pass
+        except Exception as e:
+            logger.error(f"Erro ao limpar cache de PDFs: {str(e)}")
+
+# Instância global do cache
+pdf_render_cache = service_registry.register('pdf_cache', PDFRenderCache)
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Renderização de PDFs em Processos
+Layout do ReportLab fora do processo web, com jobs identificados pela chave do cache
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Dict, Optional, Any, BinaryIO, Tuple
+from services.process_pools import host_pool_size, pool_context
+from services.service_registry import service_registry
+from services.pdf_render_cache import pdf_render_cache
+
+logger = logging.getLogger(__name__)
+
+# Raiz da árvore de páginas gravada pelo ReportLab ("/Count N /Kids [...]")
+PAGE_COUNT_PATTERN = re.compile(rb'/Count (\d+) /Kids')
+
+def _create_pdf_generator():
+    """ReportLab é importado apenas na primeira geração de PDF"""
+    from services.pdf_report import PDFGenerator
+    return PDFGenerator()
+
+# Instância global do gerador (criada no primeiro uso em cada processo do pool)
+pdf_generator = service_registry.register('pdf_generator', _create_pdf_generator)
+
+def _render_to_path(analysis_data: Dict[str, Any], output_path: str) -> int:
+    """Tarefa executada nos processos do pool: grava o PDF e retorna o tamanho"""
+    with open(output_path, 'wb') as output:
+        pdf_generator.generate_analysis_report(analysis_data, output=output)
+    return os.path.getsize(output_path)
+
+def _open_transient(path: str) -> BinaryIO:
+    """Abre o PDF para leitura e o descarta quando o arquivo for fechado (cache desativado)"""
+    fd = os.open(path, os.O_RDONLY | getattr(os, 'O_BINARY', 0) | getattr(os, 'O_TEMPORARY', 0))
+    if not hasattr(os, 'O_TEMPORARY'):
+        # POSIX: o conteúdo continua legível pelo handle até o fim do envio
+        os.remove(path)
+    return os.fdopen(fd, 'rb')
+
+def _discard_output(job: Dict[str, Any]) -> None:
+    """Remove o PDF de um job ainda não baixado (cache desativado)"""
+    output_path = job.pop('_output_path', None)
+    if output_path and os.path.exists(output_path):
+        os.remove(output_path)
+
+class PDFRenderService:
+    """Pool de processos para renderização de relatórios"""
+
+    def __init__(self):
+        """Inicializa configuração (pool criado sob demanda)"""
+        # Processos por worker web: os núcleos do host são divididos entre os workers
+        self.max_workers = host_pool_size('PDF_RENDER_WORKERS')
+        self.timeout = float(os.getenv('PDF_RENDER_TIMEOUT', 120))
+        self.job_retention = float(os.getenv('PDF_JOB_RETENTION', 600))
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._futures: Dict[str, Future] = {}
+
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self) -> None:
+        """O pool e os jobs pertencem ao processo pai"""
+        self._executor = None
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._futures = {}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=pool_context('PDF_RENDER_MP_CONTEXT')
+            )
+        return self._executor
+
+    def _start(self, analysis_data: Dict[str, Any], temp_path: str) -> Future:
+        """Inicia a renderização no pool (chamado com o lock adquirido)"""
+        if self.max_workers <= 0:
+            # Sem pool (ex.: ambiente de desenvolvimento): renderiza no processo atual
+            future: Future = Future()
+            try:
+                future.set_result(_render_to_path(analysis_data, temp_path))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        return self._get_executor().submit(_render_to_path, analysis_data, temp_path)
+
+    def shutdown(self) -> None:
+        """Encerra o pool de processos"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def submit(self, analysis_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Agenda renderização; análises iguais compartilham o mesmo job"""
+        job_id = pdf_render_cache.key_for(analysis_data)
+
+        with self._lock:
+            self._prune_jobs()
+
+            # Job concluído só é reaproveitado se o PDF ainda está no cache (a limpeza pode tê-lo removido)
+            reuse = pdf_render_cache.enabled and pdf_render_cache.contains(job_id)
+            job = self._jobs.get(job_id)
+            if job and (job['status'] == 'queued' or (reuse and job['status'] == 'completed')):
+                return self._public(job)
+
+            if reuse:
+                job = self._new_job(job_id, 'completed')
+                job['completed_at'] = job['created_at']
+                return self._public(job)
+
+            if job:
+                _discard_output(job)
+
+            job = self._new_job(job_id, 'queued')
+            temp_path = pdf_render_cache.reserve_temp_path(job_id)
+            future = self._start(analysis_data, temp_path)
+
+            job['_temp_path'] = temp_path
+            self._futures[job_id] = future
+
+        future.add_done_callback(lambda _: self._finalize(job_id))
+        logger.info(f"📄 Renderização de PDF enfileirada (job {job_id[:12]})")
+        return self._public(job)
+
+    def _new_job(self, job_id: str, status: str) -> Dict[str, Any]:
+        job = {
+            'job_id': job_id,
+            'status': status,
+            'created_at': datetime.now().isoformat(),
+            'completed_at': None,
+            'size': None,
+            'error': None,
+            '_created': time.monotonic(),
+            '_finished': threading.Event()
+        }
+        if status == 'completed':
+            job['_finished'].set()
+        self._jobs[job_id] = job
+        return job
+
+    def _finalize(self, job_id: str) -> None:
+        """Publica o PDF ao fim da renderização (executado uma única vez)
+
+        Com o cache desativado o arquivo fica com o job até o download e não é publicado.
+        """
+        with self._lock:
+            future = self._futures.pop(job_id, None)
+            job = self._jobs.get(job_id)
+            if future is None or job is None:
+                return
+            temp_path = job.pop('_temp_path')
+
+        try:
+            job['size'] = future.result()
+            if pdf_render_cache.enabled:
+                pdf_render_cache.commit(job_id, temp_path)
+            else:
+                job['_output_path'] = temp_path
+            job['status'] = 'completed'
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                # Processo do pool encerrado abruptamente: próximo submit cria um pool novo
+                with self._lock:
+                    self._executor = None
+            logger.error(f"Erro ao renderizar PDF (job {job_id[:12]}): {str(e)}")
+            job['status'] = 'failed'
+            job['error'] = str(e)
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        finally:
+            job['completed_at'] = datetime.now().isoformat()
+            job['_finished'].set()
+
+    def render(self, analysis_data: Dict[str, Any]) -> BinaryIO:
+        """Renderiza no pool e aguarda; retorna o PDF aberto para leitura"""
+        if not pdf_render_cache.enabled:
+            return self._render_uncached(analysis_data)
+
+        job_id = self.submit(analysis_data)['job_id']
+
+        with self._lock:
+            job = self._jobs[job_id]
+
+        # Aguarda a publicação no cache (não apenas o fim do processo de renderização)
+        if not job['_finished'].wait(self.timeout):
+            raise TimeoutError(f"Renderização do PDF excedeu {self.timeout:.0f}s")
+        if job['status'] == 'failed':
+            raise RuntimeError(job['error'])
+
+        pdf_file = pdf_render_cache.open(job_id)
+        if pdf_file is None:
+            raise RuntimeError("PDF renderizado não encontrado no cache")
+        return pdf_file
+
+    def _render_uncached(self, analysis_data: Dict[str, Any]) -> BinaryIO:
+        """Renderização avulsa sem cache: o arquivo temporário é removido após o envio"""
+        temp_path = pdf_render_cache.reserve_temp_path()
+
+        with self._lock:
+            future = self._start(analysis_data, temp_path)
+
+        def remove_temp_file(_: Future) -> None:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        try:
+            future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # Renderização ainda em curso no pool: o arquivo é removido quando ela terminar
+            future.cancel()
+            future.add_done_callback(remove_temp_file)
+            raise TimeoutError(f"Renderização do PDF excedeu {self.timeout:.0f}s")
+        except BrokenProcessPool:
+            # Processo do pool encerrado abruptamente: próxima renderização cria um pool novo
+            with self._lock:
+                self._executor = None
+            remove_temp_file(future)
+            raise
+        except Exception:
+            remove_temp_file(future)
+            raise
+
+        return _open_transient(temp_path)
+
+    def open_result(self, job_id: str) -> Optional[BinaryIO]:
+        """PDF de um job concluído (sem cache, o arquivo do job é entregue uma única vez)"""
+        if pdf_render_cache.enabled:
+            return pdf_render_cache.open(job_id)
+
+        with self._lock:
+            job = self._jobs.get(job_id)
+            output_path = job.pop('_output_path', None) if job else None
+
+        return _open_transient(output_path) if output_path else None
+
+    def open_or_render(self, analysis_data: Dict[str, Any]) -> Tuple[str, BinaryIO, bool]:
+        """Retorna (chave, PDF aberto, veio_do_cache), renderizando no pool apenas em caso de falta"""
+        key = pdf_render_cache.key_for(analysis_data)
+        pdf_file = pdf_render_cache.open(key) if pdf_render_cache.enabled else None
+        if pdf_file is not None:
+            return key, pdf_file, True
+
+        return key, self.render(analysis_data), False
+
+    @staticmethod
+    def inspect(pdf_file: BinaryIO) -> Dict[str, int]:
+        """Número de páginas e tamanho de um PDF gerado (consome e fecha o arquivo)"""
+        with pdf_file:
+            pdf_bytes = pdf_file.read()
+
+        match = PAGE_COUNT_PATTERN.search(pdf_bytes)
+        return {
+            'pages': int(match.group(1)) if match else 0,
+            'size': len(pdf_bytes)
+        }
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Status do job (jobs de outros workers são inferidos pelo cache em disco)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                return self._public(job)
+
+        # Sem cache os PDFs não são publicados em disco: só há os jobs deste processo
+        if not pdf_render_cache.enabled:
+            return None
+        if pdf_render_cache.contains(job_id):
+            return {'job_id': job_id, 'status': 'completed'}
+        if pdf_render_cache.is_rendering(job_id):
+            return {'job_id': job_id, 'status': 'queued'}
+        return None
+
+    @staticmethod
+    def _public(job: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: value for key, value in job.items() if not key.startswith('_')}
+
+    def _prune_jobs(self) -> None:
+        """Descarta jobs concluídos há mais de job_retention segundos (e PDFs não baixados)"""
+        expires_before = time.monotonic() - self.job_retention
+        for job_id in [
+            job_id for job_id, job in self._jobs.items()
+            if job['status'] in ('completed', 'failed') and job['_created'] < expires_before
+        ]:
+            _discard_output(self._jobs.pop(job_id))
+
+# Instância global do serviço
+pdf_render_service = PDFRenderService()
@@ -0,0 +1,488 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Relatório PDF
+Montagem do relatório de análise com ReportLab
+"""
+
+import copy
+import logging
+from datetime import datetime
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
+from io import BytesIO
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Larguras de coluna das tabelas (área útil do A4 com margens de 72pt)
+COVER_INFO_COL_WIDTHS = [2*inch, 3*inch]
+KEY_VALUE_COL_WIDTHS = [1.5*inch, 4*inch]
+SCENARIO_COL_WIDTHS = [1.5*inch] * 4
+
+class PDFGenerator:
+    """Gerador de relatórios PDF profissionais
+    
+    Estilos, TableStyles e parágrafos de texto fixo (títulos, cabeçalhos, rodapé da
+    capa) são montados uma vez por instância. Cada relatório recebe cópias rasas dos
+    parágrafos fixos: o ReportLab grava estado de layout nos flowables durante o build.
+    """
+    
+    def __init__(self):
+        """Inicializa gerador de PDF"""
+        self.styles = getSampleStyleSheet()
+        self._setup_custom_styles()
+        self._setup_table_styles()
+        self._static_paragraphs: Dict[Tuple[str, str], Paragraph] = {}
+    
+    def _setup_custom_styles(self):
+        """Configura estilos personalizados"""
+        
+        # Título principal
+        self.styles.add(ParagraphStyle(
+            name='CustomTitle',
+            parent=self.styles['Title'],
+            fontSize=24,
+            spaceAfter=30,
+            alignment=TA_CENTER,
+            textColor=colors.HexColor('#1a365d')
+        ))
+        
+        # Subtítulo
+        self.styles.add(ParagraphStyle(
+            name='CustomSubtitle',
+            parent=self.styles['Heading1'],
+            fontSize=18,
+            spaceAfter=20,
+            textColor=colors.HexColor('#2d3748')
+        ))
+        
+        # Seção
+        self.styles.add(ParagraphStyle(
+            name='SectionHeader',
+            parent=self.styles['Heading2'],
+            fontSize=14,
+            spaceAfter=15,
+            spaceBefore=20,
+            textColor=colors.HexColor('#4a5568'),
+            borderWidth=1,
+            borderColor=colors.HexColor('#e2e8f0'),
+            borderPadding=5
+        ))
+        
+        # Texto normal
+        self.styles.add(ParagraphStyle(
+            name='CustomNormal',
+            parent=self.styles['Normal'],
+            fontSize=11,
+            spaceAfter=12,
+            alignment=TA_JUSTIFY,
+            leading=14
+        ))
+        
+        # Lista
+        self.styles.add(ParagraphStyle(
+            name='BulletList',
+            parent=self.styles['Normal'],
+            fontSize=10,
+            spaceAfter=8,
+            leftIndent=20,
+            bulletIndent=10
+        ))
+    
+    def _setup_table_styles(self):
+        """TableStyles compartilhados pelas tabelas de todos os relatórios"""
+        
+        # Tabela de informações da capa
+        self.cover_info_style = TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+            ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey)
+        ])
+        
+        # Pares rótulo/valor (perfil demográfico)
+        self.key_value_style = TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('GRID', (0, 0), (-1, -1), 1, colors.grey)
+        ])
+        
+        # Tabela com linha de cabeçalho (cenários de projeção)
+        self.header_table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ])
+    
+    def _static(self, text: str, style_name: str) -> Paragraph:
+        """Parágrafo de texto fixo: markup interpretado uma única vez, cópia por uso"""
+        key = (text, style_name)
+        paragraph = self._static_paragraphs.get(key)
+        if paragraph is None:
+            paragraph = Paragraph(text, self.styles[style_name])
+            self._static_paragraphs[key] = paragraph
+        return copy.copy(paragraph)
+    
+    def _section_title(self, title: str) -> List:
+        """Abertura comum das seções: título e espaçamento"""
+        return [self._static(title, 'CustomTitle'), Spacer(1, 0.3*inch)]
+    
+    def _bullets(self, items) -> List[Paragraph]:
+        bullet_style = self.styles['BulletList']
+        return [Paragraph(f"• {item}", bullet_style) for item in items]
+    
+    def build_story(self, analysis_data: dict) -> list:
+        """Flowables do relatório completo"""
+        story = []
+        
+        # Capa
+        story.extend(self._build_cover_page(analysis_data))
+        story.append(PageBreak())
+        
+        # Sumário executivo
+        story.extend(self._build_executive_summary(analysis_data))
+        story.append(PageBreak())
+        
+        # Avatar detalhado
+        if 'avatar_ultra_detalhado' in analysis_data:
+            story.extend(self._build_avatar_section(analysis_data['avatar_ultra_detalhado']))
+            story.append(PageBreak())
+        
+        # Posicionamento
+        if 'escopo' in analysis_data:
+            story.extend(self._build_positioning_section(analysis_data['escopo']))
+            story.append(PageBreak())
+        
+        # Análise de concorrência
+        if 'analise_concorrencia_detalhada' in analysis_data:
+            story.extend(self._build_competition_section(analysis_data['analise_concorrencia_detalhada']))
+            story.append(PageBreak())
+        
+        # Estratégia de marketing
+        if 'estrategia_palavras_chave' in analysis_data:
+            story.extend(self._build_marketing_section(analysis_data['estrategia_palavras_chave']))
+            story.append(PageBreak())
+        
+        # Métricas e KPIs
+        if 'metricas_performance_detalhadas' in analysis_data:
+            story.extend(self._build_metrics_section(analysis_data['metricas_performance_detalhadas']))
+            story.append(PageBreak())
+        
+        # Projeções
+        if 'projecoes_cenarios' in analysis_data:
+            story.extend(self._build_projections_section(analysis_data['projecoes_cenarios']))
+            story.append(PageBreak())
+        
+        # Plano de ação
+        if 'plano_acao_detalhado' in analysis_data:
+            story.extend(self._build_action_plan_section(analysis_data['plano_acao_detalhado']))
+            story.append(PageBreak())
+        
+        # Insights exclusivos
+        if 'insights_exclusivos' in analysis_data:
+            story.extend(self._build_insights_section(analysis_data['insights_exclusivos']))
+        
+        return story
+    
+    def generate_analysis_report(self, analysis_data: dict, output: Optional[BinaryIO] = None) -> BinaryIO:
+        """Gera relatório completo da análise (em output, se informado, ou em um BytesIO)"""
+        
+        # Escreve direto no destino, sem buffer intermediário
+        buffer = output if output is not None else BytesIO()
+        
+        # Cria documento PDF
+        doc = SimpleDocTemplate(
+            buffer,
+            pagesize=A4,
+            rightMargin=72,
+            leftMargin=72,
+            topMargin=72,
+            bottomMargin=18
+        )
+        
+        # Gera PDF
+        doc.build(self.build_story(analysis_data))
+        if output is None:
+            buffer.seek(0)
+        
+        return buffer
+    
+    def _build_cover_page(self, data: dict) -> list:
+        """Constrói página de capa"""
+        story = []
+        
+        # Título principal
+        story.append(self._static("ANÁLISE ULTRA-DETALHADA DE MERCADO", 'CustomTitle'))
+        story.append(Spacer(1, 0.5*inch))
+        
+        # Subtítulo
+        segmento = data.get('segmento', 'Não informado')
+        produto = data.get('produto', 'Não informado')
+        
+        story.append(Paragraph(f"Segmento: {segmento}", self.styles['CustomSubtitle']))
+        if produto != 'Não informado':
+            story.append(Paragraph(f"Produto: {produto}", self.styles['CustomSubtitle']))
+        
+        story.append(Spacer(1, 1*inch))
+        
+        # Informações do relatório
+        metadata = data.get('metadata', {})
+        generated_at = metadata.get('generated_at', datetime.now().isoformat())
+        
+        info_data = [
+            ['Data de Geração:', generated_at[:10]],
+            ['Versão:', '2.0.0'],
+            ['Modelo IA:', metadata.get('model', 'Gemini Pro')],
+            ['Tempo de Processamento:', f"{metadata.get('processing_time', 0)} segundos"]
+        ]
+        
+        story.append(Table(info_data, colWidths=COVER_INFO_COL_WIDTHS, style=self.cover_info_style))
+        story.append(Spacer(1, 1*inch))
+        
+        # Rodapé da capa
+        story.append(self._static("ARQV30 Enhanced v2.0", 'CustomNormal'))
+        story.append(self._static("Powered by Artificial Intelligence", 'CustomNormal'))
+        
+        return story
+    
+    def _build_executive_summary(self, data: dict) -> list:
+        """Constrói sumário executivo"""
+        story = self._section_title("SUMÁRIO EXECUTIVO")
+        
+        # Resumo dos principais pontos
+        summary_points = [
+            f"Segmento analisado: {data.get('segmento', 'N/A')}",
+            f"Público-alvo: {data.get('publico', 'N/A')}",
+            f"Preço: R$ {data.get('preco', 'N/A')}",
+            f"Objetivo de receita: R$ {data.get('objetivo_receita', 'N/A')}"
+        ]
+        
+        story.extend(self._bullets(summary_points))
+        
+        story.append(Spacer(1, 0.2*inch))
+        
+        # Principais insights
+        insights = data.get('insights_exclusivos', [])
+        if insights:
+            story.append(self._static("Principais Insights:", 'SectionHeader'))
+            story.extend(self._bullets(insights[:5]))  # Primeiros 5 insights
+        
+        return story
+    
+    def _build_avatar_section(self, avatar_data: dict) -> list:
+        """Constrói seção do avatar"""
+        story = self._section_title("AVATAR ULTRA-DETALHADO")
+        
+        # Perfil demográfico
+        demo = avatar_data.get('perfil_demografico', {})
+        if demo:
+            story.append(self._static("Perfil Demográfico", 'SectionHeader'))
+            
+            demo_data = [
+                ['Idade:', demo.get('idade', 'N/A')],
+                ['Gênero:', demo.get('genero', 'N/A')],
+                ['Renda:', demo.get('renda', 'N/A')],
+                ['Escolaridade:', demo.get('escolaridade', 'N/A')],
+                ['Localização:', demo.get('localizacao', 'N/A')]
+            ]
+            
+            story.append(Table(demo_data, colWidths=KEY_VALUE_COL_WIDTHS, style=self.key_value_style))
+            story.append(Spacer(1, 0.2*inch))
+        
+        # Perfil psicográfico
+        psico = avatar_data.get('perfil_psicografico', {})
+        if psico:
+            story.append(self._static("Perfil Psicográfico", 'SectionHeader'))
+            
+            for key, value in psico.items():
+                if value:
+                    story.append(Paragraph(f"<b>{key.replace('_', ' ').title()}:</b> {value}", self.styles['CustomNormal']))
+        
+        # Dores específicas
+        dores = avatar_data.get('dores_especificas', [])
+        if dores:
+            story.append(self._static("Dores Específicas", 'SectionHeader'))
+            story.extend(self._bullets(dores))
+        
+        # Desejos profundos
+        desejos = avatar_data.get('desejos_profundos', [])
+        if desejos:
+            story.append(self._static("Desejos Profundos", 'SectionHeader'))
+            story.extend(self._bullets(desejos))
+        
+        return story
+    
+    def _build_positioning_section(self, escopo_data: dict) -> list:
+        """Constrói seção de posicionamento"""
+        story = self._section_title("ESCOPO E POSICIONAMENTO")
+        
+        # Posicionamento no mercado
+        posicionamento = escopo_data.get('posicionamento_mercado', '')
+        if posicionamento:
+            story.append(self._static("Posicionamento no Mercado", 'SectionHeader'))
+            story.append(Paragraph(posicionamento, self.styles['CustomNormal']))
+        
+        # Proposta de valor
+        proposta = escopo_data.get('proposta_valor', '')
+        if proposta:
+            story.append(self._static("Proposta de Valor", 'SectionHeader'))
+            story.append(Paragraph(proposta, self.styles['CustomNormal']))
+        
+        # Diferenciais competitivos
+        diferenciais = escopo_data.get('diferenciais_competitivos', [])
+        if diferenciais:
+            story.append(self._static("Diferenciais Competitivos", 'SectionHeader'))
+            story.extend(self._bullets(diferenciais))
+        
+        return story
+    
+    def _build_competition_section(self, competition_data: dict) -> list:
+        """Constrói seção de análise de concorrência"""
+        story = self._section_title("ANÁLISE DE CONCORRÊNCIA")
+        
+        # Concorrentes diretos
+        diretos = competition_data.get('concorrentes_diretos', [])
+        if diretos:
+            story.append(self._static("Concorrentes Diretos", 'SectionHeader'))
+            
+            for i, concorrente in enumerate(diretos, 1):
+                if isinstance(concorrente, dict):
+                    nome = concorrente.get('nome', f'Concorrente {i}')
+                    story.append(Paragraph(f"<b>{nome}</b>", self.styles['CustomNormal']))
+                    
+                    pontos_fortes = concorrente.get('pontos_fortes', [])
+                    if pontos_fortes:
+                        story.append(self._static("Pontos Fortes:", 'CustomNormal'))
+                        story.extend(self._bullets(pontos_fortes))
+                    
+                    pontos_fracos = concorrente.get('pontos_fracos', [])
+                    if pontos_fracos:
+                        story.append(self._static("Pontos Fracos:", 'CustomNormal'))
+                        story.extend(self._bullets(pontos_fracos))
+                    
+                    story.append(Spacer(1, 0.1*inch))
+        
+        # Gaps de oportunidade
+        gaps = competition_data.get('gaps_oportunidade', [])
+        if gaps:
+            story.append(self._static("Oportunidades Identificadas", 'SectionHeader'))
+            story.extend(self._bullets(gaps))
+        
+        return story
+    
+    def _build_marketing_section(self, marketing_data: dict) -> list:
+        """Constrói seção de estratégia de marketing"""
+        story = self._section_title("ESTRATÉGIA DE MARKETING")
+        
+        # Palavras-chave primárias
+        primarias = marketing_data.get('palavras_primarias', [])
+        if primarias:
+            story.append(self._static("Palavras-Chave Primárias", 'SectionHeader'))
+            story.append(Paragraph(", ".join(primarias), self.styles['CustomNormal']))
+        
+        # Palavras-chave secundárias
+        secundarias = marketing_data.get('palavras_secundarias', [])
+        if secundarias:
+            story.append(self._static("Palavras-Chave Secundárias", 'SectionHeader'))
+            story.append(Paragraph(", ".join(secundarias[:15]), self.styles['CustomNormal']))
+        
+        # Long tail
+        long_tail = marketing_data.get('long_tail', [])
+        if long_tail:
+            story.append(self._static("Palavras-Chave Long Tail", 'SectionHeader'))
+            story.append(Paragraph(", ".join(long_tail[:10]), self.styles['CustomNormal']))
+        
+        return story
+    
+    def _build_metrics_section(self, metrics_data: dict) -> list:
+        """Constrói seção de métricas"""
+        story = self._section_title("MÉTRICAS DE PERFORMANCE")
+        
+        # KPIs principais
+        kpis = metrics_data.get('kpis_principais', [])
+        if kpis:
+            story.append(self._static("KPIs Principais", 'SectionHeader'))
+            
+            for kpi in kpis:
+                if isinstance(kpi, dict):
+                    metrica = kpi.get('metrica', 'N/A')
+                    objetivo = kpi.get('objetivo', 'N/A')
+                    story.append(Paragraph(f"<b>{metrica}:</b> {objetivo}", self.styles['CustomNormal']))
+        
+        # ROI esperado
+        roi = metrics_data.get('roi_esperado', '')
+        if roi:
+            story.append(self._static("ROI Esperado", 'SectionHeader'))
+            story.append(Paragraph(roi, self.styles['CustomNormal']))
+        
+        return story
+    
+    def _build_projections_section(self, projections_data: dict) -> list:
+        """Constrói seção de projeções"""
+        story = self._section_title("PROJEÇÕES E CENÁRIOS")
+        
+        # Tabela de cenários
+        cenarios = ['conservador', 'realista', 'otimista']
+        table_data = [['Cenário', 'Receita Mensal', 'Clientes/Mês', 'Ticket Médio']]
+        
+        for cenario in cenarios:
+            cenario_data = projections_data.get(cenario, {})
+            if cenario_data:
+                table_data.append([
+                    cenario.title(),
+                    cenario_data.get('receita_mensal', 'N/A'),
+                    cenario_data.get('clientes_mes', 'N/A'),
+                    cenario_data.get('ticket_medio', 'N/A')
+                ])
+        
+        if len(table_data) > 1:
+            story.append(Table(table_data, colWidths=SCENARIO_COL_WIDTHS, style=self.header_table_style))
+        
+        return story
+    
+    def _build_action_plan_section(self, action_data: dict) -> list:
+        """Constrói seção do plano de ação"""
+        story = self._section_title("PLANO DE AÇÃO DETALHADO")
+        
+        # Fases do plano
+        fases = ['fase_1_preparacao', 'fase_2_lancamento', 'fase_3_crescimento']
+        
+        for fase in fases:
+            fase_data = action_data.get(fase, {})
+            if fase_data:
+                fase_nome = fase.replace('_', ' ').title()
+                story.append(self._static(fase_nome, 'SectionHeader'))
+                
+                duracao = fase_data.get('duracao', 'N/A')
+                story.append(Paragraph(f"<b>Duração:</b> {duracao}", self.styles['CustomNormal']))
+                
+                atividades = fase_data.get('atividades', [])
+                if atividades:
+                    story.append(self._static("<b>Atividades:</b>", 'CustomNormal'))
+                    story.extend(self._bullets(atividades))
+                
+                story.append(Spacer(1, 0.1*inch))
+        
+        return story
+    
+    def _build_insights_section(self, insights: list) -> list:
+        """Constrói seção de insights exclusivos"""
+        story = self._section_title("INSIGHTS EXCLUSIVOS")
+        
+        for i, insight in enumerate(insights, 1):
+            story.append(Paragraph(f"{i}. {insight}", self.styles['CustomNormal']))
+            story.append(Spacer(1, 0.1*inch))
+        
+        return story
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Fila de Persistência (write-behind)
+Agrupa inserções e atualizações de análises em instruções multi-linha
+"""
+
+import os
+import glob
+import json
+import time
+import uuid
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Any
+import psycopg2
+from database import db_manager
+from services.service_registry import service_registry, ServiceUnavailableError
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+# Falhas de rede/conexão: a operação é reenviada; as demais vão para o arquivo de rejeitadas
+TRANSIENT_ERRORS = (
+    ConnectionError, TimeoutError, ServiceUnavailableError,
+    psycopg2.OperationalError, psycopg2.InterfaceError
+) + ((httpx.TransportError,) if httpx else ())
+
+class PersistenceQueue:
+    """Grava análises em segundo plano, em lotes, com spool local como fallback"""
+
+    def __init__(self):
+        """Inicializa configuração (a thread de escrita é criada sob demanda)"""
+        # Desativado por padrão: /api/analyze responde só com o ticket (ID via /api/analyses/ticket/<ticket>)
+        self.enabled = os.getenv('PERSISTENCE_WRITE_BEHIND', 'false').lower() == 'true'
+        self.batch_size = int(os.getenv('PERSISTENCE_BATCH_SIZE', 50))
+        self.flush_interval = float(os.getenv('PERSISTENCE_FLUSH_INTERVAL', 2.0))
+        self.max_attempts = int(os.getenv('PERSISTENCE_MAX_ATTEMPTS', 5))
+        self.retry_backoff = float(os.getenv('PERSISTENCE_RETRY_BACKOFF', 1.0))
+        self.replay_interval = float(os.getenv('PERSISTENCE_REPLAY_INTERVAL', 60))
+        self.spool_path = os.getenv(
+            'PERSISTENCE_SPOOL_PATH',
+            os.path.join(os.path.dirname(__file__), '..', 'data', 'persistence_spool.jsonl')
+        )
+
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self._spool_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._atexit_registered = False
+
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self) -> None:
+        """Cada processo tem sua própria fila e thread de escrita"""
+        self._queue = queue.Queue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._spool_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        """Inicia a gravação em segundo plano (e o reprocessamento do spool)"""
+        if self.enabled:
+            self._ensure_worker()
+
+    def _ensure_worker(self) -> None:
+        """Inicia a thread de escrita no processo atual (após o fork dos workers)"""
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='persistence-writer', daemon=True)
+                self._thread.start()
+                if not self._atexit_registered:
+                    atexit.register(self.shutdown)
+                    self._atexit_registered = True
+
+    def enqueue_create(self, analysis_data: Dict[str, Any]) -> str:
+        """Agenda criação de análise e retorna o ticket da operação"""
+        # created_at registra o momento da requisição, não o da gravação do lote;
+        # o ticket é gravado na análise e torna reenvios idempotentes
+        ticket = uuid.uuid4().hex
+        data = dict(analysis_data, persistence_ticket=ticket)
+        data.setdefault('created_at', datetime.now().isoformat())
+        return self._enqueue({'op': 'insert', 'data': data}, ticket)
+
+    def enqueue_update(self, analysis_id: int, update_data: Dict[str, Any]) -> str:
+        """Agenda atualização (progresso, checkpoints) de análise existente"""
+        return self._enqueue({'op': 'update', 'analysis_id': analysis_id, 'data': update_data})
+
+    def _enqueue(self, operation: Dict[str, Any], ticket: Optional[str] = None) -> str:
+        operation.update({
+            'ticket': ticket or uuid.uuid4().hex,
+            'attempts': 0,
+            'enqueued_at': datetime.now().isoformat()
+        })
+        self._ensure_worker()
+        self._queue.put(operation)
+        return operation['ticket']
+
+    def pending(self) -> int:
+        """Operações aguardando gravação neste processo"""
+        return self._queue.qsize()
+
+    def _run(self) -> None:
+        """Laço da thread de escrita: lote fecha por tamanho ou por tempo"""
+        self._replay_spool()
+        next_replay = time.monotonic() + self.replay_interval
+
+        while not self._stop.is_set() or not self._queue.empty():
+            batch = self._drain()
+            if batch:
+                self._flush(batch)
+
+            # Spool gravado durante uma indisponibilidade é reenviado sem esperar o próximo restart
+            if self.replay_interval > 0 and time.monotonic() >= next_replay and not self._stop.is_set():
+                self._replay_spool()
+                next_replay = time.monotonic() + self.replay_interval
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        """Coleta até batch_size operações ou até flush_interval após a primeira"""
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size and not self._stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _flush(self, batch: List[Dict[str, Any]]) -> None:
+        """Grava um lote: um INSERT multi-linha e os UPDATEs agrupados"""
+        inserts = [operation for operation in batch if operation['op'] == 'insert']
+        for operation in inserts:
+            # Operações do spool gravadas antes do ticket fazer parte da análise
+            operation['data'].setdefault('persistence_ticket', operation['ticket'])
+        updates = self._coalesce_updates([operation for operation in batch if operation['op'] == 'update'])
+
+        if inserts:
+            try:
+                records = db_manager.create_analyses_bulk([operation['data'] for operation in inserts])
+                for operation, record in zip(inserts, records):
+                    logger.info(f"✅ Análise salva no banco com ID: {record['id']} (ticket {operation['ticket']})")
+            except Exception as e:
+                self._handle_failure(inserts, e)
+
+        if updates:
+            try:
+                db_manager.update_analyses_bulk([(operation['analysis_id'], operation['data']) for operation in updates])
+            except Exception as e:
+                self._handle_failure(updates, e)
+
+    @staticmethod
+    def _coalesce_updates(operations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Mescla atualizações da mesma análise (a mais recente prevalece)"""
+        merged: Dict[Any, Dict[str, Any]] = {}
+        for operation in operations:
+            current = merged.get(operation['analysis_id'])
+            if current:
+                current['data'] = {**current['data'], **operation['data']}
+                current['attempts'] = max(current['attempts'], operation['attempts'])
+            else:
+                merged[operation['analysis_id']] = dict(operation)
+        return list(merged.values())
+
+    def _handle_failure(self, operations: List[Dict[str, Any]], error: Exception) -> None:
+        """Reenvia falhas transitórias; isola operações inválidas do restante do lote"""
+        if not isinstance(error, TRANSIENT_ERRORS):
+            if len(operations) > 1:
+                # Um registro inválido não pode derrubar o lote inteiro
+                logger.warning(f"⚠️ Lote de {len(operations)} operações rejeitado, regravando individualmente: {str(error)}")
+                for operation in operations:
+                    self._flush([operation])
+                return
+
+            logger.error(f"❌ Operação {operations[0]['ticket']} rejeitada pelo banco: {str(error)}")
+            self._spool(operations, rejected=True)
+            return
+
+        attempts = max(operation['attempts'] for operation in operations) + 1
+        if attempts >= self.max_attempts or self._stop.is_set():
+            logger.error(f"❌ Banco indisponível após {attempts} tentativas, {len(operations)} operações no spool local")
+            self._spool(operations)
+            return
+
+        delay = min(self.retry_backoff * (2 ** (attempts - 1)), 30.0)
+        logger.warning(f"⚠️ Erro transitório ao gravar {len(operations)} operações, nova tentativa em {delay:.1f}s: {str(error)}")
+
+        # Espera na própria thread: com o banco fora do ar os demais lotes falhariam igualmente
+        self._stop.wait(delay)
+        for operation in operations:
+            operation['attempts'] = attempts
+            self._queue.put(operation)
+
+    def _spool(self, operations: List[Dict[str, Any]], rejected: bool = False) -> None:
+        """Anexa operações ao arquivo local (JSON por linha)"""
+        path = f"{self.spool_path}.rejected" if rejected else self.spool_path
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with self._spool_lock, open(path, 'a', encoding='utf-8') as file:
+                for operation in operations:
+                    file.write(json.dumps(operation, ensure_ascii=False, default=str) + '\n')
+                file.flush()
+                os.fsync(file.fileno())
+        except Exception as e:
+            logger.critical(f"🚨 Falha ao gravar spool de persistência ({len(operations)} operações perdidas): {str(e)}")
+
+    def _replay_spool(self) -> None:
+        """Reprocessa operações do spool deixadas por execuções anteriores"""
+        candidates = [self.spool_path] + glob.glob(f"{self.spool_path}.*.replay")
+
+        for path in candidates:
+            if path.endswith('.replay') and self._owner_alive(path):
+                continue
+
+            # Rename atômico: apenas um worker assume cada arquivo
+            claimed = f"{self.spool_path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.replay"
+            try:
+                with self._spool_lock:
+                    os.replace(path, claimed)
+            except FileNotFoundError:
+                continue
+
+            operations = []
+            with open(claimed, encoding='utf-8') as file:
+                for line in file:
+                    if line.strip():
+                        operation = json.loads(line)
+                        operation['attempts'] = 0
+                        operations.append(operation)
+
+            logger.info(f"🔁 Reprocessando {len(operations)} operações do spool de persistência")
+            for start in range(0, len(operations), self.batch_size):
+                self._flush(operations[start:start + self.batch_size])
+
+            os.remove(claimed)
+
+    @staticmethod
+    def _owner_alive(path: str) -> bool:
+        """Verifica se o processo que assumiu o arquivo ainda está em execução"""
+        try:
+            pid = int(path.rsplit('.', 3)[-3])
+            os.kill(pid, 0)
+            return True
+        except (ValueError, IndexError, ProcessLookupError):
+            return False
+        except PermissionError:
+            return True
+
+    def shutdown(self, timeout: Optional[float] = None) -> None:
+        """Esvazia a fila antes de encerrar; o que não for gravado vai para o spool"""
+        if self._thread is None or not self._thread.is_alive():
+            return
+
+        self._stop.set()
+        self._thread.join(timeout if timeout is not None else self.flush_interval * 5)
+
+        leftovers = []
+        while True:
+            try:
+                leftovers.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if leftovers:
+            self._spool(leftovers)
+
+# Instância global da fila
+persistence_queue = service_registry.register('persistence_queue', PersistenceQueue)
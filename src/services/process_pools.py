@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Configuração dos Pools de Processos
+Método de início e dimensionamento dos pools criados em cada worker web
+"""
+
+import os
+import multiprocessing
+from multiprocessing.context import BaseContext
+
+def pool_context(env_var: str) -> BaseContext:
+    """Contexto de multiprocessing para um pool (forkserver por padrão)
+
+    fork a partir de um worker web com threads pode herdar locks travados e
+    conexões abertas; forkserver (ou spawn, onde não existe) inicia processos limpos.
+    """
+    default_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(os.getenv(env_var) or default_method)
+
+def web_workers() -> int:
+    """Número de processos web do host (exportado pelo gunicorn.conf.py)"""
+    return max(1, int(os.getenv('WEB_CONCURRENCY', 1)))
+
+def host_pool_size(env_var: str, host_total: int = 0) -> int:
+    """Tamanho do pool de um worker web: a variável explícita ou a fração do host
+
+    host_total é o limite de processos para o host inteiro (padrão: núcleos da máquina),
+    dividido entre os workers web para que a soma dos pools não exceda o host.
+    """
+    if os.getenv(env_var):
+        return int(os.getenv(env_var))
+
+    total = host_total or os.cpu_count() or 1
+    return max(1, total // web_workers())
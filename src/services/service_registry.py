@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Registro de Serviços
+Inicialização sob demanda dos serviços globais, com status de saúde por serviço
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Dict, List, Optional, Any, Callable
+
+logger = logging.getLogger(__name__)
+
+class ServiceUnavailableError(RuntimeError):
+    """Serviço obrigatório não pôde ser inicializado"""
+
+    def __init__(self, name: str, error: str):
+        super().__init__(f"Serviço '{name}' indisponível: {error}")
+        self.service_name = name
+        self.error = error
+
+class LazyService:
+    """Proxy do serviço: a instância real é criada no primeiro acesso a um atributo
+
+    Avaliado como booleano, indica se o serviço está disponível (mantém as
+    verificações `if gemini_client:` dos clientes opcionais).
+    """
+
+    def __init__(self, registry: 'ServiceRegistry', name: str):
+        object.__setattr__(self, '_registry', registry)
+        object.__setattr__(self, '_name', name)
+
+    def __getattr__(self, attribute: str) -> Any:
+        return getattr(self._registry.get(self._name), attribute)
+
+    def __setattr__(self, attribute: str, value: Any) -> None:
+        setattr(self._registry.get(self._name), attribute, value)
+
+    def __bool__(self) -> bool:
+        return self._registry.available(self._name)
+
+    def __repr__(self) -> str:
+        return f"<LazyService {self._name}: {self._registry.status(self._name)}>"
+
+class _ServiceEntry:
+    """Estado de inicialização de um serviço"""
+
+    def __init__(self, name: str, factory: Callable[[], Any], optional: bool, fork_safe: bool):
+        self.name = name
+        self.factory = factory
+        self.optional = optional
+        self.fork_safe = fork_safe
+        self.instance: Any = None
+        self.error: Optional[str] = None
+        self.failed_at: Optional[float] = None
+        self.init_seconds: Optional[float] = None
+        self.lock = threading.Lock()
+
+class ServiceRegistry:
+    """Cria serviços no primeiro uso e guarda falhas para retentativa posterior"""
+
+    def __init__(self):
+        """Inicializa registro vazio"""
+        self.retry_interval = float(os.getenv('SERVICE_RETRY_INTERVAL', 30))
+        self._entries: Dict[str, _ServiceEntry] = {}
+
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self.reset_after_fork)
+
+    def register(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        optional: bool = False,
+        fork_safe: bool = True
+    ) -> LazyService:
+        """Registra fábrica do serviço e retorna o proxy usado como singleton do módulo
+
+        fork_safe=False: a instância mantém conexões e é recriada em cada processo filho.
+        """
+        self._entries[name] = _ServiceEntry(name, factory, optional, fork_safe)
+        return LazyService(self, name)
+
+    def get(self, name: str) -> Any:
+        """Instância do serviço (criada sob demanda)"""
+        entry = self._entries[name]
+        if entry.instance is not None:
+            return entry.instance
+
+        with entry.lock:
+            if entry.instance is not None:
+                return entry.instance
+
+            # Falha recente: não repete a inicialização a cada requisição
+            if entry.failed_at and time.monotonic() - entry.failed_at < self.retry_interval:
+                raise ServiceUnavailableError(name, entry.error)
+
+            start_time = time.monotonic()
+            try:
+                entry.instance = entry.factory()
+                entry.init_seconds = time.monotonic() - start_time
+                entry.error = None
+                entry.failed_at = None
+                logger.info(f"✅ Serviço '{name}' inicializado em {entry.init_seconds:.2f}s")
+                return entry.instance
+            except Exception as e:
+                entry.error = str(e)
+                entry.failed_at = time.monotonic()
+                log = logger.warning if entry.optional else logger.error
+                log(f"Erro ao inicializar serviço '{name}': {str(e)}")
+                raise ServiceUnavailableError(name, entry.error) from e
+
+    def available(self, name: str) -> bool:
+        """Tenta inicializar o serviço e indica se está utilizável"""
+        try:
+            self.get(name)
+            return True
+        except ServiceUnavailableError:
+            return False
+
+    def status(self, name: str) -> str:
+        entry = self._entries[name]
+        if entry.instance is not None:
+            return 'ready'
+        if entry.error:
+            return 'failed'
+        return 'not_initialized'
+
+    def health(self) -> Dict[str, Dict[str, Any]]:
+        """Status de cada serviço, sem forçar inicialização"""
+        return {
+            name: {
+                'status': self.status(name),
+                'optional': entry.optional,
+                'error': entry.error,
+                'init_seconds': round(entry.init_seconds, 3) if entry.init_seconds is not None else None
+            }
+            for name, entry in self._entries.items()
+        }
+
+    def reset_after_fork(self) -> None:
+        """Descarta, no processo filho, instâncias com conexões herdadas do processo pai"""
+        for entry in self._entries.values():
+            entry.lock = threading.Lock()
+            if not entry.fork_safe and entry.instance is not None:
+                entry.instance = None
+                entry.init_seconds = None
+
+    def warm_up(self, names: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Inicializa serviços antecipadamente (ex.: antes de atender tráfego)"""
+        for name in names or list(self._entries):
+            self.available(name)
+        return self.health()
+
+# Instância global do registro
+service_registry = ServiceRegistry()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Extração de Dados Tabulares
+Leitura em blocos de CSV e Excel com resumo compacto para os modelos de IA
+"""
+
+import os
+import math
+import logging
+from collections import Counter
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Union
+import pandas as pd
+from openpyxl import load_workbook
+
+logger = logging.getLogger(__name__)
+
+Source = Union[str, BinaryIO]
+
+class TableSummary:
+    """Acumula esquema e estatísticas de uma tabela bloco a bloco"""
+
+    def __init__(self, name: str, sample_rows: int, top_categories: int, max_tracked_categories: int):
+        self.name = name
+        self.sample_rows = sample_rows
+        self.top_categories = top_categories
+        self.max_tracked_categories = max_tracked_categories
+
+        self.row_count = 0
+        self.columns: List[str] = []
+        self.dtypes: Dict[str, List[str]] = {}
+        self.null_counts: Dict[str, int] = {}
+        self.numeric: Dict[str, Dict[str, float]] = {}
+        self.categories: Dict[str, Counter] = {}
+        self.sample: Optional[pd.DataFrame] = None
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        """Incorpora um bloco de linhas ao resumo"""
+        if chunk.empty:
+            return
+
+        for column in chunk.columns:
+            name = str(column)
+            if name not in self.dtypes:
+                self.columns.append(name)
+                self.dtypes[name] = []
+                self.null_counts[name] = 0
+            dtype = str(chunk[column].dtype)
+            if dtype not in self.dtypes[name]:
+                self.dtypes[name].append(dtype)
+
+        self.row_count += len(chunk)
+
+        for column, nulls in chunk.isna().sum().items():
+            self.null_counts[str(column)] += int(nulls)
+
+        if self.sample is None or len(self.sample) < self.sample_rows:
+            missing = self.sample_rows - (0 if self.sample is None else len(self.sample))
+            head = chunk.head(missing)
+            self.sample = head if self.sample is None else pd.concat([self.sample, head])
+
+        # Estatísticas numéricas vetorizadas por bloco
+        numeric = chunk.select_dtypes(include='number')
+        if not numeric.empty:
+            as_float = numeric.astype('float64')
+            counts = as_float.count()
+            sums = as_float.sum()
+            squares = (as_float ** 2).sum()
+            minimums = as_float.min()
+            maximums = as_float.max()
+
+            for column in numeric.columns:
+                count = int(counts[column])
+                if count == 0:
+                    continue
+                stats = self.numeric.setdefault(str(column), {
+                    'count': 0, 'sum': 0.0, 'sumsq': 0.0, 'min': math.inf, 'max': -math.inf
+                })
+                stats['count'] += count
+                stats['sum'] += float(sums[column])
+                stats['sumsq'] += float(squares[column])
+                stats['min'] = min(stats['min'], float(minimums[column]))
+                stats['max'] = max(stats['max'], float(maximums[column]))
+
+        # Frequência de categorias para colunas textuais
+        for column in chunk.select_dtypes(include=['object', 'category', 'bool']).columns:
+            counter = self.categories.setdefault(str(column), Counter())
+            counter.update(chunk[column].dropna().astype(str).value_counts().to_dict())
+            if len(counter) > self.max_tracked_categories:
+                # Mantém apenas as categorias mais frequentes para limitar memória
+                self.categories[str(column)] = Counter(
+                    dict(counter.most_common(self.max_tracked_categories // 2))
+                )
+
+    def render(self) -> str:
+        """Gera texto compacto do resumo"""
+        lines = [
+            f"TABELA: {self.name}",
+            f"Linhas: {self.row_count} | Colunas: {len(self.columns)}",
+            "",
+            "COLUNAS:"
+        ]
+
+        for column in self.columns:
+            lines.append(
+                f"- {column} ({'|'.join(self.dtypes[column])}): {self.null_counts[column]} nulos"
+            )
+
+        if self.numeric:
+            lines.extend(["", "ESTATÍSTICAS NUMÉRICAS:"])
+            for column, stats in self.numeric.items():
+                mean = stats['sum'] / stats['count']
+                variance = max(0.0, stats['sumsq'] / stats['count'] - mean ** 2)
+                lines.append(
+                    f"- {column}: média={mean:.4g}, desvio={math.sqrt(variance):.4g}, "
+                    f"mín={stats['min']:.4g}, máx={stats['max']:.4g}, soma={stats['sum']:.4g}"
+                )
+
+        top_lines = []
+        for column, counter in self.categories.items():
+            if not counter:
+                continue
+            top = ', '.join(
+                f"{self._shorten(value)} ({count})"
+                for value, count in counter.most_common(self.top_categories)
+            )
+            top_lines.append(f"- {column}: {top}")
+
+        if top_lines:
+            lines.extend(["", "CATEGORIAS MAIS FREQUENTES:"])
+            lines.extend(top_lines)
+
+        if self.sample is not None and not self.sample.empty:
+            lines.extend(["", f"AMOSTRA ({len(self.sample)} linhas):"])
+            lines.append(self.sample.to_csv(index=False).strip())
+
+        return "\n".join(lines)
+
+    @staticmethod
+    def _shorten(value: str, limit: int = 40) -> str:
+        return value if len(value) <= limit else value[:limit - 3] + '...'
+
+class TabularExtractionEngine:
+    """Extrai CSV e Excel em blocos, em modo resumo ou completo"""
+
+    def __init__(self):
+        """Inicializa motor de extração tabular"""
+        self.mode = os.getenv('TABULAR_EXTRACTION_MODE', 'summary').lower()
+        self.chunk_rows = int(os.getenv('TABULAR_CHUNK_ROWS', 20000))
+        self.sample_rows = int(os.getenv('TABULAR_SAMPLE_ROWS', 10))
+        self.top_categories = int(os.getenv('TABULAR_TOP_CATEGORIES', 5))
+        self.max_tracked_categories = int(os.getenv('TABULAR_MAX_TRACKED_CATEGORIES', 5000))
+
+    def extract_csv(self, source: Source, name: str = 'CSV') -> Optional[str]:
+        """Extrai CSV lendo em blocos (UTF-8 com fallback para latin-1)"""
+        for encoding in ('utf-8', 'latin-1'):
+            try:
+                self._rewind(source)
+                chunks = pd.read_csv(source, encoding=encoding, chunksize=self.chunk_rows)
+                return self._render_table(name, chunks)
+
+            except UnicodeDecodeError:
+                logger.warning(f"CSV não está em {encoding}, tentando próximo encoding")
+
+        return None
+
+    def extract_excel(self, source: Source) -> Optional[str]:
+        """Extrai todas as planilhas abrindo a pasta de trabalho uma única vez"""
+        try:
+            self._rewind(source)
+            workbook = load_workbook(source, read_only=True, data_only=True)
+        except Exception as e:
+            # Formatos não suportados pelo openpyxl (ex.: .xls) usam o pandas
+            logger.warning(f"openpyxl não abriu a planilha, usando pandas: {str(e)}")
+            return self._extract_excel_with_pandas(source)
+
+        try:
+            sections = [
+                self._render_table(f"PLANILHA {sheet.title}", self._iter_sheet_chunks(sheet))
+                for sheet in workbook.worksheets
+            ]
+            return "\n\n".join(sections).strip()
+        finally:
+            workbook.close()
+
+    def _extract_excel_with_pandas(self, source: Source) -> Optional[str]:
+        """Fallback para formatos legados, ainda com leitura única do arquivo"""
+        self._rewind(source)
+        with pd.ExcelFile(source) as excel_file:
+            sections = []
+            for sheet_name in excel_file.sheet_names:
+                df = excel_file.parse(sheet_name)
+                chunks = (
+                    df.iloc[start:start + self.chunk_rows]
+                    for start in range(0, len(df), self.chunk_rows)
+                )
+                sections.append(self._render_table(f"PLANILHA {sheet_name}", chunks))
+        return "\n\n".join(sections).strip()
+
+    def _iter_sheet_chunks(self, sheet) -> Iterator[pd.DataFrame]:
+        """Converte linhas da planilha (modo somente leitura) em blocos de DataFrame"""
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+
+        columns = self._unique_columns(header)
+
+        batch = []
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            batch.append(row[:len(columns)])
+            if len(batch) >= self.chunk_rows:
+                yield pd.DataFrame(batch, columns=columns).infer_objects()
+                batch = []
+
+        if batch:
+            yield pd.DataFrame(batch, columns=columns).infer_objects()
+
+    @staticmethod
+    def _unique_columns(header) -> List[str]:
+        """Nomes de colunas como o pandas gera: vazias viram 'Unnamed: N', repetidas ganham '.1', '.2'..."""
+        columns: List[str] = []
+        seen = set()
+        for index, value in enumerate(header):
+            base = f"Unnamed: {index}" if value is None or str(value).strip() == '' else str(value)
+            name = base
+            suffix = 0
+            while name in seen:
+                suffix += 1
+                name = f"{base}.{suffix}"
+            seen.add(name)
+            columns.append(name)
+        return columns
+
+    def _render_table(self, name: str, chunks: Iterator[pd.DataFrame]) -> str:
+        """Consome os blocos e gera o texto no modo configurado"""
+        if self.mode == 'full':
+            parts = [f"TABELA: {name}"]
+            header = True
+            for chunk in chunks:
+                parts.append(chunk.to_csv(index=False, header=header).strip())
+                header = False
+            return "\n".join(parts)
+
+        summary = TableSummary(name, self.sample_rows, self.top_categories, self.max_tracked_categories)
+        for chunk in chunks:
+            summary.update(chunk)
+        return summary.render()
+
+    @staticmethod
+    def _rewind(source: Source) -> None:
+        if hasattr(source, 'seek'):
+            source.seek(0)
+
+# Instância global do motor
+tabular_extraction_engine = TabularExtractionEngine()
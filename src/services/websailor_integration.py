@@ -6,14 +6,16 @@ Navegação web avançada para pesquisa profunda e extração de insights
 """
 
 import os
+import re
 import logging
 import time
-import requests
 from typing import Dict, List, Optional, Any
 from urllib.parse import quote_plus, urljoin
 import json
 from datetime import datetime
-from bs4 import BeautifulSoup
+from services.analysis_deadline import AnalysisDeadline, deadline_timeout
+from services.service_registry import service_registry
+from services.http_client import http_pool
 
 logger = logging.getLogger(__name__)
 
@@ -43,6 +45,10 @@ class WebSailorAgent:
         self.cache = {}
         self.cache_ttl = 3600  # 1 hora
         
+        # Tempo mínimo restante para executar etapas opcionais
+        self.deep_crawl_min_seconds = 60
+        self.related_queries_min_seconds = 45
+        
         logger.info(f"WebSailor Agent initialized - Enabled: {self.enabled}")
     
     def is_available(self) -> bool:
@@ -55,7 +61,8 @@ class WebSailorAgent:
         context: Dict[str, Any],
         max_pages: int = 8,  # Aumentado de 5 para 8
         depth: int = 2,  # Padrão agora é profundidade 2
-        aggressive_mode: bool = True  # Novo modo agressivo para pesquisa intensiva
+        aggressive_mode: bool = True,  # Novo modo agressivo para pesquisa intensiva
+        deadline: Optional[AnalysisDeadline] = None
     ) -> Dict[str, Any]:
         """Navega e pesquisa informações relevantes com profundidade"""
         
@@ -71,11 +78,14 @@ class WebSailorAgent:
             
             # 1. Busca inicial (mais páginas se modo agressivo)
             search_pages = max_pages * 2 if aggressive_mode else max_pages
-            search_results = self._perform_search(query, search_pages)
+            search_results = self._perform_search(query, search_pages, deadline)
             
             # 2. Navega e extrai conteúdo das páginas principais
             for result in search_results:
-                content = self._extract_page_content(result["url"])
+                if deadline and deadline.expired():
+                    deadline.skip("websailor_primary_pages")
+                    break
+                content = self._extract_page_content(result["url"], deadline)
                 if content:
                     all_page_contents.append({
                         "url": result["url"],
@@ -86,14 +96,18 @@ class WebSailorAgent:
                     })
             
             # 3. Pesquisa em profundidade (se depth > 1)
-            if depth > 1:
+            if depth > 1 and deadline and not deadline.has_time_for(self.deep_crawl_min_seconds):
+                deadline.skip("websailor_deep_crawl")
+            elif depth > 1:
                 logger.info(f"Iniciando pesquisa em profundidade (nível {depth})...")
                 top_pages = 5 if aggressive_mode else 3  # Mais páginas no modo agressivo
                 for page in all_page_contents[:top_pages]:
                     internal_links = self._extract_internal_links(page["url"], page["content"])
                     links_to_process = 4 if aggressive_mode else 2  # Mais links internos no modo agressivo
                     for link in internal_links[:links_to_process]:
-                        internal_content = self._extract_page_content(link)
+                        if deadline and deadline.expired():
+                            break
+                        internal_content = self._extract_page_content(link, deadline)
                         if internal_content:
                             all_page_contents.append({
                                 "url": link,
@@ -104,13 +118,19 @@ class WebSailorAgent:
                             })
             
             # 4. Pesquisa de queries relacionadas (modo agressivo)
-            if aggressive_mode:
+            if aggressive_mode and deadline and not deadline.has_time_for(self.related_queries_min_seconds):
+                deadline.skip("websailor_related_queries")
+            elif aggressive_mode:
                 logger.info("Executando pesquisa de queries relacionadas (modo agressivo)...")
                 related_queries = self._generate_related_queries(query, context)
                 for related_query in related_queries[:3]:  # Máximo 3 queries relacionadas
-                    related_results = self._perform_search(related_query, 3)  # 3 resultados por query relacionada
+                    if deadline and deadline.expired():
+                        break
+                    related_results = self._perform_search(related_query, 3, deadline)  # 3 resultados por query relacionada
                     for result in related_results:
-                        content = self._extract_page_content(result["url"])
+                        if deadline and deadline.expired():
+                            break
+                        content = self._extract_page_content(result["url"], deadline)
                         if content:
                             all_page_contents.append({
                                 "url": result["url"],
@@ -124,7 +144,7 @@ class WebSailorAgent:
             all_page_contents.sort(key=lambda x: x["relevance_score"], reverse=True)
             
             # 6. Consolida informações
-            research_result = self._consolidate_research(all_page_contents, query, context)
+            research_result = self._consolidate_research(all_page_contents, query, context, deadline)
             
             end_time = time.time()
             logger.info(f"Pesquisa WebSailor concluída em {end_time - start_time:.2f} segundos")
@@ -135,7 +155,12 @@ class WebSailorAgent:
             logger.error(f"Erro na pesquisa WebSailor: {str(e)}", exc_info=True)
             return self._generate_fallback_research(query, context)
     
-    def _perform_search(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+    def _perform_search(
+        self, 
+        query: str, 
+        max_results: int,
+        deadline: Optional[AnalysisDeadline] = None
+    ) -> List[Dict[str, Any]]:
         """Realiza busca usando Google Custom Search ou alternativa"""
         
         cache_key = f"search_{hash(query)}"
@@ -148,7 +173,7 @@ class WebSailorAgent:
         results = []
         
         if self.google_search_key:
-            results = self._google_search(query, max_results)
+            results = self._google_search(query, max_results, deadline)
         
         if not results:
             results = self._alternative_search(query, max_results)
@@ -160,7 +185,12 @@ class WebSailorAgent:
         
         return results
     
-    def _google_search(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+    def _google_search(
+        self, 
+        query: str, 
+        max_results: int,
+        deadline: Optional[AnalysisDeadline] = None
+    ) -> List[Dict[str, Any]]:
         """Busca usando Google Custom Search API"""
         
         try:
@@ -177,11 +207,11 @@ class WebSailorAgent:
                 "dateRestrict": "y1"  # Últimos 12 meses
             }
             
-            response = requests.get(
+            response = http_pool.session().get(
                 self.google_search_url,
                 params=params,
                 headers=self.headers,
-                timeout=15
+                timeout=deadline_timeout(deadline, 15)
             )
             
             if response.status_code == 200:
@@ -269,7 +299,11 @@ class WebSailorAgent:
         
         return enhanced_query.strip()
     
-    def _extract_page_content(self, url: str) -> Optional[str]:
+    def _extract_page_content(
+        self, 
+        url: str,
+        deadline: Optional[AnalysisDeadline] = None
+    ) -> Optional[str]:
         """Extrai conteúdo de uma página web"""
         
         if not url or not url.startswith("http"): # Garante que é uma URL válida
@@ -284,10 +318,10 @@ class WebSailorAgent:
         content = None
         
         if self.jina_api_key:
-            content = self._extract_with_jina(url)
+            content = self._extract_with_jina(url, deadline)
         
-        if not content:
-            content = self._extract_basic_content(url)
+        if not content and not (deadline and deadline.expired()):
+            content = self._extract_basic_content(url, deadline)
         
         if content:
             self.cache[cache_key] = {
@@ -297,7 +331,11 @@ class WebSailorAgent:
         
         return content
     
-    def _extract_with_jina(self, url: str) -> Optional[str]:
+    def _extract_with_jina(
+        self, 
+        url: str,
+        deadline: Optional[AnalysisDeadline] = None
+    ) -> Optional[str]:
         """Extrai conteúdo usando Jina Reader API"""
         
         try:
@@ -308,10 +346,10 @@ class WebSailorAgent:
             
             jina_url = f"{self.jina_reader_url}{url}"
             
-            response = requests.get(
+            response = http_pool.session().get(
                 jina_url,
                 headers=headers,
-                timeout=30 # Aumentar timeout para Jina
+                timeout=deadline_timeout(deadline, 30) # Aumentar timeout para Jina
             )
             
             if response.status_code == 200:
@@ -331,18 +369,23 @@ class WebSailorAgent:
             logger.error(f"Erro no Jina Reader para {url}: {str(e)}", exc_info=True)
             return None
     
-    def _extract_basic_content(self, url: str) -> Optional[str]:
+    def _extract_basic_content(
+        self, 
+        url: str,
+        deadline: Optional[AnalysisDeadline] = None
+    ) -> Optional[str]:
         """Extração básica de conteúdo usando requests + BeautifulSoup"""
         
         try:
-            response = requests.get(
+            response = http_pool.session().get(
                 url,
                 headers=self.headers,
-                timeout=20, # Aumentar timeout para requests
+                timeout=deadline_timeout(deadline, 20), # Aumentar timeout para requests
                 allow_redirects=True
             )
             
             if response.status_code == 200:
+                from bs4 import BeautifulSoup
                 soup = BeautifulSoup(response.content, "html.parser")
                 
                 for element in soup(["script", "style", "nav", "footer", "header", "form", "aside"]):
@@ -371,6 +414,7 @@ class WebSailorAgent:
         """Extrai links internos de uma página para pesquisa em profundidade"""
         links = []
         try:
+            from bs4 import BeautifulSoup
             soup = BeautifulSoup(content, "html.parser")
             for a_tag in soup.find_all("a", href=True):
                 href = a_tag["href"]
@@ -440,7 +484,8 @@ class WebSailorAgent:
         self, 
         page_contents: List[Dict[str, Any]], 
         query: str, 
-        context: Dict[str, Any]
+        context: Dict[str, Any],
+        deadline: Optional[AnalysisDeadline] = None
     ) -> Dict[str, Any]:
         """Consolida informações da pesquisa, gerando insights mais ricos"""
         
@@ -483,13 +528,14 @@ Conteúdo:
 JSON:
 """
         try:
-            ai_response = gemini_client.generate_content(prompt_for_ai, timeout=60) # Aumentar timeout
+            ai_response = gemini_client.generate_content(prompt_for_ai, timeout=deadline_timeout(deadline, 60))
             json_match = re.search(r"```json\n(.*?)```", ai_response, re.DOTALL)
             if not json_match:
                 json_match = re.search(r"\{.*\}", ai_response, re.DOTALL)
 
             if json_match:
-                ai_extracted_data = json.loads(json_match.group(1) if json_match.group(1) else json_match.group(0))
+                # Bloco ```json``` tem grupo de captura; o objeto solto é o match inteiro
+                ai_extracted_data = json.loads(json_match.group(1) if json_match.re.groups else json_match.group(0))
                 insights = ai_extracted_data.get("key_insights", [])
                 trends = ai_extracted_data.get("market_trends", [])
                 opportunities = ai_extracted_data.get("opportunities", [])
@@ -573,7 +619,7 @@ JSON:
         }
 
 # Instância global do serviço
-websailor_agent = WebSailorAgent()
+websailor_agent = service_registry.register('websailor', WebSailorAgent)
 
 def _generate_related_queries(self, original_query: str, context: Dict[str, Any]) -> List[str]:
         """Gera queries relacionadas para pesquisa mais abrangente"""
@@ -3,6 +3,8 @@
 class FileUploadManager {
     constructor() {
         this.maxFileSize = 16 * 1024 * 1024; // 16MB
+        // Server caps the whole request (MAX_CONTENT_LENGTH); keep room for multipart overhead
+        this.maxBatchSize = this.maxFileSize - 64 * 1024;
         this.allowedTypes = [
             'application/pdf',
             'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
@@ -79,22 +81,44 @@ class FileUploadManager {
     }
     
     handleFiles(files) {
-        files.forEach(file => this.processFile(file));
+        const batch = [];
+        
+        files.forEach(file => {
+            const validation = this.validateFile(file);
+            if (!validation.valid) {
+                this.showError(validation.message);
+                return;
+            }
+            
+            const fileElement = this.addFileToUI(file);
+            if (fileElement) {
+                batch.push({ file, element: fileElement });
+            }
+        });
+        
+        // Send files in as few requests as the size limit allows; processing happens in background
+        this.splitBatches(batch).forEach(chunk => this.uploadBatch(chunk));
     }
     
-    processFile(file) {
-        // Validate file
-        const validation = this.validateFile(file);
-        if (!validation.valid) {
-            this.showError(validation.message);
-            return;
-        }
-        
-        // Show file in UI immediately
-        this.addFileToUI(file);
+    splitBatches(batch) {
+        const chunks = [];
+        let current = [];
+        let currentSize = 0;
+        
+        batch.forEach(entry => {
+            if (current.length > 0 && currentSize + entry.file.size > this.maxBatchSize) {
+                chunks.push(current);
+                current = [];
+                currentSize = 0;
+            }
+            current.push(entry);
+            currentSize += entry.file.size;
+        });
         
-        // Upload file
-        this.uploadFile(file);
+        if (current.length > 0) {
+            chunks.push(current);
+        }
+        return chunks;
     }
     
     validateFile(file) {
@@ -159,63 +183,84 @@ class FileUploadManager {
             file: file,
             element: fileElement
         };
+        
+        return fileElement;
     }
     
-    async uploadFile(file) {
-        const fileElement = document.querySelector(`[data-file-id="${file._fileData?.id}"]`) || 
-                           Array.from(document.querySelectorAll('.file-item')).find(el => 
-                               el.querySelector('.file-name').textContent === file.name
-                           );
+    uploadBatch(batch) {
+        const formData = new FormData();
+        batch.forEach(({ file }) => formData.append('files', file));
+        formData.append('session_id', window.app?.sessionId || 'default_session');
+        
+        const xhr = new XMLHttpRequest();
+        
+        // Track upload progress (first half of the bar; processing fills the rest)
+        xhr.upload.addEventListener('progress', (e) => {
+            if (e.lengthComputable) {
+                const percentComplete = (e.loaded / e.total) * 50;
+                batch.forEach(({ element }) => {
+                    const progressFill = element.querySelector('.progress-fill');
+                    if (progressFill) {
+                        progressFill.style.width = percentComplete + '%';
+                    }
+                });
+            }
+        });
         
-        if (!fileElement) return;
+        xhr.addEventListener('load', () => {
+            if (xhr.status === 202) {
+                const response = JSON.parse(xhr.responseText);
+                response.jobs.forEach((job, index) => {
+                    const { element } = batch[index];
+                    element.setAttribute('data-job-id', job.job_id);
+                    this.pollJob(job.job_id, element);
+                });
+            } else {
+                batch.forEach(({ element }) => this.onUploadError(element, 'Erro no servidor'));
+            }
+        });
         
-        const progressFill = fileElement.querySelector('.progress-fill');
+        xhr.addEventListener('error', () => {
+            batch.forEach(({ element }) => this.onUploadError(element, 'Erro de conexão'));
+        });
+        
+        xhr.open('POST', '/api/upload_attachments');
+        xhr.send(formData);
+    }
+    
+    async pollJob(jobId, fileElement, interval = 1000) {
         const statusElement = fileElement.querySelector('.file-status');
+        const progressFill = fileElement.querySelector('.progress-fill');
         
         try {
-            // Prepare form data
-            const formData = new FormData();
-            formData.append('file', file);
-            formData.append('session_id', window.app?.sessionId || 'default_session');
+            const response = await fetch(`/api/attachment_jobs/${jobId}`);
+            if (!response.ok) {
+                throw new Error('Erro no servidor');
+            }
             
-            // Upload with progress tracking
-            const xhr = new XMLHttpRequest();
+            const job = await response.json();
             
-            // Track upload progress
-            xhr.upload.addEventListener('progress', (e) => {
-                if (e.lengthComputable) {
-                    const percentComplete = (e.loaded / e.total) * 100;
-                    if (progressFill) {
-                        progressFill.style.width = percentComplete + '%';
-                    }
-                }
-            });
+            if (job.status === 'completed') {
+                this.onUploadSuccess(fileElement, job.result);
+                return;
+            }
             
-            // Handle completion
-            xhr.addEventListener('load', () => {
-                if (xhr.status === 200) {
-                    const response = JSON.parse(xhr.responseText);
-                    if (response.success) {
-                        this.onUploadSuccess(fileElement, response);
-                    } else {
-                        this.onUploadError(fileElement, response.error || 'Erro desconhecido');
-                    }
-                } else {
-                    this.onUploadError(fileElement, 'Erro no servidor');
-                }
-            });
+            if (job.status === 'failed') {
+                this.onUploadError(fileElement, job.error || 'Erro desconhecido');
+                return;
+            }
             
-            // Handle errors
-            xhr.addEventListener('error', () => {
-                this.onUploadError(fileElement, 'Erro de conexão');
-            });
+            if (statusElement) {
+                statusElement.textContent = job.status === 'queued' ? 'Na fila...' : 'Processando...';
+            }
+            if (progressFill) {
+                progressFill.style.width = job.status === 'queued' ? '60%' : '80%';
+            }
             
-            // Start upload
-            xhr.open('POST', '/api/upload_attachment');
-            xhr.send(formData);
+            setTimeout(() => this.pollJob(jobId, fileElement, interval), interval);
             
         } catch (error) {
-            console.error('Upload error:', error);
+            console.error('Job status error:', error);
             this.onUploadError(fileElement, error.message);
         }
     }
@@ -0,0 +1,72 @@
+-- ARQV30 Enhanced v2.0 - Database Migration
+-- Incrementally maintained counters for analysis statistics
+
+-- Single transaction: triggers, backfill and the SHARE lock commit together
+BEGIN;
+
+-- Create counters table (one row per status)
+CREATE TABLE IF NOT EXISTS analysis_stats_counters (
+    status VARCHAR(50) PRIMARY KEY,
+    total BIGINT NOT NULL DEFAULT 0
+);
+
+-- Create function to keep counters in sync with analyses
+CREATE OR REPLACE FUNCTION update_analysis_stats_counters()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE analysis_stats_counters
+        SET total = total - 1
+        WHERE status = COALESCE(OLD.status, 'unknown');
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO analysis_stats_counters (status, total)
+        VALUES (COALESCE(NEW.status, 'unknown'), 1)
+        ON CONFLICT (status) DO UPDATE SET total = analysis_stats_counters.total + 1;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Create triggers for analyses table (updates only when status changes)
+DROP TRIGGER IF EXISTS analyses_stats_insert_delete ON analyses;
+CREATE TRIGGER analyses_stats_insert_delete
+    AFTER INSERT OR DELETE ON analyses
+    FOR EACH ROW
+    EXECUTE FUNCTION update_analysis_stats_counters();
+
+DROP TRIGGER IF EXISTS analyses_stats_status_update ON analyses;
+CREATE TRIGGER analyses_stats_status_update
+    AFTER UPDATE OF status ON analyses
+    FOR EACH ROW
+    WHEN (OLD.status IS DISTINCT FROM NEW.status)
+    EXECUTE FUNCTION update_analysis_stats_counters();
+
+-- Backfill counters from existing rows
+LOCK TABLE analyses IN SHARE MODE;
+DELETE FROM analysis_stats_counters;
+INSERT INTO analysis_stats_counters (status, total)
+SELECT COALESCE(status, 'unknown'), COUNT(*)
+FROM analyses
+GROUP BY COALESCE(status, 'unknown');
+
+-- Create stats function (exposed as RPC by PostgREST)
+-- Recent count is an index range scan on idx_analyses_created_at
+CREATE OR REPLACE FUNCTION get_analysis_stats(recent_days INTEGER DEFAULT 7)
+RETURNS JSONB AS $$
+    SELECT jsonb_build_object(
+        'total_analyses', COALESCE((SELECT SUM(total) FROM analysis_stats_counters), 0),
+        'status_counts', COALESCE(
+            (SELECT jsonb_object_agg(status, total) FROM analysis_stats_counters WHERE total > 0),
+            '{}'::jsonb
+        ),
+        'recent_analyses', (
+            SELECT COUNT(*) FROM analyses
+            WHERE created_at >= NOW() - make_interval(days => recent_days)
+        )
+    );
+$$ language 'sql' STABLE;
+
+COMMIT;
@@ -0,0 +1,11 @@
+-- ARQV30 Enhanced v2.0 - Database Migration
+-- Indexes for segment search and keyset pagination on analyses
+
+-- Enable trigram matching for ILIKE '%term%' searches
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Create trigram index for nicho filtering
+CREATE INDEX IF NOT EXISTS idx_analyses_nicho_trgm ON analyses USING gin (nicho gin_trgm_ops);
+
+-- Create composite index for keyset pagination on (created_at, id)
+CREATE INDEX IF NOT EXISTS idx_analyses_created_at_id ON analyses (created_at DESC, id DESC);
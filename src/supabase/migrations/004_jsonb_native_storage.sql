@@ -0,0 +1,40 @@
+-- ARQV30 Enhanced v2.0 - Database Migration
+-- Convert JSON fields stored as JSON strings into native JSONB values
+
+-- Create helper that parses text as JSONB, returning NULL for invalid JSON
+CREATE OR REPLACE FUNCTION try_parse_jsonb(value TEXT)
+RETURNS JSONB AS $$
+BEGIN
+    RETURN value::jsonb;
+EXCEPTION WHEN others THEN
+    RETURN NULL;
+END;
+$$ language 'plpgsql' IMMUTABLE;
+
+-- Unwrap string-encoded rows (jsonb_typeof = 'string'), keeping invalid ones untouched
+UPDATE analyses SET avatar_data = COALESCE(try_parse_jsonb(avatar_data #>> '{}'), avatar_data)
+WHERE jsonb_typeof(avatar_data) = 'string';
+
+UPDATE analyses SET positioning_data = COALESCE(try_parse_jsonb(positioning_data #>> '{}'), positioning_data)
+WHERE jsonb_typeof(positioning_data) = 'string';
+
+UPDATE analyses SET competition_data = COALESCE(try_parse_jsonb(competition_data #>> '{}'), competition_data)
+WHERE jsonb_typeof(competition_data) = 'string';
+
+UPDATE analyses SET marketing_data = COALESCE(try_parse_jsonb(marketing_data #>> '{}'), marketing_data)
+WHERE jsonb_typeof(marketing_data) = 'string';
+
+UPDATE analyses SET metrics_data = COALESCE(try_parse_jsonb(metrics_data #>> '{}'), metrics_data)
+WHERE jsonb_typeof(metrics_data) = 'string';
+
+UPDATE analyses SET funnel_data = COALESCE(try_parse_jsonb(funnel_data #>> '{}'), funnel_data)
+WHERE jsonb_typeof(funnel_data) = 'string';
+
+UPDATE analyses SET market_intelligence = COALESCE(try_parse_jsonb(market_intelligence #>> '{}'), market_intelligence)
+WHERE jsonb_typeof(market_intelligence) = 'string';
+
+UPDATE analyses SET action_plan = COALESCE(try_parse_jsonb(action_plan #>> '{}'), action_plan)
+WHERE jsonb_typeof(action_plan) = 'string';
+
+UPDATE analyses SET comprehensive_analysis = COALESCE(try_parse_jsonb(comprehensive_analysis #>> '{}'), comprehensive_analysis)
+WHERE jsonb_typeof(comprehensive_analysis) = 'string';
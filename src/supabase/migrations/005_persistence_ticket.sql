@@ -0,0 +1,8 @@
+-- ARQV30 Enhanced v2.0 - Database Migration
+-- Idempotency key for analyses written by the write-behind persistence queue
+
+-- Create ticket column (NULL for analyses written synchronously)
+ALTER TABLE analyses ADD COLUMN IF NOT EXISTS persistence_ticket VARCHAR(64);
+
+-- Create unique index used by INSERT ... ON CONFLICT (persistence_ticket)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_analyses_persistence_ticket ON analyses (persistence_ticket);
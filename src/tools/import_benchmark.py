@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Benchmark de Inicialização
+Mede o tempo de importação por módulo (python -X importtime) em um processo limpo
+
+Uso (a partir de src/):
+    python tools/import_benchmark.py                  # importa run.py
+    python tools/import_benchmark.py --module routes.analysis --top 40
+    python tools/import_benchmark.py --create-app --json
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+import subprocess
+from typing import Dict, List, Any
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+IMPORTTIME_PATTERN = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$')
+
+# Dependências pesadas que não deveriam ser carregadas na inicialização
+HEAVY_MODULES = [
+    'pandas', 'numpy', 'openpyxl', 'PyPDF2', 'pypdf', 'pdfplumber', 'docx',
+    'reportlab', 'bs4', 'google.generativeai', 'supabase'
+]
+
+# Executado no processo filho: importa o alvo e informa tempo total, memória e módulos carregados
+CHILD_SCRIPT = '''
+import sys, time, json, resource, importlib
+start = time.perf_counter()
+module = importlib.import_module({module!r})
+if {create_app!r}:
+    module.create_app()
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    'elapsed_seconds': elapsed,
+    'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'loaded_heavy_modules': [name for name in {heavy!r} if name in sys.modules]
+}}))
+'''
+
+def run_benchmark(module: str, create_app: bool) -> Dict[str, Any]:
+    """Executa a importação em processo novo e coleta a saída do -X importtime"""
+    script = CHILD_SCRIPT.format(module=module, create_app=create_app, heavy=HEAVY_MODULES)
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', script],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True
+    )
+
+    imports = []
+    errors = []
+    for line in process.stderr.splitlines():
+        match = IMPORTTIME_PATTERN.match(line)
+        if match:
+            imports.append({
+                'module': match.group(4),
+                'self_us': int(match.group(1)),
+                'cumulative_us': int(match.group(2)),
+                'depth': len(match.group(3)) // 2
+            })
+        elif not line.startswith('import time:'):
+            errors.append(line)
+
+    if process.returncode != 0:
+        raise RuntimeError('\n'.join(errors[-20:]) or f"Falha ao importar {module}")
+
+    summary = json.loads(process.stdout.strip().splitlines()[-1])
+    summary.update({'module': module, 'create_app': create_app, 'imports': imports})
+    return summary
+
+def top_level_packages(imports: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Soma o tempo próprio por pacote de primeiro nível"""
+    totals: Dict[str, int] = {}
+    for item in imports:
+        package = item['module'].split('.')[0]
+        totals[package] = totals.get(package, 0) + item['self_us']
+    return dict(sorted(totals.items(), key=lambda entry: entry[1], reverse=True))
+
+def print_report(summary: Dict[str, Any], top: int) -> None:
+    imports = summary['imports']
+    print(f"Alvo: {summary['module']}{' + create_app()' if summary['create_app'] else ''}")
+    print(f"Tempo total: {summary['elapsed_seconds'] * 1000:.1f} ms | "
+          f"Módulos importados: {len(imports)} | RSS máximo: {summary['max_rss_kb'] / 1024:.1f} MB")
+
+    heavy = summary['loaded_heavy_modules']
+    print(f"Dependências pesadas carregadas: {', '.join(heavy) if heavy else 'nenhuma'}")
+
+    print(f"\nTop {top} módulos (tempo acumulado):")
+    print(f"{'acumulado ms':>13} {'próprio ms':>11}  módulo")
+    for item in sorted(imports, key=lambda entry: entry['cumulative_us'], reverse=True)[:top]:
+        print(f"{item['cumulative_us'] / 1000:>13.1f} {item['self_us'] / 1000:>11.1f}  {item['module']}")
+
+    print(f"\nTop {top} pacotes (tempo próprio somado):")
+    for package, self_us in list(top_level_packages(imports).items())[:top]:
+        print(f"{self_us / 1000:>13.1f}  {package}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Tempo de importação por módulo da aplicação')
+    parser.add_argument('--module', default='run', help='Módulo a importar (padrão: run)')
+    parser.add_argument('--create-app', action='store_true', help='Também executa create_app()')
+    parser.add_argument('--top', type=int, default=25, help='Quantidade de módulos no relatório')
+    parser.add_argument('--json', action='store_true', help='Saída em JSON')
+    args = parser.parse_args()
+
+    summary = run_benchmark(args.module, args.create_app)
+
+    if args.json:
+        summary['packages_self_us'] = top_level_packages(summary['imports'])
+        print(json.dumps(summary, indent=2))
+    else:
+        print_report(summary, args.top)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Benchmark do Relatório PDF
+Mede tempo de renderização e alocações do PDFGenerator com análises típicas
+
+Modos: warm (gerador compartilhado, como em produção), cold (gerador novo por PDF,
+sem reaproveitar estilos e parágrafos fixos) e story (apenas montagem dos flowables,
+sem o layout do ReportLab).
+
+Uso (a partir de src/):
+    python tools/pdf_benchmark.py                     # todos os payloads
+    python tools/pdf_benchmark.py --payload typical --iterations 50
+    python tools/pdf_benchmark.py --json
+"""
+
+import os
+import sys
+import gc
+import json
+import time
+import argparse
+import statistics
+import tracemalloc
+from io import BytesIO
+from typing import Callable, Dict, List, Any, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.pdf_report import PDFGenerator
+
+def _typical_payload(scale: int = 1) -> Dict[str, Any]:
+    """Análise com todas as seções, no formato gerado pelo motor de análise"""
+    lorem = (
+        "O público busca previsibilidade de resultados e aceita investir quando percebe "
+        "método claro, prova social consistente e acompanhamento próximo durante a execução."
+    )
+    return {
+        'segmento': 'Educação financeira para profissionais liberais',
+        'produto': 'Mentoria Investidor Consciente',
+        'publico': 'Profissionais liberais de 28 a 45 anos',
+        'preco': '1997',
+        'objetivo_receita': '150000',
+        'metadata': {
+            'generated_at': '2024-01-15T10:30:00',
+            'model': 'Gemini Pro',
+            'processing_time': 42
+        },
+        'avatar_ultra_detalhado': {
+            'perfil_demografico': {
+                'idade': '28-45 anos',
+                'genero': '60% feminino',
+                'renda': 'R$ 8.000 a R$ 25.000',
+                'escolaridade': 'Superior completo',
+                'localizacao': 'Capitais do Sudeste e Sul'
+            },
+            'perfil_psicografico': {
+                'valores': lorem,
+                'estilo_vida': lorem,
+                'aspiracoes': lorem,
+                'medos': lorem
+            },
+            'dores_especificas': [f"Dor {i}: {lorem}" for i in range(8 * scale)],
+            'desejos_profundos': [f"Desejo {i}: {lorem}" for i in range(8 * scale)]
+        },
+        'escopo': {
+            'posicionamento_mercado': lorem * 3,
+            'proposta_valor': lorem * 2,
+            'diferenciais_competitivos': [f"Diferencial {i}: {lorem}" for i in range(6 * scale)]
+        },
+        'analise_concorrencia_detalhada': {
+            'concorrentes_diretos': [
+                {
+                    'nome': f'Concorrente {i}',
+                    'pontos_fortes': [f"Ponto forte {j}: {lorem}" for j in range(4)],
+                    'pontos_fracos': [f"Ponto fraco {j}: {lorem}" for j in range(4)]
+                }
+                for i in range(4 * scale)
+            ],
+            'gaps_oportunidade': [f"Gap {i}: {lorem}" for i in range(6 * scale)]
+        },
+        'estrategia_palavras_chave': {
+            'palavras_primarias': [f'investimento {i}' for i in range(10)],
+            'palavras_secundarias': [f'renda passiva {i}' for i in range(20)],
+            'long_tail': [f'como investir sendo profissional liberal {i}' for i in range(15)]
+        },
+        'metricas_performance_detalhadas': {
+            'kpis_principais': [
+                {'metrica': f'KPI {i}', 'objetivo': lorem} for i in range(8 * scale)
+            ],
+            'roi_esperado': lorem
+        },
+        'projecoes_cenarios': {
+            cenario: {
+                'receita_mensal': f'R$ {receita}',
+                'clientes_mes': str(clientes),
+                'ticket_medio': 'R$ 1.997'
+            }
+            for cenario, receita, clientes in (
+                ('conservador', '60.000', 30), ('realista', '100.000', 50), ('otimista', '160.000', 80)
+            )
+        },
+        'plano_acao_detalhado': {
+            fase: {
+                'duracao': '30 dias',
+                'atividades': [f"Atividade {i}: {lorem}" for i in range(6 * scale)]
+            }
+            for fase in ('fase_1_preparacao', 'fase_2_lancamento', 'fase_3_crescimento')
+        },
+        'insights_exclusivos': [f"Insight {i}: {lorem}" for i in range(15 * scale)]
+    }
+
+PAYLOADS: Dict[str, Callable[[], Dict[str, Any]]] = {
+    'minimal': lambda: {'segmento': 'Consultoria', 'produto': 'Mentoria'},
+    'typical': lambda: _typical_payload(1),
+    'large': lambda: _typical_payload(5)
+}
+
+def _measure(render: Callable[[], Optional[bytes]], iterations: int) -> Dict[str, Any]:
+    """Tempo por renderização e pico de memória alocada (tracemalloc) em uma renderização"""
+    render()  # aquecimento: imports, fontes e caches do ReportLab
+
+    durations: List[float] = []
+    gc.collect()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        pdf_bytes = render()
+        durations.append((time.perf_counter() - start) * 1000)
+
+    gc.collect()
+    tracemalloc.start()
+    render()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    durations.sort()
+    return {
+        'mean_ms': statistics.mean(durations),
+        'median_ms': statistics.median(durations),
+        'p95_ms': durations[min(len(durations) - 1, int(len(durations) * 0.95))],
+        'peak_alloc_kb': peak / 1024,
+        'pdf_bytes': len(pdf_bytes) if pdf_bytes is not None else None
+    }
+
+def run_benchmark(payload_names: List[str], iterations: int) -> Dict[str, Any]:
+    """Mede os modos warm, cold e story para cada payload"""
+    shared_generator = PDFGenerator()
+    results = {}
+
+    for name in payload_names:
+        data = PAYLOADS[name]()
+
+        def warm() -> bytes:
+            return shared_generator.generate_analysis_report(data, output=BytesIO()).getvalue()
+
+        def cold() -> bytes:
+            return PDFGenerator().generate_analysis_report(data, output=BytesIO()).getvalue()
+
+        def story() -> None:
+            shared_generator.build_story(data)
+
+        results[name] = {
+            'warm': _measure(warm, iterations),
+            'cold': _measure(cold, iterations),
+            'story': _measure(story, iterations)
+        }
+
+    return results
+
+def print_report(results: Dict[str, Any], iterations: int) -> None:
+    print(f"Iterações por cenário: {iterations}")
+    print(f"{'payload':<10} {'modo':<6} {'média ms':>9} {'mediana':>9} {'p95':>9} {'pico KB':>9} {'PDF KB':>8}")
+    for name, modes in results.items():
+        for mode, stats in modes.items():
+            pdf_kb = f"{stats['pdf_bytes'] / 1024:.1f}" if stats['pdf_bytes'] is not None else '-'
+            print(
+                f"{name:<10} {mode:<6} {stats['mean_ms']:>9.1f} {stats['median_ms']:>9.1f} "
+                f"{stats['p95_ms']:>9.1f} {stats['peak_alloc_kb']:>9.0f} {pdf_kb:>8}"
+            )
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de renderização do relatório PDF')
+    parser.add_argument('--payload', choices=sorted(PAYLOADS), action='append',
+                        help='Payload a medir (pode repetir; padrão: todos)')
+    parser.add_argument('--iterations', type=int, default=20, help='Renderizações por cenário')
+    parser.add_argument('--json', action='store_true', help='Saída em JSON')
+    args = parser.parse_args()
+
+    payloads = args.payload or ['minimal', 'typical', 'large']
+    results = run_benchmark(payloads, args.iterations)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results, args.iterations)
+
+if __name__ == '__main__':
+    main()
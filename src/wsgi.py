@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Entrada WSGI de Produção
+Aplicação carregada no processo mestre do gunicorn antes do fork dos workers
+
+Uso (a partir de src/):
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+import os
+import gc
+import time
+import logging
+import importlib
+from run import create_app
+from services.service_registry import service_registry
+
+logger = logging.getLogger(__name__)
+
+# Serviços sem conexões abertas: seguros para criar antes do fork
+DEFAULT_PRELOAD_SERVICES = 'pdf_generator,attachments,deep_search,websailor,analysis_engine'
+
+def warm_shared_state() -> None:
+    """Cria estruturas somente leitura no mestre para serem compartilhadas (copy-on-write)"""
+    start_time = time.time()
+
+    # Estilos do relatório PDF, classificadores de conteúdo, configuração dos agentes
+    names = [
+        name.strip() for name in os.getenv('PRELOAD_SERVICES', DEFAULT_PRELOAD_SERVICES).split(',')
+        if name.strip()
+    ]
+    health = service_registry.warm_up(names)
+
+    # Dependências pesadas opcionais (ex.: PRELOAD_MODULES=pandas,openpyxl)
+    for module in os.getenv('PRELOAD_MODULES', '').split(','):
+        if module.strip():
+            try:
+                importlib.import_module(module.strip())
+            except ImportError as e:
+                logger.warning(f"Módulo de pré-carga indisponível: {module.strip()} ({str(e)})")
+
+    ready = [name for name in names if health.get(name, {}).get('status') == 'ready']
+    logger.info(f"🔥 Pré-carga concluída em {time.time() - start_time:.2f}s: {', '.join(ready) or 'nenhum serviço'}")
+
+app = create_app()
+
+if os.getenv('WSGI_WARM_UP', 'true').lower() == 'true':
+    warm_shared_state()
+
+# Objetos criados até aqui vão para a geração permanente do GC: as coletas nos
+# workers não tocam essas páginas, preservando o compartilhamento após o fork
+gc.collect()
+gc.freeze()